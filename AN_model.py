@@ -1,19 +1,19 @@
 # -*- coding: utf-8 -*-
 """
-Vol-Norm 外层随机包裹版（仅用一个历史文件：{tag}_simulated_alpha_expression.txt）
+Vol-Norm 外层随机包裹版（历史记录统一存在结果库 ResultStore，按 tag 去重）
 核心：base = x / ts_std_dev(x, d)
 外层（可选，随机）：ts_backfill(base,k) -> rank/zscore（二选一） -> ts_mean(...,w)
 注意：分子不使用 backfill，backfill 只在最外层。
 """
 
-import os
 import re
 import random
 import asyncio
 from datetime import datetime
 
 from machine_lib import *      # 你的登录/提交/并发/装饰器等
-from config import *           # 需要 RECORDS_PATH
+from config import *
+from fastexpr import canonicalize
 
 # ==================== 算法参数 ====================
 STD_WINDOWS = (22, 66, 120, 252)   # 分母标准差窗口
@@ -73,8 +73,9 @@ def build_base_exprs(fields, std_windows=STD_WINDOWS):
     for x in fields:
         for d in std_windows:
             e = f"({x}) / ts_std_dev({x}, {d})"
-            if e not in seen:
-                seen.add(e)
+            key = canonicalize(e)
+            if key not in seen:
+                seen.add(key)
                 out.append(e)
     return out
 
@@ -114,34 +115,19 @@ def build_expressions_with_outer(fields, std_windows=STD_WINDOWS, n_variants=N_V
     for b in bases:
         for _ in range(n_variants):
             e = wrap_outer_random(b)
-            if e not in seen:
-                seen.add(e)
+            key = canonicalize(e)
+            if key not in seen:
+                seen.add(key)
                 out.append(e)
     return out
 
-def read_completed(filepath):
-    """读取历史已完成表达式（忽略以 # 开头注释）"""
-    done = set()
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            for line in f:
-                s = line.strip()
-                if s and not s.startswith('#'):
-                    done.add(s)
-    except FileNotFoundError:
-        pass
-    return done
-
-
 # ==================== 主流程 ====================
 @while_true_try_decorator
 def run_task(dataset_id, region, delay, instrumentType, universe, n_jobs, tag=None):
     delay = int(delay); n_jobs = int(n_jobs)
     print(datetime.now(), f"================= 任务启动 {dataset_id} =================")
 
-    s = login()
-    group = get_datafields(s=s, dataset_id=dataset_id, region=region, delay=delay, universe=universe)
-    s.close()
+    group = get_datafields(s=None, dataset_id=dataset_id, region=region, delay=delay, universe=universe)
 
     fields = extract_field_names(group)
     print(datetime.now(), f"[INFO] 抽取字段数: {len(fields)}")
@@ -156,11 +142,9 @@ def run_task(dataset_id, region, delay, instrumentType, universe, n_jobs, tag=No
     if tag is None:
         tag = f"{region}_{dataset_id}_volnorm_outer"
 
-    # 单一历史文件：simulated_alpha_expression.txt
-    record_path = os.path.join(RECORDS_PATH, f"{tag}_simulated_alpha_expression.txt")
-    done = read_completed(record_path)
-    todo = [e for e in exprs if e not in done]
-    print(datetime.now(), f"[INFO] 待回测: {len(todo)}（已记录完成 {len(done)}）")
+    store = get_result_store()
+    todo = store.filter_pending(tag, exprs)
+    print(datetime.now(), f"[INFO] 待回测: {len(todo)}（已记录完成 {store.count(tag)}）")
 
     if not todo:
         print(datetime.now(), "[TIP] 无新表达式需要回测")
@@ -177,13 +161,13 @@ def run_task(dataset_id, region, delay, instrumentType, universe, n_jobs, tag=No
         todo, region_list, decay_list, delay_list, tag, neut, [], n=n_jobs
     ))
 
-    # 提交即入库：只写同一个历史文件，保持与 read_completed 对齐
+    # 提交即入库：回测失败/重复的表达式也记为已完成，下次不再提交。
+    # 回测成功的已经带着 settings 记过了，还在回测日志里的重启后会接着收尾，这里都跳过，避免重复计数
     try:
-        os.makedirs(RECORDS_PATH, exist_ok=True)
-        with open(record_path, "a", encoding="utf-8") as f:
-            for e in todo:
-                f.write(e + "\n")
-        print(datetime.now(), f"[INFO] 已写入历史记录：{record_path}（追加 {len(todo)} 条）")
+        in_flight = {alpha for url, entries in store.journal_pending(tag) for alpha, settings in entries}
+        failed = [expr for expr in store.filter_pending(tag, todo) if expr not in in_flight]
+        store.add_many(tag, failed)
+        print(datetime.now(), f"[INFO] 已写入结果库：{tag}（{len(failed)} 条未成功的表达式）")
     except Exception as e:
         print(datetime.now(), f"[WARN] 写历史记录失败：{e}")
 
@@ -6,7 +6,8 @@ from datetime import datetime
 
 from machine_lib import *
 from config import *
-from fields import *
+from fastexpr import canonicalize, dedup_expressions
+from dataset_catalog import DatasetCatalog
 
 from rich.console import Console
 
@@ -54,8 +55,9 @@ def small_first_order_factory(fields, ops_set, per_field_min=1, per_field_max=3,
                 expr = f"signed_power({field}, 2)"
             else:
                 expr = f"{op}({field})"
-            if expr not in seen and op not in field:
-                seen.add(expr)
+            key = canonicalize(expr)
+            if key not in seen and op not in field:
+                seen.add(key)
                 per_field_exprs.append(expr)
 
         # 2) 时间序列算子（窗口多样化）
@@ -68,8 +70,9 @@ def small_first_order_factory(fields, ops_set, per_field_min=1, per_field_max=3,
                 if len(per_field_exprs) >= per_field_target:
                     break
                 expr = f"{op}({field}, {w})"
-                if expr not in seen and op not in field:
-                    seen.add(expr)
+                key = canonicalize(expr)
+                if key not in seen and op not in field:
+                    seen.add(key)
                     per_field_exprs.append(expr)
 
         # 3) 分组算子（不同分组）
@@ -78,8 +81,9 @@ def small_first_order_factory(fields, ops_set, per_field_min=1, per_field_max=3,
                 break
             g = random.choice(group_choices)
             expr = f"{op}({field}, densify({g}))"
-            if expr not in seen and op not in field:
-                seen.add(expr)
+            key = canonicalize(expr)
+            if key not in seen and op not in field:
+                seen.add(key)
                 per_field_exprs.append(expr)
 
         # 如果仍不足，回退多取 ts 窗口
@@ -88,26 +92,22 @@ def small_first_order_factory(fields, ops_set, per_field_min=1, per_field_max=3,
             op = ts_avail[i % len(ts_avail)]
             w = ts_windows[i % len(ts_windows)]
             expr = f"{op}({field}, {w})"
-            if expr not in seen and op not in field:
-                seen.add(expr)
+            key = canonicalize(expr)
+            if key not in seen and op not in field:
+                seen.add(key)
                 per_field_exprs.append(expr)
             i += 1
 
         alpha_set.extend(per_field_exprs)
 
-    # 去重（全局）保持顺序
-    g_seen = set()
-    uniq = []
-    for a in alpha_set:
-        if a not in g_seen:
-            g_seen.add(a)
-            uniq.append(a)
-    return uniq
+    # 去重（全局，按规范形式）保持顺序
+    return dedup_expressions(alpha_set)
 
 @while_true_try_decorator
-def run_task(dataset_id, region, delay, instrumentType, universe, n_jobs, tag=None):
+def run_task(dataset_id, region, delay, instrumentType, universe, n_jobs=None, tag=None):
     delay = int(delay)
-    n_jobs = int(n_jobs)
+    # n_jobs=None 时按限流情况自动调整并发数(AIMD)，不用再手动调
+    n_jobs = int(n_jobs) if n_jobs is not None else None
 
     print(datetime.now(), "================= 回测任务启动 =================")
     print(datetime.now(), f"dataset_id:       {dataset_id}")
@@ -115,16 +115,12 @@ def run_task(dataset_id, region, delay, instrumentType, universe, n_jobs, tag=No
     print(datetime.now(), f"delay:            {delay}")
     print(datetime.now(), f"instrumentType:   {instrumentType}")
     print(datetime.now(), f"universe:         {universe}")
-    print(datetime.now(), f"n_jobs:           {n_jobs}")
+    print(datetime.now(), f"n_jobs:           {n_jobs if n_jobs is not None else '自适应'}")
     print(datetime.now(), f"tag:              {tag}")
     print("================================================")
 
-    print(datetime.now(), "开始登录...")
-    s = login()
-    print(datetime.now(), "登录成功，开始拉取字段...")
-
-    group = get_datafields(s=s, dataset_id=dataset_id, region=region, delay=delay, universe=universe)
-    s.close()
+    print(datetime.now(), "开始拉取字段（有缓存时不联网）...")
+    group = get_datafields(s=None, dataset_id=dataset_id, region=region, delay=delay, universe=universe)
     
     
     if group is None or len(group) == 0:
@@ -135,8 +131,6 @@ def run_task(dataset_id, region, delay, instrumentType, universe, n_jobs, tag=No
         tag = f"{region}_{dataset_id}_fast_check"
     else:
         tag = f"{region}_{dataset_id}_fast_check"
-    completed_file_path = os.path.join(RECORDS_PATH, f"{tag}_simulated_alpha_expression.txt")
-    completed_alphas = read_completed_alphas_with_comments(completed_file_path)
 
     # 字段统计（官方原始 vs. 派生可用 vs. 本轮选用）
     total_official = len(group)
@@ -162,7 +156,7 @@ def run_task(dataset_id, region, delay, instrumentType, universe, n_jobs, tag=No
     raw_alpha_list = small_first_order_factory(pc_fields, ops_pool, per_field_min=3, per_field_max=5, per_field_target=10)
     print(datetime.now(), f"表达式生成完成：共 {len(raw_alpha_list)} 条")
 
-    alpha_list = [alpha for alpha in raw_alpha_list if alpha not in completed_alphas]
+    alpha_list = get_result_store().filter_pending(tag, raw_alpha_list)
 
     if len(alpha_list) == 0:
         print(datetime.now(), f"{tag} 所有表达式已完成，跳过")
@@ -183,7 +177,7 @@ def run_task(dataset_id, region, delay, instrumentType, universe, n_jobs, tag=No
     print(datetime.now(), f"开始提交回测：共 {len(alpha_list)} 条表达式")
     asyncio.run(simulate_multiple_tasks(
         alpha_list, region_list, decay_list, delay_list,
-        tag, neut, [], n=n_jobs
+        tag, neut, [], n=n_jobs, validator=operator_catalog.validator(group)
     ))
     # 回测完成后，保存本次提交的表达式清单（与成功结果文件区分开）
     submitted_file_path = os.path.join(RECORDS_PATH, f"{tag}_submitted_alpha_expression.txt")
@@ -194,7 +188,7 @@ def run_task(dataset_id, region, delay, instrumentType, universe, n_jobs, tag=No
         print(datetime.now(), f"保存提交清单失败：{e}")
     print(datetime.now(), "回测提交完成。")
 
-def plan_dataset(dataset_id, region, delay, instrumentType, universe, n_jobs, tag=None):
+def plan_dataset(dataset_id, region, delay, instrumentType, universe, n_jobs=None, tag=None):
     """
     预统计：返回该数据集的字段与表达式规模（不提交）。
     输出：{
@@ -202,11 +196,9 @@ def plan_dataset(dataset_id, region, delay, instrumentType, universe, n_jobs, ta
         'derived_total', 'selected_fields', 'generated_total', 'pending_total'
     }
     """
-    # 登录并取字段
+    # 取字段（有缓存时不联网）
     print(datetime.now(), f"准备统计数据集 {dataset_id} ...")
-    s = login()
-    group = get_datafields(s=s, dataset_id=dataset_id, region=region, delay=delay, universe=universe)
-    s.close()
+    group = get_datafields(s=None, dataset_id=dataset_id, region=region, delay=delay, universe=universe)
     if group is None or len(group) == 0:
         return {
             'dataset_id': dataset_id, 'tag': tag,
@@ -220,8 +212,6 @@ def plan_dataset(dataset_id, region, delay, instrumentType, universe, n_jobs, ta
         tag_local = f"{region}_{dataset_id}_fast_check"
     else:
         tag_local = f"{region}_{dataset_id}_fast_check"
-    completed_file_path = os.path.join(RECORDS_PATH, f"{tag_local}_simulated_alpha_expression.txt")
-    completed_alphas = read_completed_alphas_with_comments(completed_file_path)
 
     official_total = len(group)
     try:
@@ -236,7 +226,7 @@ def plan_dataset(dataset_id, region, delay, instrumentType, universe, n_jobs, ta
 
     ops_pool = ts_ops + basic_ops
     raw_alpha_list = small_first_order_factory(pc_fields, ops_pool, per_field_min=1, per_field_max=3)
-    alpha_list = [alpha for alpha in raw_alpha_list if alpha not in completed_alphas]
+    alpha_list = get_result_store().filter_pending(tag_local, raw_alpha_list)
 
     return {
         'dataset_id': dataset_id,
@@ -250,23 +240,7 @@ def plan_dataset(dataset_id, region, delay, instrumentType, universe, n_jobs, ta
         'pending_total': len(alpha_list),
     }
 
-def read_completed_alphas_with_comments(filepath):
-    """
-    从指定文件中读取已经完成的alpha表达式，跳过注释行（以#开头）
-    """
-    completed_alphas = set()
-    try:
-        with open(filepath, mode='r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                # 跳过空行和注释行
-                if line and not line.startswith('#'):
-                    completed_alphas.add(line)
-    except FileNotFoundError:
-        print(datetime.now(), f"File not found: {filepath}")
-    return completed_alphas
-
-def generate_dataset_records(dataset_ids, region, delay, instrumentType, universe, n_jobs, tag=None):
+def generate_dataset_records(dataset_ids, region, delay, instrumentType, universe, n_jobs=None, tag=None):
     """
     为每个数据集生成记录文件，在第一行显示待回测因子数量
     """
@@ -307,7 +281,7 @@ def generate_dataset_records(dataset_ids, region, delay, instrumentType, univers
     
     print(datetime.now(), "================= 数据集记录文件生成完成 =================")
 
-def run_multi_datasets(dataset_ids, region, delay, instrumentType, universe, n_jobs, tag=None):
+def run_multi_datasets(dataset_ids, region, delay, instrumentType, universe, n_jobs=None, tag=None):
     """
     依次遍历多个 dataset_id，复用相同的 region/delay/universe 等参数。
     智能启动：检测每个数据集的待回测数量，从第一个有待回测的数据集开始。
@@ -365,14 +339,21 @@ def run_multi_datasets(dataset_ids, region, delay, instrumentType, universe, n_j
 
 # ========== 启动入口 ==========
 if __name__ == '__main__':
+    region, delay, universe = "CHN", 1, "TOP2000U"
+
     # 按顺序遍历多个数据集 ID（字符串或数字皆可）
-    datasets_to_run = ["AAA", "BBB", "CCC"]
-    #上官网自己选n个datasetid输入进去
+    datasets_to_run = []
+    #留空时从本地数据集索引里按 coverage、已有 alpha 数自动挑选；也可以上官网自己选n个datasetid输入进去
     #技巧：
     #1.优先选coverage高的，其次看这个数据集已经有多少个alpha
     #2.选已有因子多的数据集(不绝对，有时候太多，比如analyst4,会导致prod correlation爆炸）
     #3.可以输入多个数据集id，考虑分散性以保证每天都能稳定出货 自己领悟如何权衡不同地区的dataset之前怎么组合
-    
+    if not datasets_to_run:
+        with DatasetCatalog() as catalog:
+            catalog.refresh(combinations=[("EQUITY", region, delay, universe)])
+            datasets_to_run = catalog.dataset_ids(region, delay, universe, min_coverage=0.5,
+                                                  order_by=("coverage", "alpha_count"), limit=5)
+
     print(datetime.now(), "================= 因子挖掘机器启动 =================")
     print(datetime.now(), f"数据集列表：{datasets_to_run}")
     print(datetime.now(), "程序将按顺序处理每个数据集，完成后自动结束")
@@ -380,11 +361,11 @@ if __name__ == '__main__':
     
     run_multi_datasets(
         dataset_ids=datasets_to_run,
-        region="CHN",
-        delay=1,
+        region=region,
+        delay=delay,
         instrumentType="EQUITY",
-        universe="TOP2000U",
-        n_jobs=6,
+        universe=universe,
+        n_jobs=None,  # None: 并发数自适应；也可以填固定的并发数
         tag=None  # 使用None让每个数据集生成自己的tag
     )
     
@@ -1,4 +1,4 @@
-from 增强machine_lib import *
+from machine_lib import *
 from config import *
 import asyncio
 import aiofiles
@@ -67,14 +67,12 @@ def run_task(dataset_id, region, delay, instrumentType, universe, n_jobs, tag=No
             for alpha in get_group_second_order_factory([expr], group_ops):
                 so_alpha_list.append((alpha, decay))
 
-        # 读取已完成的alpha表达式
-        completed_alphas = read_completed_alphas(f'records/{step2_tag}_simulated_alpha_expression.txt')
-
         raw_alpha_list = so_alpha_list
         # 排除已完成的alpha表达式
-        alpha_list = [alpha_decay for alpha_decay in raw_alpha_list if alpha_decay[0] not in completed_alphas]
+        pending = set(get_result_store().filter_pending(step2_tag, [alpha for alpha, decay in raw_alpha_list]))
+        alpha_list = [alpha_decay for alpha_decay in raw_alpha_list if alpha_decay[0] in pending]
         if len(alpha_list) == 0:
-            print(datetime.now(),f"已经完成了{len(completed_alphas)}个alpha表达式，一共有{len(raw_alpha_list)}个alpha表达式")
+            print(datetime.now(),f"已经完成了{get_result_store().count(step2_tag)}个alpha表达式，一共有{len(raw_alpha_list)}个alpha表达式")
             print(datetime.now(),f"{step2_tag} is done.")
             continue
         print(datetime.now(),"{}progress: {}/{}".format(step2_tag, len(raw_alpha_list) - len(alpha_list), len(raw_alpha_list)))
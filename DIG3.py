@@ -1,4 +1,4 @@
-from 增强machine_lib import *
+from machine_lib import *
 from config import *
 import asyncio
 import aiofiles
@@ -65,12 +65,11 @@ def run_task(dataset_id, region, delay, instrumentType, universe, n_jobs, tag=No
             for alpha in trade_when_factory("trade_when", expr, region, delay):
                 th_alpha_list.append((alpha, decay))
 
-        completed_alphas = read_completed_alphas(f'records/{step3_tag}_simulated_alpha_expression.txt')
-
         raw_alpha_list = th_alpha_list
-        alpha_list = [alpha_decay for alpha_decay in raw_alpha_list if alpha_decay[0] not in completed_alphas]
+        pending = set(get_result_store().filter_pending(step3_tag, [alpha for alpha, decay in raw_alpha_list]))
+        alpha_list = [alpha_decay for alpha_decay in raw_alpha_list if alpha_decay[0] in pending]
         if len(alpha_list) == 0:
-            print(datetime.now(),f"已经完成了{len(completed_alphas)}个alpha表达式，一共有{len(raw_alpha_list)}个alpha表达式")
+            print(datetime.now(),f"已经完成了{get_result_store().count(step3_tag)}个alpha表达式，一共有{len(raw_alpha_list)}个alpha表达式")
             print(datetime.now(),f"{step3_tag} is done.")
             continue
 
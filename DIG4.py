@@ -1,4 +1,4 @@
-from 增强machine_lib import *
+from machine_lib import *
 from config import *
 import asyncio
 import aiofiles
@@ -66,9 +66,9 @@ def run_task(dataset_id, region, delay, instrumentType, universe, n_jobs, tag=No
 
         print(datetime.now(),f"Total expression for simulation: {len(fh_alpha_list)}")
 
-        completed_alphas = read_completed_alphas(f'records/{step4_tag}_simulated_alpha_expression.txt')
         raw_alpha_list = fh_alpha_list
-        alpha_list = [item for item in raw_alpha_list if item[0] not in completed_alphas]
+        pending = set(get_result_store().filter_pending(step4_tag, [alpha for alpha, decay in raw_alpha_list]))
+        alpha_list = [item for item in raw_alpha_list if item[0] in pending]
 
         if not alpha_list:
             print(datetime.now(), f"{step4_tag} 已完成全部 {len(raw_alpha_list)} 个表达式")
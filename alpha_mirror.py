@@ -0,0 +1,187 @@
+import json
+import sqlite3
+import threading
+
+from config import ALPHAS_DB_PATH
+
+
+class AlphaMirror:
+    """
+    /users/self/alphas 的本地镜像(SQLite)。
+    每次只同步 dateModified 晚于水位线的 alpha(新建的、改过颜色/标签/状态的)，
+    get_alphas 式的筛选(tag、sharpe/fitness、long/short count、region、universe...)直接查本地
+    """
+
+    def __init__(self, path=ALPHAS_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+
+    def _create_tables(self):
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS alphas (
+                    id TEXT PRIMARY KEY,
+                    type TEXT,
+                    status TEXT,
+                    hidden INTEGER,
+                    color TEXT,
+                    region TEXT,
+                    universe TEXT,
+                    delay INTEGER,
+                    instrument_type TEXT,
+                    sharpe REAL,
+                    fitness REAL,
+                    long_count INTEGER,
+                    short_count INTEGER,
+                    date_created TEXT,
+                    date_modified TEXT,
+                    data TEXT NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_alphas_settings "
+                              "ON alphas (region, universe, delay, status)")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS alpha_tags (
+                    tag TEXT NOT NULL,
+                    alpha_id TEXT NOT NULL,
+                    PRIMARY KEY (tag, alpha_id)
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_alpha_tags_alpha_id ON alpha_tags (alpha_id)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def watermark(self):
+        """
+        上次同步开始的时间("%Y-%m-%dT%H:%M:%S")，没同步过时为 None
+        """
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'watermark'").fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, value):
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('watermark', ?)", (value,))
+
+    @staticmethod
+    def _row(alpha):
+        settings = alpha.get('settings') or {}
+        is_ = alpha.get('is') or {}
+        return (alpha['id'], alpha.get('type'), alpha.get('status'), int(bool(alpha.get('hidden'))),
+                alpha.get('color'), settings.get('region'), settings.get('universe'), settings.get('delay'),
+                settings.get('instrumentType'), is_.get('sharpe'), is_.get('fitness'), is_.get('longCount'),
+                is_.get('shortCount'), alpha.get('dateCreated'), alpha.get('dateModified'), json.dumps(alpha))
+
+    def upsert(self, alphas, batch_size=1000):
+        """
+        写入/覆盖一批 alpha(可以是生成器)，返回写入条数
+        """
+        count = 0
+        batch = []
+        for alpha in alphas:
+            batch.append(alpha)
+            if len(batch) >= batch_size:
+                count += self._upsert_batch(batch)
+                batch = []
+        if batch:
+            count += self._upsert_batch(batch)
+        return count
+
+    def _upsert_batch(self, alphas):
+        ids = [(alpha['id'],) for alpha in alphas]
+        tags = [(tag, alpha['id']) for alpha in alphas for tag in alpha.get('tags') or []]
+        with self._lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO alphas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                  [self._row(alpha) for alpha in alphas])
+            self.conn.executemany("DELETE FROM alpha_tags WHERE alpha_id = ?", ids)
+            self.conn.executemany("INSERT OR IGNORE INTO alpha_tags (tag, alpha_id) VALUES (?, ?)", tags)
+        return len(alphas)
+
+    def query(self, start_date, end_date, sharpe_th, fitness_th, longCount_th, shortCount_th, region, universe,
+              delay, instrumentType, tag='', color_exclude='', negative=False, status='UNSUBMITTED'):
+        """
+        和 get_alphas 的 /users/self/alphas 查询条件一致，按 sharpe 从高到低返回 alpha 的原始 json。
+        region/universe/delay/instrumentType 为空('' 或 None)时和 API 一样不按它筛选。
+        negative=True 时查 sharpe <= -sharpe_th 且 fitness <= -fitness_th 的
+        """
+        sql = ("SELECT a.data FROM alphas a WHERE a.status = ? AND a.type = 'REGULAR' AND a.hidden = 0 "
+               "AND a.long_count >= ? AND a.short_count >= ? AND a.date_created >= ? AND a.date_created < ?")
+        params = [status, longCount_th, shortCount_th, start_date, end_date]
+        for column, value in (('region', region), ('universe', universe), ('delay', delay),
+                              ('instrument_type', instrumentType)):
+            if value is None or value == '':
+                continue
+            sql += f" AND a.{column} = ?"
+            params.append(int(value) if column == 'delay' else value)
+        if negative:
+            sql += " AND a.sharpe <= ? AND a.fitness <= ?"
+            params += [-sharpe_th, -fitness_th]
+        else:
+            sql += " AND a.sharpe >= ? AND a.fitness >= ?"
+            params += [sharpe_th, fitness_th]
+        if tag:
+            sql += " AND EXISTS (SELECT 1 FROM alpha_tags t WHERE t.alpha_id = a.id AND t.tag = ?)"
+            params.append(tag)
+        if color_exclude:
+            sql += " AND COALESCE(a.color, '') != ?"
+            params.append(color_exclude)
+        sql += " ORDER BY a.sharpe DESC"
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        for (data,) in rows:
+            yield json.loads(data)
+
+    def tagged(self, tag):
+        """
+        带 tag 标签的所有 alpha 的原始 json
+        """
+        with self._lock:
+            rows = self.conn.execute("SELECT a.data FROM alphas a JOIN alpha_tags t ON t.alpha_id = a.id "
+                                     "WHERE t.tag = ?", (tag,)).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def submitted_ids(self, region=None, status='ACTIVE'):
+        """
+        已提交(status 为 ACTIVE)的 REGULAR alpha 的 id，region 为 None 时不限 region
+        """
+        sql = "SELECT id FROM alphas WHERE status = ? AND type = 'REGULAR'"
+        params = [status]
+        if region:
+            sql += " AND region = ?"
+            params.append(region)
+        with self._lock:
+            return [alpha_id for (alpha_id,) in self.conn.execute(sql, params)]
+
+    def count(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM alphas").fetchone()[0]
+
+
+if __name__ == '__main__':
+    # 回归检查：check.py 用空的 universe/delay/instrumentType 查所有设置下的 alpha
+    alpha = {'id': 'a1', 'type': 'REGULAR', 'status': 'UNSUBMITTED', 'hidden': False, 'color': None,
+             'settings': {'region': 'USA', 'universe': 'TOP3000', 'delay': 1, 'instrumentType': 'EQUITY'},
+             'is': {'sharpe': 1.6, 'fitness': 1.0, 'longCount': 10, 'shortCount': 10},
+             'dateCreated': '2025-01-26T10:00:00-04:00', 'dateModified': '2025-01-26T10:00:00-04:00', 'tags': []}
+    with AlphaMirror(':memory:') as mirror:
+        mirror.upsert([alpha])
+        found = list(mirror.query('2025-01-25', '2025-02-01', 1.58, 1, 10, 10, region='USA', universe='',
+                                  delay='', instrumentType='', tag='', color_exclude='RED'))
+        assert [a['id'] for a in found] == ['a1'], found
+        found = list(mirror.query('2025-01-25', '2025-02-01', 1.58, 1, 10, 10, region='USA', universe='TOP3000',
+                                  delay='0', instrumentType='EQUITY'))
+        assert not found, found
+    print("ok")
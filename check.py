@@ -1,13 +1,13 @@
 import time
 import os
+import asyncio
+from collections import defaultdict
 
-import numpy as np
 import pandas as pd
 from config import RECORDS_PATH, REGION_LIST, UNIVERSE_DICT
-from machine_lib import login, get_alphas, set_alpha_properties
+from machine_lib import BrainClient, async_set_alpha_properties, brain_wait, get_alpha_mirror, get_alphas
+from local_corr import CorrelationState
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor
-import threading
 
 brain_api_url = os.environ.get("BRAIN_API_URL", "https://api.worldquantbrain.com")
 
@@ -48,32 +48,29 @@ def read_completed_alphas(filepath):
     return completed_alphas
 
 
-def get_self_corr(s, alpha_id):
+def corr_url(alpha_id, kind):
     """
-    Function gets alpha's self correlation
-    and save result to dataframe
+    kind 是 "self" 或 "prod"
     """
+    return brain_api_url + "/alphas/" + alpha_id + "/correlations/" + kind
 
-    while True:
 
-        result = s.get(
-            brain_api_url + "/alphas/" + alpha_id + "/correlations/self"
-        )
-        if "retry-after" in result.headers:
-            time.sleep(float(result.headers["Retry-After"]))
-        else:
-            break
-    if result.json().get("records", 0) == 0:
-        return pd.DataFrame()
-
-    records_len = len(result.json()["records"])
-    if records_len == 0:
+def corr_df(json_data, alpha_id):
+    """
+    把 /correlations/self|prod 的返回转成 DataFrame，没有记录时返回空表
+    """
+    if not json_data or not json_data.get("records"):
         return pd.DataFrame()
+    columns = [dct["name"] for dct in json_data["schema"]["properties"]]
+    return pd.DataFrame(json_data["records"], columns=columns).assign(alpha_id=alpha_id)
 
-    columns = [dct["name"] for dct in result.json()["schema"]["properties"]]
-    self_corr_df = pd.DataFrame(result.json()["records"], columns=columns).assign(alpha_id=alpha_id)
 
-    return self_corr_df
+def get_self_corr(s, alpha_id):
+    """
+    Function gets alpha's self correlation
+    and save result to dataframe
+    """
+    return corr_df(brain_wait(s, corr_url(alpha_id, "self")).json(), alpha_id)
 
 
 def get_prod_corr(s, alpha_id):
@@ -81,21 +78,7 @@ def get_prod_corr(s, alpha_id):
     Function gets alpha's prod correlation
     and save result to dataframe
     """
-
-    while True:
-        result = s.get(
-            brain_api_url + "/alphas/" + alpha_id + "/correlations/prod"
-        )
-        if "retry-after" in result.headers:
-            time.sleep(float(result.headers["Retry-After"]))
-        else:
-            break
-    if result.json().get("records", 0) == 0:
-        return pd.DataFrame()
-    columns = [dct["name"] for dct in result.json()["schema"]["properties"]]
-    prod_corr_df = pd.DataFrame(result.json()["records"], columns=columns).assign(alpha_id=alpha_id)
-
-    return prod_corr_df
+    return corr_df(brain_wait(s, corr_url(alpha_id, "prod")).json(), alpha_id)
 
 
 def check_self_corr_test(s, alpha_id, threshold: float = 0.7):
@@ -103,8 +86,10 @@ def check_self_corr_test(s, alpha_id, threshold: float = 0.7):
     Function checks if alpha's self_corr test passed
     Saves result to dataframe
     """
+    return self_corr_result(get_self_corr(s, alpha_id), alpha_id, threshold)
+
 
-    self_corr_df = get_self_corr(s, alpha_id)
+def self_corr_result(self_corr_df, alpha_id, threshold=0.7):
     if self_corr_df.empty:
         result = [{"test": "SELF_CORRELATION", "result": "PASS", "limit": threshold, "value": 0, "alpha_id": alpha_id}]
     else:
@@ -126,8 +111,10 @@ def check_prod_corr_test(s, alpha_id, threshold: float = 0.7):
     Function checks if alpha's prod_corr test passed
     Saves result to dataframe
     """
+    return prod_corr_result(get_prod_corr(s, alpha_id), alpha_id, threshold)
 
-    prod_corr_df = get_prod_corr(s, alpha_id)
+
+def prod_corr_result(prod_corr_df, alpha_id, threshold=0.7):
     value = prod_corr_df[prod_corr_df.alphas > 0]["max"].max()
     result = [
         {"test": "PROD_CORRELATION", "result": "PASS" if value <= threshold else "FAIL", "limit": threshold,
@@ -136,95 +123,154 @@ def check_prod_corr_test(s, alpha_id, threshold: float = 0.7):
     return pd.DataFrame(result)
 
 
-def check_alpha_by_self_prod(alpha, submitable_alpha_file, mode):
-    alpha_id = alpha['id']
-    tags = alpha['tags']
-    if len(tags) > 1:
-        time.sleep(1)
-        raise ValueError("Only one tag is allowed.")
-    tag = tags[0] if len(tags) == 1 else ''
-
-    region = alpha['region']
-    delay = alpha['delay']
-    universe = alpha['universe']
-    instrumentType = alpha['instrumentType']
-    color = alpha['color']
-
-    completed_file_path = os.path.join(RECORDS_PATH, f"{tag}_checked_alpha_id.txt")
-    checked_alpha_id_list = read_completed_alphas(completed_file_path)
-
-    # 去除已经检查过的alpha
-    if alpha_id in checked_alpha_id_list:
-        print(f'{alpha_id} has already been checked.')
-        if color != 'RED':
-            s = login()
-            set_alpha_properties(s, alpha_id, color='RED')
-        return
-
-    # if alpha['color'] == 'GREEN':
-    #     print(f'{alpha_id} has already been submitted.')
-    #     return
+class CorrelationChecker:
+    """
+    异步检查一批 alpha 的 self/prod correlation：所有 worker 共用一个已登录的 BrainClient，
+    每个 alpha 的 self 和 prod 同时请求，按 Retry-After 的轮询交给 client.poller 统一调度。
+    检查结果(RED/GREEN)通过 PATCH 写回颜色，没通过的记进 {tag}_checked_alpha_id.txt，
+    通过的追加到 submitable_alpha_file。poll_rate 是轮询 correlations 的每秒请求预算。
+    给了 local_corr(SelfCorrelationEngine / CorrelationState)时，先用缓存的 PnL 在本地算一遍 self correlation，
+    本地就超过门槛的直接标 RED，只有通过的才请求服务器确认
+    """
 
-    s = login()
+    def __init__(self, submitable_alpha_file, mode="USER", n_workers=10, threshold=0.7, poll_rate=10,
+                 local_corr=None, pool_ttl=7 * 24 * 60 * 60):
+        self.submitable_alpha_file = submitable_alpha_file
+        self.mode = mode
+        self.n_workers = n_workers
+        self.poll_rate = poll_rate
+        self.local_corr = local_corr
+        self.pool_ttl = pool_ttl
+        self.threshold = threshold
+        self._checked = {}
+
+    def checked_ids(self, tag):
+        if tag not in self._checked:
+            self._checked[tag] = read_completed_alphas(os.path.join(RECORDS_PATH, f"{tag}_checked_alpha_id.txt"))
+        return self._checked[tag]
+
+    def mark_checked(self, tag, alpha_id):
+        self.checked_ids(tag).add(alpha_id)
+        with open(os.path.join(RECORDS_PATH, f"{tag}_checked_alpha_id.txt"), mode='a') as f:
+            f.write(alpha_id + '\n')
+
+    def save_submitable(self, alpha):
+        alpha_df = pd.DataFrame([alpha])
+        print(alpha_df)
+        submit_df = pd.concat([pd.read_csv(self.submitable_alpha_file)
+                               if os.path.exists(self.submitable_alpha_file) else pd.DataFrame(), alpha_df], axis=0)
+        submit_df.drop_duplicates(subset=['id'], keep='last', inplace=True)
+        submit_df.to_csv(self.submitable_alpha_file, index=False)
+
+    async def check(self, client, alpha):
+        alpha_id = alpha['id']
+        tags = alpha['tags']
+        if len(tags) > 1:
+            raise ValueError("Only one tag is allowed.")
+        tag = tags[0] if len(tags) == 1 else ''
+
+        # 去除已经检查过的alpha
+        if alpha_id in self.checked_ids(tag):
+            print(f'{alpha_id} has already been checked.')
+            if alpha['color'] != 'RED':
+                await async_set_alpha_properties(client, alpha_id, color='RED')
+            return
 
-    try:
         now = time.time()
-        self_res = check_self_corr_test(s, alpha_id, 0.7)
-        print(alpha_id, "self corr use:", time.time() - now)
+        kinds = ["self"] if self.mode == "USER" else ["self", "prod"]
+        results = await asyncio.gather(*[client.poller.watch(corr_url(alpha_id, kind)) for kind in kinds])
+        print(alpha_id, "corr use:", time.time() - now)
+
+        self_res = self_corr_result(corr_df(results[0], alpha_id), alpha_id, self.threshold)
         print(self_res)
         if self_res['result'].iloc[0] == 'FAIL':
-            with lock:
-                with open(completed_file_path, mode='a') as f:
-                    f.write(alpha_id + '\n')
+            self.mark_checked(tag, alpha_id)
             print(f'{alpha_id} self corr test failed.')
-            set_alpha_properties(s, alpha_id, color='RED')
+            await async_set_alpha_properties(client, alpha_id, color='RED')
             return
+        alpha['self_corr'] = self_res['value'].iloc[0]
 
-        if mode != "USER":
-            now = time.time()
-            prod_res = check_prod_corr_test(s, alpha_id, 0.7)
+        if self.mode != "USER":
+            prod_res = prod_corr_result(corr_df(results[1], alpha_id), alpha_id, self.threshold)
             print(prod_res)
-            print(alpha_id, "prod corr use:", time.time() - now)
             if prod_res['result'].iloc[0] == 'FAIL':
-                with lock:
-                    with open(completed_file_path, mode='a') as f:
-                        f.write(alpha_id + '\n')
+                self.mark_checked(tag, alpha_id)
                 print(f'{alpha_id} prod corr test failed.')
-                set_alpha_properties(s, alpha_id, color='RED')
+                await async_set_alpha_properties(client, alpha_id, color='RED')
                 return
+            alpha['prod_corr'] = prod_res['value'].iloc[0]
 
         # 一路过关斩将，可以提交了
-        self_corr = self_res['value'].iloc[0]
-        if mode != "USER":
-            prod_corr = prod_res['value'].iloc[0]
-        alpha['self_corr'] = self_corr
-        if mode != "USER":
-            alpha['prod_corr'] = prod_corr
-        alpha_df = pd.DataFrame([alpha])
-        print(alpha_df)
-        with lock:
-            submit_df = pd.concat([pd.read_csv(submitable_alpha_file) if os.path.exists(submitable_alpha_file) else pd.DataFrame(), alpha_df], axis=0)
-            submit_df.drop_duplicates(subset=['id'], keep='last', inplace=True)
-            submit_df.to_csv(submitable_alpha_file, index=False)
-        set_alpha_properties(s, alpha_id, color='GREEN')
-        # s.post(f"https://sctapi.ftqq.com/{server_secret}.send", data={"text": f"Successfully find {alpha_id} is a submitable alpha."}, "desc": f"Self Corr: {self_corr}"})
+        self.save_submitable(alpha)
+        await async_set_alpha_properties(client, alpha_id, color='GREEN')
         print(f'Successfully find {alpha_id} is a submitable alpha.')
-    except Exception as e:
-        print(f"some error happened when checking: {e} \nAlpha: {alpha_id}")
+
+    async def prescreen(self, client, alphas):
+        """
+        按 region 用本地 self correlation 预筛，返回需要请求服务器的 alpha
+        """
+        survivors = []
+        by_region = defaultdict(list)
+        for alpha in alphas:
+            tag = alpha['tags'][0] if len(alpha['tags']) == 1 else ''
+            if len(alpha['tags']) > 1 or alpha['id'] in self.checked_ids(tag):
+                # 留给 check 处理(报错 / 补标 RED)
+                survivors.append(alpha)
+                continue
+            by_region[alpha['region']].append(alpha)
+
+        for region, group in by_region.items():
+            pool_ids = get_alpha_mirror().submitted_ids(region)
+            await self.local_corr.refresh_pool(client, region, pool_ids, ttl=self.pool_ttl)
+            await self.local_corr.cache.fetch(client, [alpha['id'] for alpha in group])
+            passed, failed = self.local_corr.screen([alpha['id'] for alpha in group])
+            print(f"region: {region}, local self corr: {len(passed)} passed, {len(failed)} failed")
+            for alpha in group:
+                if alpha['id'] not in failed:
+                    survivors.append(alpha)
+                    continue
+                tag = alpha['tags'][0] if len(alpha['tags']) == 1 else ''
+                self.mark_checked(tag, alpha['id'])
+                print(f"{alpha['id']} local self corr test failed: {failed[alpha['id']]:.3f}")
+                await async_set_alpha_properties(client, alpha['id'], color='RED')
+        return survivors
+
+    async def _worker(self, client, queue):
+        while True:
+            alpha = await queue.get()
+            if alpha is None:
+                break
+            try:
+                await self.check(client, alpha)
+            except Exception as e:
+                print(f"some error happened when checking: {e} \nAlpha: {alpha['id']}")
+
+    async def run(self, alphas):
+        n_workers = max(min(self.n_workers, len(alphas)), 1)
+        async with BrainClient(limit=n_workers * 2, poll_rate=self.poll_rate) as client:
+            if self.local_corr is not None:
+                alphas = await self.prescreen(client, alphas)
+            queue = asyncio.Queue()
+            for alpha in alphas:
+                queue.put_nowait(alpha)
+            for _ in range(n_workers):
+                queue.put_nowait(None)
+            await asyncio.gather(*[self._worker(client, queue) for _ in range(n_workers)])
 
 
 if __name__ == '__main__':
     while True:
         try:
             mode = "USER"  # "USER" or "CONSULTANT"
-            n_jobs = 3  # 每次检查的数量
+            n_jobs = 10  # 同时检查的 alpha 数量
             start_date_file = os.path.join(RECORDS_PATH, 'start_date.txt')
             submitable_alpha_file = os.path.join(RECORDS_PATH, 'submitable_alpha.csv')
 
             # 生成一组start_date和end_date,需要是自然日
             periods = generate_date_periods(start_date_file=start_date_file, default_start_date='2025-01-25')
 
-            lock = threading.Lock()
+            checker = CorrelationChecker(submitable_alpha_file, mode, n_workers=n_jobs,
+                                         local_corr=CorrelationState(threshold=0.7))
             for start_date, end_date in periods:
                 print(start_date, end_date)
                 for region in REGION_LIST:
@@ -246,16 +292,7 @@ if __name__ == '__main__':
                         print(need_to_check_alpha['check'][0])
                         print(len(need_to_check_alpha['check']))
 
-                        # 将列表等分为n份
-                        split_sizes = np.array_split(need_to_check_alpha['check'], max(len(need_to_check_alpha)//10, 1))
-
-                        # 将结果转换为列表形式
-                        chunks = [list(chunk) for chunk in split_sizes]
-
-                        for chunk in chunks:
-                            with ThreadPoolExecutor(max_workers=n_jobs) as executor:
-                                for alpha in chunk:
-                                    executor.submit(check_alpha_by_self_prod, alpha, submitable_alpha_file, mode)
+                        asyncio.run(checker.run(need_to_check_alpha['check']))
 
                         if end_date < str(datetime.now().date()-timedelta(days=3)):
                             with open(start_date_file, 'w') as f:
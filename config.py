@@ -6,6 +6,15 @@ DATA_PATH = os.path.join(ROOT_PATH, 'data')
 RECORDS_PATH = os.path.join(ROOT_PATH, 'records')
 DATASETS_PATH = os.path.join(DATA_PATH, 'datasets')
 FIELDS_PATH = os.path.join(DATA_PATH, 'fields')
+PNL_PATH = os.path.join(DATA_PATH, 'pnl')
+CORR_PATH = os.path.join(DATA_PATH, 'corr')
+RESULTS_DB_PATH = os.path.join(DATA_PATH, 'results.db')
+ALPHAS_DB_PATH = os.path.join(DATA_PATH, 'alphas.db')
+DATASETS_DB_PATH = os.path.join(DATASETS_PATH, 'datasets.db')
+
+# simulate_multiple_tasks / simulate_stream 默认把 region/delay 相同的 alpha 每 MULTI_SIZE 个(最多 10 个)
+# 打包成一个 multi-simulation；账号没有 multi-simulation 权限时改成 1
+MULTI_SIZE = 10
 
 REGION_LIST = ['USA', 'GLB', 'EUR', 'ASI', 'CHN', 'KOR', 'TWN', 'JPN', 'HKG', 'AMR']
 DELAY_LIST = [1, 0]
@@ -63,3 +72,5 @@ os.makedirs(DATA_PATH, exist_ok=True)
 os.makedirs(RECORDS_PATH, exist_ok=True)
 os.makedirs(DATASETS_PATH, exist_ok=True)
 os.makedirs(FIELDS_PATH, exist_ok=True)
+os.makedirs(PNL_PATH, exist_ok=True)
+os.makedirs(CORR_PATH, exist_ok=True)
@@ -0,0 +1,171 @@
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from config import DATASETS_DB_PATH, DELAY_LIST, UNIVERSE_DICT
+from machine_lib import get_datasets, login
+
+RANK_COLUMNS = {'coverage', 'value_score', 'user_count', 'alpha_count', 'field_count', 'pyramid_multiplier'}
+
+
+def iter_combinations(instrument_types=None, regions=None, delays=None):
+    """
+    遍历 UNIVERSE_DICT × DELAY_LIST 里的 (instrument_type, region, delay, universe)
+    """
+    for instrument_type, info in UNIVERSE_DICT['instrumentType'].items():
+        if instrument_types and instrument_type not in instrument_types:
+            continue
+        for region, universes in info['region'].items():
+            if regions and region not in regions:
+                continue
+            for delay in delays or DELAY_LIST:
+                for universe in universes:
+                    yield instrument_type, region, delay, universe
+
+
+class DatasetCatalog:
+    """
+    本地数据集索引(SQLite)，覆盖所有 region/delay/universe 组合。
+    refresh 只重新拉取超过 ttl 的组合；rank 按 coverage/alphaCount/userCount/字段数等
+    在本地排序筛选，不联网，可以直接把结果交给 run_multi_datasets。
+    """
+
+    def __init__(self, path=DATASETS_DB_PATH, ttl=86400):
+        self.path = path
+        self.ttl = ttl
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._create_tables()
+
+    def _create_tables(self):
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS datasets (
+                    instrument_type TEXT NOT NULL,
+                    region TEXT NOT NULL,
+                    delay INTEGER NOT NULL,
+                    universe TEXT NOT NULL,
+                    id TEXT NOT NULL,
+                    name TEXT,
+                    category TEXT,
+                    subcategory TEXT,
+                    coverage REAL,
+                    value_score REAL,
+                    user_count INTEGER,
+                    alpha_count INTEGER,
+                    field_count INTEGER,
+                    pyramid_multiplier REAL,
+                    PRIMARY KEY (instrument_type, region, delay, universe, id)
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_datasets_category ON datasets (category)")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS refreshes (
+                    instrument_type TEXT NOT NULL,
+                    region TEXT NOT NULL,
+                    delay INTEGER NOT NULL,
+                    universe TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (instrument_type, region, delay, universe)
+                )
+            """)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def stale_combinations(self, combinations=None):
+        fetched = {tuple(row[:4]): row[4] for row in self.conn.execute("SELECT * FROM refreshes")}
+        now = time.time()
+        return [combo for combo in combinations or iter_combinations()
+                if now - fetched.get(combo, 0) >= self.ttl]
+
+    @staticmethod
+    def _value(record, key):
+        value = record.get(key)
+        if isinstance(value, dict):
+            return value.get('id')
+        return value
+
+    def _save(self, combo, df):
+        rows = [combo + (record['id'], record.get('name'), self._value(record, 'category'),
+                         self._value(record, 'subcategory'), record.get('coverage'), record.get('valueScore'),
+                         record.get('userCount'), record.get('alphaCount'), record.get('fieldCount'),
+                         record.get('pyramidMultiplier'))
+                for record in df.to_dict('records')]
+        with self.conn:
+            self.conn.execute("DELETE FROM datasets WHERE instrument_type = ? AND region = ? AND delay = ? "
+                              "AND universe = ?", combo)
+            self.conn.executemany("INSERT OR REPLACE INTO datasets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                  rows)
+            self.conn.execute("INSERT OR REPLACE INTO refreshes VALUES (?, ?, ?, ?, ?)", combo + (time.time(),))
+
+    def refresh(self, s=None, combinations=None, force=False, max_workers=4):
+        """
+        拉取过期(或 force 时全部)组合的数据集列表，返回更新的组合数
+        """
+        combinations = list(combinations or iter_combinations())
+        todo = combinations if force else self.stale_combinations(combinations)
+        if not todo:
+            return 0
+
+        own_session = s is None
+        if own_session:
+            s = login()
+        try:
+            def fetch(combo):
+                instrument_type, region, delay, universe = combo
+                try:
+                    return combo, get_datasets(s, instrument_type, region, delay, universe)
+                except Exception as e:
+                    print(f"Failed to fetch datasets for {combo}: {e}")
+                    return combo, None
+
+            updated = 0
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for combo, df in executor.map(fetch, todo):
+                    if df is not None:
+                        self._save(combo, df)
+                        updated += 1
+        finally:
+            if own_session:
+                s.close()
+        print(f"Refreshed datasets of {updated}/{len(todo)} region/delay/universe combinations")
+        return updated
+
+    def rank(self, region='USA', delay=1, universe='TOP3000', instrument_type='EQUITY', categories=None,
+             min_coverage=0, min_fields=0, max_alpha_count=None, order_by=('coverage', 'alpha_count'),
+             ascending=False, limit=None):
+        """
+        按 order_by 排序筛选数据集，categories 取 DATASET_CATEGORY_LIST 里的值，返回 DataFrame
+        """
+        if isinstance(order_by, str):
+            order_by = (order_by,)
+        unknown = set(order_by) - RANK_COLUMNS
+        if unknown:
+            raise ValueError(f"Unknown rank columns: {unknown}")
+
+        sql = ("SELECT * FROM datasets WHERE instrument_type = ? AND region = ? AND delay = ? AND universe = ? "
+               "AND COALESCE(coverage, 0) >= ? AND COALESCE(field_count, 0) >= ?")
+        params = [instrument_type, region, delay, universe, min_coverage, min_fields]
+        if categories:
+            sql += " AND category IN (%s)" % ','.join('?' * len(categories))
+            params += list(categories)
+        if max_alpha_count is not None:
+            sql += " AND COALESCE(alpha_count, 0) <= ?"
+            params.append(max_alpha_count)
+        direction = 'ASC' if ascending else 'DESC'
+        sql += " ORDER BY " + ', '.join(f"{column} {direction}" for column in order_by)
+        if limit:
+            sql += " LIMIT %d" % int(limit)
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def dataset_ids(self, *args, **kwargs):
+        return self.rank(*args, **kwargs)['id'].tolist()
@@ -0,0 +1,487 @@
+"""
+FASTEXPR 表达式解析与规范化。
+parse() 把表达式解析成语法树，canonicalize() 再按统一格式打印出来：
+去掉多余空格和括号、统一数字写法(0.50 -> 0.5, 5.0 -> 5)、关键字参数写成 k=v，
+这样 rank(x) / rank( x ) / (rank(x)) 会得到同一个规范形式，用于去重和记录。
+"""
+
+import re
+from collections import namedtuple
+
+Number = namedtuple('Number', ['value'])
+String = namedtuple('String', ['value'])
+Name = namedtuple('Name', ['id'])
+Call = namedtuple('Call', ['name', 'args', 'kwargs'])  # kwargs: ((key, node), ...)
+Unary = namedtuple('Unary', ['op', 'operand'])
+Binary = namedtuple('Binary', ['op', 'left', 'right'])
+Ternary = namedtuple('Ternary', ['cond', 'then', 'orelse'])
+Assign = namedtuple('Assign', ['name', 'value'])
+Program = namedtuple('Program', ['statements'])
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+TOKEN_RE = re.compile(r"""
+    (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_][A-Za-z0-9_.]*)
+  | (?P<string>'[^']*'|"[^"]*")
+  | (?P<op>&&|\|\||==|!=|<=|>=|[-+*/^<>!?:,()=;])
+  | (?P<space>\s+)
+""", re.VERBOSE)
+
+# 二元运算符优先级，数字越大结合越紧
+BINARY_PRECEDENCE = {
+    '||': 2,
+    '&&': 3,
+    '==': 4, '!=': 4, '<': 4, '<=': 4, '>': 4, '>=': 4,
+    '+': 5, '-': 5,
+    '*': 6, '/': 6,
+    '^': 7,
+}
+TERNARY_PRECEDENCE = 1
+# 一元 -/! 比 * / 结合紧、比 ^ 松：-x^2 是 -(x^2)，(-x)^2 打印时保留括号
+UNARY_PRECEDENCE = 7
+ATOM_PRECEDENCE = 9
+
+
+def tokenize(expression):
+    tokens = []
+    pos = 0
+    while pos < len(expression):
+        m = TOKEN_RE.match(expression, pos)
+        if m is None:
+            raise ExpressionError("Unexpected character %r at %d in: %s" % (expression[pos], pos, expression))
+        pos = m.end()
+        kind = m.lastgroup
+        if kind != 'space':
+            tokens.append((kind, m.group(kind)))
+    tokens.append(('end', ''))
+    return tokens
+
+
+class Parser:
+    def __init__(self, expression):
+        self.expression = expression
+        self.tokens = tokenize(expression)
+        self.pos = 0
+
+    def peek(self, offset=0):
+        return self.tokens[self.pos + offset]
+
+    def next(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def expect(self, value):
+        kind, text = self.next()
+        if text != value:
+            raise ExpressionError("Expected %r but got %r in: %s" % (value, text or 'end', self.expression))
+
+    def parse_program(self):
+        statements = []
+        while True:
+            if self.peek()[1] == ';':
+                self.next()
+                continue
+            if self.peek()[0] == 'end':
+                break
+            statements.append(self.parse_statement())
+            if self.peek()[1] == ';':
+                self.next()
+            elif self.peek()[0] != 'end':
+                raise ExpressionError("Unexpected %r in: %s" % (self.peek()[1], self.expression))
+        if not statements:
+            raise ExpressionError("Empty expression")
+        if len(statements) == 1:
+            return statements[0]
+        return Program(tuple(statements))
+
+    def parse_statement(self):
+        if self.peek()[0] == 'name' and self.peek(1)[1] == '=':
+            name = self.next()[1]
+            self.next()
+            return Assign(name, self.parse_expression())
+        return self.parse_expression()
+
+    def parse_expression(self):
+        cond = self.parse_binary(TERNARY_PRECEDENCE + 1)
+        if self.peek()[1] == '?':
+            self.next()
+            then = self.parse_expression()
+            self.expect(':')
+            orelse = self.parse_expression()
+            return Ternary(cond, then, orelse)
+        return cond
+
+    def parse_binary(self, min_precedence):
+        left = self.parse_unary()
+        while True:
+            kind, op = self.peek()
+            precedence = BINARY_PRECEDENCE.get(op) if kind == 'op' else None
+            if precedence is None or precedence < min_precedence:
+                return left
+            self.next()
+            # ^ 右结合，其余左结合
+            right = self.parse_binary(precedence if op == '^' else precedence + 1)
+            left = Binary(op, left, right)
+
+    def parse_unary(self):
+        kind, op = self.peek()
+        if kind == 'op' and op in ('-', '+', '!'):
+            self.next()
+            operand = self.parse_binary(BINARY_PRECEDENCE['^'])
+            if op == '+':
+                return operand
+            if op == '-' and isinstance(operand, Number):
+                return Number(-operand.value)
+            return Unary(op, operand)
+        return self.parse_atom()
+
+    def parse_atom(self):
+        kind, text = self.next()
+        if kind == 'number':
+            return Number(float(text))
+        if kind == 'string':
+            return String(text[1:-1])
+        if kind == 'name':
+            if self.peek()[1] == '(':
+                self.next()
+                return self.parse_call(text)
+            return Name(text)
+        if text == '(':
+            node = self.parse_expression()
+            self.expect(')')
+            return node
+        raise ExpressionError("Unexpected %r in: %s" % (text or 'end', self.expression))
+
+    def parse_call(self, name):
+        args = []
+        kwargs = []
+        if self.peek()[1] == ')':
+            self.next()
+            return Call(name, tuple(args), tuple(kwargs))
+        while True:
+            if self.peek()[0] == 'name' and self.peek(1)[1] == '=':
+                key = self.next()[1]
+                self.next()
+                kwargs.append((key, self.parse_expression()))
+            else:
+                if kwargs:
+                    raise ExpressionError("Positional argument after keyword argument in %s(): %s"
+                                          % (name, self.expression))
+                args.append(self.parse_expression())
+            kind, text = self.next()
+            if text == ')':
+                return Call(name, tuple(args), tuple(kwargs))
+            if text != ',':
+                raise ExpressionError("Expected ',' or ')' in %s() but got %r: %s" % (name, text or 'end', self.expression))
+
+
+def parse(expression):
+    """
+    解析 FASTEXPR 表达式，返回语法树；语法错误时抛出 ExpressionError
+    """
+    return Parser(expression).parse_program()
+
+
+def format_number(value):
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _precedence(node):
+    if isinstance(node, Ternary):
+        return TERNARY_PRECEDENCE
+    if isinstance(node, Binary):
+        return BINARY_PRECEDENCE[node.op]
+    if isinstance(node, Unary) or (isinstance(node, Number) and node.value < 0):
+        return UNARY_PRECEDENCE
+    return ATOM_PRECEDENCE
+
+
+def _wrap(node, min_precedence):
+    text = to_string(node)
+    if _precedence(node) < min_precedence:
+        return "(%s)" % text
+    return text
+
+
+def to_string(node):
+    """
+    把语法树按规范格式打印成表达式
+    """
+    if isinstance(node, Number):
+        return format_number(node.value)
+    if isinstance(node, String):
+        return "'%s'" % node.value
+    if isinstance(node, Name):
+        return node.id
+    if isinstance(node, Call):
+        parts = [to_string(arg) for arg in node.args]
+        parts += ["%s=%s" % (key, to_string(value)) for key, value in node.kwargs]
+        return "%s(%s)" % (node.name, ", ".join(parts))
+    if isinstance(node, Unary):
+        return "%s%s" % (node.op, _wrap(node.operand, UNARY_PRECEDENCE))
+    if isinstance(node, Binary):
+        precedence = BINARY_PRECEDENCE[node.op]
+        if node.op == '^':
+            left, right = _wrap(node.left, precedence + 1), _wrap(node.right, precedence)
+        else:
+            left, right = _wrap(node.left, precedence), _wrap(node.right, precedence + 1)
+        return "%s %s %s" % (left, node.op, right)
+    if isinstance(node, Ternary):
+        return "%s ? %s : %s" % (_wrap(node.cond, TERNARY_PRECEDENCE + 1), to_string(node.then),
+                                 to_string(node.orelse))
+    if isinstance(node, Assign):
+        return "%s = %s" % (node.name, to_string(node.value))
+    if isinstance(node, Program):
+        return "; ".join(to_string(statement) for statement in node.statements)
+    raise ExpressionError("Unknown node: %r" % (node,))
+
+
+def canonicalize(expression):
+    """
+    返回表达式的规范形式，用于去重和记录。
+    解析失败的表达式只压缩空白后原样返回，交给服务器报错
+    """
+    try:
+        return to_string(parse(expression))
+    except ExpressionError:
+        return " ".join(expression.split())
+
+
+def iter_dedup(expressions):
+    """
+    dedup_expressions 的惰性版本，边读边产出，只在内存里保留规范形式
+    """
+    seen = set()
+    for expression in expressions:
+        key = canonicalize(expression)
+        if key not in seen:
+            seen.add(key)
+            yield expression
+
+
+def dedup_expressions(expressions):
+    """
+    按规范形式去重，保持原顺序，保留每组第一次出现的写法
+    """
+    return list(iter_dedup(expressions))
+
+
+# 不在字段目录里、但平台内置可以直接当分组用的名字
+BUILTIN_GROUPS = {'market', 'sector', 'industry', 'subindustry', 'country', 'exchange'}
+
+Signature = namedtuple('Signature', ['required', 'maximum', 'keywords', 'params'])
+
+
+def parse_signature(name, definition):
+    """
+    从 /operators 的 definition(如 "ts_decay_exp_window(x, d, factor = f)")解析出 Signature：
+    必填位置参数个数、最多参数个数(None 表示不限)、关键字参数名集合、按顺序的参数名。
+    解析不出来时返回 None
+    """
+    start = definition.find(name + '(')
+    if start < 0:
+        return None
+    depth = 0
+    begin = start + len(name) + 1
+    for i in range(begin - 1, len(definition)):
+        if definition[i] == '(':
+            depth += 1
+        elif definition[i] == ')':
+            depth -= 1
+            if depth == 0:
+                end = i
+                break
+    else:
+        return None
+
+    parts = []
+    depth = 0
+    quote = None
+    current = ''
+    for ch in definition[begin:end]:
+        if quote:
+            quote = None if ch == quote else quote
+        elif ch in '\'"':
+            quote = ch
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            parts.append(current.strip())
+            current = ''
+            continue
+        current += ch
+    if current.strip():
+        parts.append(current.strip())
+
+    required = 0
+    keywords = set()
+    params = []
+    variadic = False
+    for part in parts:
+        if '..' in part:
+            # "x1, x2, ..." / "max(x, y, ..)" / "min(x, y ..)"
+            variadic = True
+            part = part.replace('.', '').strip()
+            if not part:
+                continue
+        if re.match(r'^[A-Za-z_]\w*\s*=[^=]', part):
+            keyword = part.split('=')[0].strip()
+            keywords.add(keyword)
+            params.append(keyword)
+        else:
+            required += 1
+            params.append(part)
+    return Signature(required, None if variadic else required + len(keywords), keywords, params)
+
+
+class ExpressionValidator:
+    """
+    提交前的本地检查：语法、算子是否存在、参数个数/关键字、字段类型。
+    operators 是 /operators 返回的列表，fields 是 get_datafields 返回的 DataFrame(或 dict 列表)。
+    - VECTOR 字段必须直接包在 vec_* 算子里
+    - GROUP 字段只能作为 group_* 算子的分组参数(可以套 densify/bucket)
+    - strict_fields=True 时不在 fields 里的标识符也算错误(fields 需要是整个 region 的字段)
+    operators 为空(离线)时跳过算子检查
+    """
+
+    def __init__(self, operators=None, fields=None, strict_fields=False, group_names=BUILTIN_GROUPS):
+        self.signatures = {}
+        for op in operators or []:
+            self.signatures[op['name']] = parse_signature(op['name'], op.get('definition') or '')
+        self.field_types = {}
+        if fields is not None:
+            if hasattr(fields, 'to_dict'):
+                fields = fields.to_dict('records')
+            for field in fields:
+                self.field_types[field['id']] = field.get('type')
+        self.strict_fields = strict_fields
+        self.group_names = set(group_names)
+
+    def validate(self, expression):
+        """
+        返回错误信息列表，空列表表示检查通过
+        """
+        try:
+            tree = parse(expression)
+        except ExpressionError as e:
+            return [str(e)]
+        errors = []
+        statements = tree.statements if isinstance(tree, Program) else (tree,)
+        scope = set()
+        for statement in statements:
+            if isinstance(statement, Assign):
+                self._check(statement.value, None, scope, errors)
+                scope.add(statement.name)
+            else:
+                self._check(statement, None, scope, errors)
+        return errors
+
+    def is_valid(self, expression):
+        return not self.validate(expression)
+
+    def filter(self, expressions):
+        """
+        返回检查通过的表达式，并打印被拒绝的数量和前几个原因
+        """
+        valid = []
+        rejected = []
+        for expression in expressions:
+            errors = self.validate(expression)
+            if errors:
+                rejected.append((expression, errors))
+            else:
+                valid.append(expression)
+        if rejected:
+            print("Rejected %d invalid expressions before simulation" % len(rejected))
+            for expression, errors in rejected[:5]:
+                print("  %s: %s" % (expression, "; ".join(errors)))
+        return valid
+
+    def _check(self, node, context, scope, errors):
+        # context: 'vector' 表示直接在 vec_* 里，'group' 表示在 group 参数位置
+        if isinstance(node, Name):
+            self._check_name(node.id, context, scope, errors)
+        elif isinstance(node, Call):
+            self._check_call(node, context, scope, errors)
+        elif isinstance(node, Unary):
+            self._check(node.operand, None, scope, errors)
+        elif isinstance(node, Binary):
+            self._check(node.left, None, scope, errors)
+            self._check(node.right, None, scope, errors)
+        elif isinstance(node, Ternary):
+            for child in node:
+                self._check(child, None, scope, errors)
+
+    def _check_name(self, name, context, scope, errors):
+        if name in scope:
+            return
+        if name in self.group_names:
+            if context != 'group':
+                errors.append("Group %s used outside a group argument" % name)
+            return
+        field_type = self.field_types.get(name)
+        if field_type is None:
+            if self.strict_fields:
+                errors.append("Unknown field %s" % name)
+        elif field_type == 'VECTOR' and context != 'vector':
+            errors.append("Vector field %s must be wrapped in a vec_* operator" % name)
+        elif field_type == 'GROUP' and context != 'group':
+            errors.append("Group field %s used outside a group argument" % name)
+
+    def _check_call(self, node, context, scope, errors):
+        name = node.name
+        if self.signatures:
+            if name not in self.signatures:
+                errors.append("Unknown operator %s" % name)
+            elif self.signatures[name] is not None:
+                required, maximum, keywords, params = self.signatures[name]
+                n_args = len(node.args) + len(node.kwargs)
+                if len(node.args) < required:
+                    errors.append("%s expects at least %d arguments, got %d" % (name, required, len(node.args)))
+                elif maximum is not None and n_args > maximum:
+                    errors.append("%s expects at most %d arguments, got %d" % (name, maximum, n_args))
+                for key, value in node.kwargs:
+                    if keywords and key not in keywords:
+                        errors.append("%s got an unexpected keyword argument %s" % (name, key))
+
+        signature = self.signatures.get(name)
+        if signature is not None:
+            group_positions = {i for i, param in enumerate(signature.params) if param == 'group'}
+        elif name.startswith('group_'):
+            group_positions = {1}
+        else:
+            group_positions = set()
+        for i, arg in enumerate(node.args):
+            if name.startswith('vec_') and i == 0:
+                arg_context = 'vector'
+            elif i in group_positions or (name in ('densify', 'bucket') and context == 'group'):
+                arg_context = 'group'
+            else:
+                arg_context = None
+            self._check(arg, arg_context, scope, errors)
+        for key, value in node.kwargs:
+            self._check(value, 'group' if key == 'group' else None, scope, errors)
+
+
+if __name__ == '__main__':
+    # 规范形式自检：写法不同的同一表达式相同，语义不同的表达式不同
+    assert canonicalize('rank( a )') == canonicalize('rank(a)')
+    assert canonicalize('ts_mean(x, 5.0)') == canonicalize('ts_mean(x,5)')
+    assert canonicalize('-x^2') == canonicalize('-(x^2)') == '-x ^ 2'
+    assert canonicalize('(-x)^2') == '(-x) ^ 2'
+    assert canonicalize('(-2)^2') != canonicalize('-2^2')
+    assert canonicalize('2^-x') == '2 ^ -x'
+    assert canonicalize('a * -b') == 'a * -b'
+    assert canonicalize('-(a * b)') == '-(a * b)'
+    for expression in ['-x^2', '(-x)^2', '(-2)^2', '-2^2', '2^-x^2', '!a^b', 'a - -b', '-(a + b) * c']:
+        assert canonicalize(canonicalize(expression)) == canonicalize(expression), expression
+    print("ok")
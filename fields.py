@@ -1,4 +1,59 @@
+import functools
+import os
+import re
 
-# 推荐的fields:
-recommended_fields_1 = ['anl4_bvps_high / fnd6_recd', 'anl4_bvps_low / fnd6_newqv1300_recdq', 'anl4_bvps_low / fnd6_recd', 'anl4_bvps_low / news_eod_close', 'anl4_bvps_low / news_open', 'anl4_bvps_low / opt6_slcxp', 'anl4_capex_high / anl4_cfo_low', 'anl4_capex_high / anl4_cfo_median', 'anl4_capex_high / anl4_ebit_low', 'anl4_capex_high / anl4_ebit_median', 'anl4_capex_high / anl4_ebitda_high', 'anl4_capex_high / anl4_ebitda_low', 'anl4_capex_high / anl4_ebitda_value', 'anl4_capex_high / anl4_fcf_low', 'anl4_capex_high / anl4_gric_low', 'anl4_capex_high / anl4_gric_median', 'anl4_capex_high / anl4_medianepsbfam', 'anl4_capex_high / anl4_netdebt_low', 'anl4_capex_high / anl4_netdebt_median', 'anl4_capex_high / anl4_netprofit_high', 'anl4_capex_high / anl4_netprofit_low', 'anl4_capex_high / anl4_netprofit_median', 'anl4_capex_high / anl4_netprofit_value', 'anl4_capex_high / anl4_netprofita_high', 'anl4_capex_high / anl4_netprofita_low', 'anl4_capex_high / anl4_netprofita_median', 'anl4_capex_high / anl4_ptp_high', 'anl4_capex_high / anl4_ptp_low', 'anl4_capex_high / anl4_ptp_median', 'anl4_capex_high / anl4_ptp_value', 'anl4_capex_high / anl4_ptpr_high', 'anl4_capex_high / anl4_ptpr_low', 'anl4_capex_high / anl4_rd_exp_low', 'anl4_capex_high / anl4_totassets_low', 'anl4_capex_high / anl4_totassets_median', 'anl4_capex_high / est_ffo', 'anl4_capex_high / est_sales', 'anl4_capex_high / fnd2_a_blgandiprtsg', 'anl4_capex_high / fnd2_a_stkrpeprogramardamt', 'anl4_capex_high / fnd2_dbplanfvalpnas', 'anl4_capex_high / cashflow', 'anl4_capex_high / enterprise_value', 'anl4_capex_high / fnd6_acqgdwl', 'anl4_capex_high / fnd6_am', 'anl4_capex_high / fnd6_dcvt', 'anl4_capex_high / fnd6_dd', 'anl4_capex_high / fnd6_dd2', 'anl4_capex_high / fnd6_dd3', 'anl4_capex_high / fnd6_dd4', 'anl4_capex_high / fnd6_dd5', 'anl4_capex_high / fnd6_dltr', 'anl4_capex_high / fnd6_fatc', 'anl4_capex_high / fnd6_lcoxdr', 'anl4_capex_high / fnd6_newa1v1300_gp', 'anl4_capex_high / fnd6_newa1v1300_ibc', 'anl4_capex_high / fnd6_newa2v1300_oiadp', 'anl4_capex_high / fnd6_newa2v1300_oibdp', 'anl4_capex_high / fnd6_newa2v1300_ppent', 'anl4_capex_high / fnd6_newa2v1300_xsga', 'anl4_capex_high / fnd6_newqv1300_csh12q', 'anl4_capex_high / fnd6_newqv1300_ivltq', 'anl4_capex_high / fnd6_newqv1300_lltq', 'anl4_capex_high / fnd6_newqv1300_rcpq', 'anl4_capex_high / fnd6_newqv1300_recdq', 'anl4_capex_high / fnd6_niadj', 'anl4_capex_high / fnd6_rea', 'anl4_capex_high / fnd6_recd', 'anl4_capex_high / fnd6_tlcf', 'anl4_capex_high / income', 'anl4_capex_high / mdl38_iv_year_div', 'anl4_capex_high / star_val_earnings_projection_fy1', 'anl4_capex_high / star_val_earnings_projection_fy10', 'anl4_capex_high / star_val_earnings_projection_fy11', 'anl4_capex_high / star_val_earnings_projection_fy12', 'anl4_capex_high / star_val_earnings_projection_fy13', 'anl4_capex_high / star_val_earnings_projection_fy2', 'anl4_capex_high / star_val_earnings_projection_fy3', 'anl4_capex_high / star_val_earnings_projection_fy4', 'anl4_capex_high / star_val_earnings_projection_fy5', 'anl4_capex_high / star_val_earnings_projection_fy6', 'anl4_capex_high / star_val_earnings_projection_fy7', 'anl4_capex_high / star_val_earnings_projection_fy8', 'anl4_capex_high / star_val_earnings_projection_fy9', 'anl4_capex_high / pv13_revere_company_total', 'anl4_capex_high / pv13_revere_index_cap', 'anl4_capex_high / pv13_revere_key_sector_total', 'anl4_capex_high / pv13_revere_term_sector_total', 'anl4_capex_high / rel_num_comp', 'anl4_capex_high / rel_num_cust', 'anl4_capex_high / rel_num_part', 'anl4_capex_low / anl4_cfi_low', 'anl4_capex_low / anl4_cfo_low', 'anl4_capex_low / anl4_cfo_median', 'anl4_capex_low / anl4_ebit_low', 'anl4_capex_low / anl4_ebit_median', 'anl4_capex_low / anl4_ebitda_low', 'anl4_capex_low / anl4_fcf_low', 'anl4_capex_low / anl4_fcfps_low', 'anl4_capex_low / anl4_gric_low', 'anl4_capex_low / anl4_medianepsbfam', 'anl4_capex_low / anl4_netdebt_low', 'anl4_capex_low / anl4_netprofit_low', 'anl4_capex_low / anl4_netprofita_low', 'anl4_capex_low / anl4_netprofita_median', 'anl4_capex_low / anl4_ptp_high', 'anl4_capex_low / anl4_ptp_low', 'anl4_capex_low / anl4_ptp_median', 'anl4_capex_low / anl4_ptp_value', 'anl4_capex_low / anl4_ptpr_low', 'anl4_capex_low / anl4_ptpr_median', 'anl4_capex_low / anl4_rd_exp_low', 'anl4_capex_low / anl4_totassets_low', 'anl4_capex_low / fn_mne_a', 'anl4_capex_low / fnd2_a_dbplannpicbnfcst', 'anl4_capex_low / fnd2_a_flintasamt1expnext12m', 'anl4_capex_low / fnd2_a_rvndm', 'anl4_capex_low / cashflow', 'anl4_capex_low / enterprise_value', 'anl4_capex_low / fnd6_acqintan', 'anl4_capex_low / fnd6_am', 'anl4_capex_low / fnd6_aodo', 'anl4_capex_low / fnd6_dcvt', 'anl4_capex_low / fnd6_dd', 'anl4_capex_low / fnd6_dd1', 'anl4_capex_low / fnd6_dd2', 'anl4_capex_low / fnd6_dd3', 'anl4_capex_low / fnd6_dd4', 'anl4_capex_low / fnd6_dd5', 'anl4_capex_low / fnd6_dlcch', 'anl4_capex_low / fnd6_dltr', 'anl4_capex_low / fnd6_dn', 'anl4_capex_low / fnd6_ds', 'anl4_capex_low / fnd6_dudd', 'anl4_capex_low / fnd6_dvpa', 'anl4_capex_low / fnd6_fopo', 'anl4_capex_low / fnd6_fopox', 'anl4_capex_low / fnd6_invwip', 'anl4_capex_low / fnd6_ivch', 'anl4_capex_low / fnd6_newa1v1300_ao', 'anl4_capex_low / fnd6_newa1v1300_gp', 'anl4_capex_low / fnd6_newa2v1300_ni', 'anl4_capex_low / fnd6_newa2v1300_oiadp', 'anl4_capex_low / fnd6_newa2v1300_oibdp', 'anl4_capex_low / fnd6_newa2v1300_ppent', 'anl4_capex_low / fnd6_newa2v1300_rdip', 'anl4_capex_low / fnd6_newa2v1300_xsga', 'anl4_capex_low / fnd6_newqv1300_altoq', 'anl4_capex_low / fnd6_newqv1300_ivltq', 'anl4_capex_low / fnd6_newqv1300_lltq', 'anl4_capex_low / fnd6_newqv1300_rcpq', 'anl4_capex_low / fnd6_newqv1300_recdq', 'anl4_capex_low / fnd6_newqv1300_spcepq', 'anl4_capex_low / fnd6_niadj', 'anl4_capex_low / fnd6_npq', 'anl4_capex_low / fnd6_optca', 'anl4_capex_low / fnd6_rea', 'anl4_capex_low / fnd6_recd', 'anl4_capex_low / fnd6_recta', 'anl4_capex_low / fnd6_sstk', 'anl4_capex_low / fnd6_tlcf', 'anl4_capex_low / fnd6_txpd', 'anl4_capex_low / fnd6_xad', 'anl4_capex_low / fnd6_xrent', 'anl4_capex_low / income', 'anl4_capex_low / mdl38_iv_discount_rate', 'anl4_capex_low / mdl38_iv_div_payout_rate', 'anl4_capex_low / mdl38_iv_year_div', 'anl4_capex_low / star_val_earnings_projection_fy1', 'anl4_capex_low / star_val_earnings_projection_fy10', 'anl4_capex_low / star_val_earnings_projection_fy11', 'anl4_capex_low / star_val_earnings_projection_fy12', 'anl4_capex_low / star_val_earnings_projection_fy13', 'anl4_capex_low / star_val_earnings_projection_fy14', 'anl4_capex_low / star_val_earnings_projection_fy15', 'anl4_capex_low / star_val_earnings_projection_fy2', 'anl4_capex_low / star_val_earnings_projection_fy3', 'anl4_capex_low / star_val_earnings_projection_fy4', 'anl4_capex_low / star_val_earnings_projection_fy5', 'anl4_capex_low / star_val_earnings_projection_fy6', 'anl4_capex_low / star_val_earnings_projection_fy7', 'anl4_capex_low / star_val_earnings_projection_fy8', 'anl4_capex_low / star_val_earnings_projection_fy9', 'anl4_capex_low / news_dividend_yield', 'anl4_capex_low / news_eod_close', 'anl4_capex_low / news_eps_actual', 'anl4_capex_low / opt6_mktcap', 'anl4_capex_low / pv13_revere_company_total', 'anl4_capex_low / pv13_revere_index_cap', 'anl4_capex_low / pv13_revere_index_value', 'anl4_capex_low / pv13_revere_key_sector_total', 'anl4_capex_low / pv13_revere_term_sector_total', 'anl4_capex_low / rel_num_comp', 'anl4_capex_low / rel_num_cust', 'anl4_capex_low / rel_num_part', 'anl4_capex_low / vwap', 'anl4_capex_number / anl4_cfo_low', 'anl4_capex_number / fnd6_recd', 'anl4_capex_std / anl4_cfo_low', 'anl4_capex_std / anl4_cfo_median', 'anl4_capex_std / anl4_ebit_low', 'anl4_capex_std / anl4_ebitda_low', 'anl4_capex_std / anl4_ebitda_std', 'anl4_capex_std / anl4_fcf_low', 'anl4_capex_std / anl4_fcfps_low', 'anl4_capex_std / anl4_gric_low', 'anl4_capex_std / anl4_gric_std', 'anl4_capex_std / anl4_netprofit_low', 'anl4_capex_std / anl4_netprofita_low', 'anl4_capex_std / anl4_netprofita_median', 'anl4_capex_std / anl4_netprofita_std', 'anl4_capex_std / anl4_ptp_low', 'anl4_capex_std / anl4_ptpr_low', 'anl4_capex_std / anl4_rd_exp_low', 'anl4_capex_std / anl4_totassets_low', 'anl4_capex_std / anl4_totassets_std', 'anl4_capex_std / cashflow', 'anl4_capex_std / fnd6_dcvt', 'anl4_capex_std / fnd6_dltr', 'anl4_capex_std / fnd6_dudd', 'anl4_capex_std / fnd6_fatc', 'anl4_capex_std / fnd6_ivaco', 'anl4_capex_std / fnd6_newa2v1300_oiadp', 'anl4_capex_std / fnd6_newa2v1300_oibdp', 'anl4_capex_std / fnd6_newa2v1300_ppent', 'anl4_capex_std / fnd6_newqv1300_ivltq', 'anl4_capex_std / fnd6_newqv1300_recdq', 'anl4_capex_std / fnd6_rea', 'anl4_capex_std / fnd6_reajo', 'anl4_capex_std / fnd6_recd', 'anl4_capex_std / star_val_earnings_projection_fy1', 'anl4_capex_std / star_val_earnings_projection_fy2', 'anl4_capex_std / star_val_earnings_projection_fy3', 'anl4_capex_std / star_val_earnings_projection_fy4', 'anl4_capex_std / star_val_earnings_projection_fy8', 'anl4_capex_std / pv13_revere_key_sector_total', 'anl4_capex_std / pv13_revere_term_sector_total', 'anl4_capex_value / anl4_cff_low', 'anl4_capex_value / anl4_cfi_low', 'anl4_capex_value / anl4_cfo_low', 'anl4_capex_value / anl4_cfo_value', 'anl4_capex_value / anl4_ebitda_low', 'anl4_capex_value / anl4_ebitda_value', 'anl4_capex_value / anl4_fcf_low', 'anl4_capex_value / anl4_fcf_value', 'anl4_capex_value / anl4_fcfps_low', 'anl4_capex_value / anl4_gric_low', 'anl4_capex_value / anl4_netdebt_low', 'anl4_capex_value / anl4_netprofit_low', 'anl4_capex_value / anl4_netprofita_low', 'anl4_capex_value / anl4_netprofita_median', 'anl4_capex_value / anl4_ptp_low', 'anl4_capex_value / anl4_ptpr_low', 'anl4_capex_value / anl4_totassets_low', 'anl4_capex_value / est_ffo', 'anl4_capex_value / fn_mne_a', 'anl4_capex_value / cashflow', 'anl4_capex_value / enterprise_value', 'anl4_capex_value / fnd6_dcvt', 'anl4_capex_value / fnd6_dd1', 'anl4_capex_value / fnd6_dd2', 'anl4_capex_value / fnd6_dd3', 'anl4_capex_value / fnd6_dd4', 'anl4_capex_value / fnd6_dd5', 'anl4_capex_value / fnd6_intc', 'anl4_capex_value / fnd6_newa1v1300_gp', 'anl4_capex_value / fnd6_newa1v1300_ibc', 'anl4_capex_value / fnd6_newa2v1300_ni', 'anl4_capex_value / fnd6_newa2v1300_oiadp', 'anl4_capex_value / fnd6_newa2v1300_oibdp', 'anl4_capex_value / fnd6_newa2v1300_ppegt', 'anl4_capex_value / fnd6_newa2v1300_ppent', 'anl4_capex_value / fnd6_newa2v1300_xsga', 'anl4_capex_value / fnd6_newqv1300_altoq', 'anl4_capex_value / fnd6_newqv1300_ivltq', 'anl4_capex_value / fnd6_newqv1300_lltq', 'anl4_capex_value / fnd6_newqv1300_rcpq', 'anl4_capex_value / fnd6_newqv1300_seqq', 'anl4_capex_value / fnd6_newqv1300_spcep12', 'anl4_capex_value / fnd6_niadj', 'anl4_capex_value / fnd6_npq', 'anl4_capex_value / fnd6_rea', 'anl4_capex_value / fnd6_recd', 'anl4_capex_value / fnd6_sstk', 'anl4_capex_value / fnd6_xad', 'anl4_capex_value / fnd6_xrent', 'anl4_capex_value / income', 'anl4_capex_value / star_val_earnings_projection_fy1', 'anl4_capex_value / star_val_earnings_projection_fy14', 'anl4_capex_value / star_val_earnings_projection_fy15', 'anl4_capex_value / star_val_earnings_projection_fy2', 'anl4_capex_value / star_val_earnings_projection_fy3', 'anl4_capex_value / star_val_earnings_projection_fy4', 'anl4_capex_value / star_val_earnings_projection_fy5', 'anl4_capex_value / star_val_earnings_projection_fy7', 'anl4_capex_value / star_val_earnings_projection_fy8', 'anl4_capex_value / star_val_earnings_projection_fy9', 'anl4_capex_value / news_dividend_yield', 'anl4_capex_value / news_main_vwap', 'anl4_capex_value / opt6_mktcap', 'anl4_capex_value / opt6_slcxp', 'anl4_capex_value / opt6_xpslcy1', 'anl4_capex_value / pv13_revere_company_total', 'anl4_capex_value / pv13_revere_index_cap', 'anl4_capex_value / pv13_revere_key_sector_total', 'anl4_capex_value / pv13_revere_term_sector_total', 'anl4_capex_value / rel_num_cust', 'anl4_capex_value / rel_num_part', 'anl4_cff_high / anl4_cfo_low', 'anl4_cff_high / anl4_ebitda_low', 'anl4_cff_high / anl4_gric_low', 'anl4_cff_high / anl4_netdebt_low', 'anl4_cff_high / anl4_netprofita_low', 'anl4_cff_high / anl4_ptp_low', 'anl4_cff_high / anl4_ptp_median', 'anl4_cff_high / anl4_ptpr_low', 'anl4_cff_high / fnd6_dd5', 'anl4_cff_high / fnd6_dltr', 'anl4_cff_high / fnd6_newa2v1300_oiadp', 'anl4_cff_high / fnd6_newqv1300_lltq', 'anl4_cff_high / star_val_earnings_projection_fy2', 'anl4_cff_high / star_val_earnings_projection_fy3', 'anl4_cff_high / star_val_earnings_projection_fy4', 'anl4_cff_high / star_val_earnings_projection_fy5', 'anl4_cff_high / star_val_earnings_projection_fy6', 'anl4_cff_high / pv13_revere_term_sector_total', 'anl4_cff_high / rel_num_part', 'anl4_cff_low / anl4_ebitda_low', 'anl4_cff_low / anl4_fcf_low', 'anl4_cff_low / anl4_gric_low', 'anl4_cff_low / anl4_netdebt_low', 'anl4_cff_low / anl4_netprofit_low', 'anl4_cff_low / anl4_netprofita_low', 'anl4_cff_low / anl4_ptp_low', 'anl4_cff_low / anl4_ptpr_low', 'anl4_cff_low / anl4_totassets_low', 'anl4_cff_low / fn_new_shares_issued_a', 'anl4_cff_low / cashflow', 'anl4_cff_low / debt', 'anl4_cff_low / enterprise_value', 'anl4_cff_low / fnd6_dcvt', 'anl4_cff_low / fnd6_dd2', 'anl4_cff_low / fnd6_dd3', 'anl4_cff_low / fnd6_dd4', 'anl4_cff_low / fnd6_dd5', 'anl4_cff_low / fnd6_ds', 'anl4_cff_low / fnd6_newa2v1300_oiadp', 'anl4_cff_low / fnd6_newqv1300_lltq', 'anl4_cff_low / fnd6_newqv1300_rcpq', 'anl4_cff_low / fnd6_newqv1300_recdq', 'anl4_cff_low / fnd6_niadj', 'anl4_cff_low / fnd6_rea', 'anl4_cff_low / fnd6_recd', 'anl4_cff_low / income', 'anl4_cff_low / mdl38_iv_discount_rate', 'anl4_cff_low / mdl38_iv_year_div', 'anl4_cff_low / star_val_earnings_projection_fy1', 'anl4_cff_low / star_val_earnings_projection_fy10', 'anl4_cff_low / star_val_earnings_projection_fy12', 'anl4_cff_low / star_val_earnings_projection_fy2', 'anl4_cff_low / star_val_earnings_projection_fy3', 'anl4_cff_low / star_val_earnings_projection_fy4', 'anl4_cff_low / star_val_earnings_projection_fy5', 'anl4_cff_low / star_val_earnings_projection_fy6', 'anl4_cff_low / star_val_earnings_projection_fy7', 'anl4_cff_low / star_val_earnings_projection_fy8', 'anl4_cff_low / star_val_earnings_projection_fy9', 'anl4_cff_low / news_open', 'anl4_cff_low / opt6_divamt', 'anl4_cff_low / opt6_divfreq', 'anl4_cff_low / opt6_slcxp', 'anl4_cff_low / opt6_xpslcy1', 'anl4_cff_low / pv13_revere_company_total', 'anl4_cff_low / pv13_revere_key_sector_total', 'anl4_cff_low / pv13_revere_term_sector_total', 'anl4_cff_low / rel_num_comp', 'anl4_cff_low / rel_num_part', 'anl4_cff_median / anl4_fcf_median', 'anl4_cff_median / anl4_netprofit_low', 'anl4_cff_median / anl4_ptp_low', 'anl4_cff_median / star_val_earnings_projection_fy1', 'anl4_cff_median / star_val_earnings_projection_fy2', 'anl4_cff_median / star_val_earnings_projection_fy3', 'anl4_cff_median / star_val_earnings_projection_fy4', 'anl4_cff_median / star_val_earnings_projection_fy7', 'anl4_cff_median / opt6_slcxp', 'anl4_cff_median / opt6_xpslcm1', 'anl4_cff_median / opt6_xpslcy1', 'anl4_cff_value / anl4_fcf_low', 'anl4_cff_value / anl4_netprofit_low', 'anl4_cff_value / fn_new_shares_issued_a', 'anl4_cff_value / fnd6_dltr', 'anl4_cfi_high / anl4_cfo_low', 'anl4_cfi_high / anl4_ebit_low', 'anl4_cfi_high / anl4_ebitda_low', 'anl4_cfi_high / anl4_fcf_low', 'anl4_cfi_high / anl4_gric_low', 'anl4_cfi_high / anl4_netdebt_low', 'anl4_cfi_high / anl4_netprofit_low', 'anl4_cfi_high / anl4_netprofita_low', 'anl4_cfi_high / anl4_ptp_low', 'anl4_cfi_high / anl4_ptpr_low', 'anl4_cfi_high / anl4_totassets_low', 'anl4_cfi_high / cashflow', 'anl4_cfi_high / enterprise_value', 'anl4_cfi_high / fnd6_newa2v1300_oiadp', 'anl4_cfi_high / fnd6_newqv1300_lltq', 'anl4_cfi_high / fnd6_newqv1300_recdq', 'anl4_cfi_high / fnd6_niadj', 'anl4_cfi_high / fnd6_recd', 'anl4_cfi_high / star_val_earnings_projection_fy1', 'anl4_cfi_high / star_val_earnings_projection_fy3', 'anl4_cfi_high / pv13_revere_term_sector_total', 'anl4_cfi_high / rel_num_part', 'anl4_cfi_low / anl4_cfo_low', 'anl4_cfi_low / anl4_ebit_low', 'anl4_cfi_low / anl4_ebitda_low', 'anl4_cfi_low / anl4_fcf_low', 'anl4_cfi_low / anl4_fcf_median', 'anl4_cfi_low / anl4_gric_low', 'anl4_cfi_low / anl4_netdebt_low', 'anl4_cfi_low / anl4_netprofit_low', 'anl4_cfi_low / anl4_netprofita_low', 'anl4_cfi_low / anl4_netprofita_median', 'anl4_cfi_low / anl4_netprofita_std', 'anl4_cfi_low / anl4_ptp_low', 'anl4_cfi_low / anl4_ptpr_low', 'anl4_cfi_low / anl4_totassets_low', 'anl4_cfi_low / cashflow', 'anl4_cfi_low / enterprise_value', 'anl4_cfi_low / fnd6_dcvt', 'anl4_cfi_low / fnd6_dd2', 'anl4_cfi_low / fnd6_dd3', 'anl4_cfi_low / fnd6_dd4', 'anl4_cfi_low / fnd6_dd5', 'anl4_cfi_low / fnd6_fopox', 'anl4_cfi_low / fnd6_newa1v1300_gp', 'anl4_cfi_low / fnd6_newa2v1300_ni', 'anl4_cfi_low / fnd6_newa2v1300_oiadp', 'anl4_cfi_low / fnd6_newa2v1300_oibdp', 'anl4_cfi_low / fnd6_newqv1300_ivltq', 'anl4_cfi_low / fnd6_newqv1300_lltq', 'anl4_cfi_low / fnd6_newqv1300_recdq', 'anl4_cfi_low / fnd6_niadj', 'anl4_cfi_low / fnd6_recd', 'anl4_cfi_low / income', 'anl4_cfi_low / mdl38_iv_year_div', 'anl4_cfi_low / star_val_earnings_projection_fy1', 'anl4_cfi_low / star_val_earnings_projection_fy10', 'anl4_cfi_low / star_val_earnings_projection_fy11', 'anl4_cfi_low / star_val_earnings_projection_fy12', 'anl4_cfi_low / star_val_earnings_projection_fy15', 'anl4_cfi_low / star_val_earnings_projection_fy2', 'anl4_cfi_low / star_val_earnings_projection_fy3', 'anl4_cfi_low / star_val_earnings_projection_fy4', 'anl4_cfi_low / star_val_earnings_projection_fy5', 'anl4_cfi_low / star_val_earnings_projection_fy6', 'anl4_cfi_low / star_val_earnings_projection_fy7', 'anl4_cfi_low / star_val_earnings_projection_fy8', 'anl4_cfi_low / star_val_earnings_projection_fy9', 'anl4_cfi_low / opt6_xpslcm1', 'anl4_cfi_low / pv13_revere_index_value', 'anl4_cfi_low / pv13_revere_key_sector_total', 'anl4_cfi_low / pv13_revere_term_sector_total', 'anl4_cfi_low / rel_num_comp', 'anl4_cfi_low / rel_num_part', 'anl4_cfi_median / anl4_cfo_median', 'anl4_cfi_median / anl4_ebitda_low', 'anl4_cfi_median / anl4_fcf_low', 'anl4_cfi_median / anl4_fcf_median', 'anl4_cfi_median / anl4_netprofit_low', 'anl4_cfi_median / anl4_netprofita_low', 'anl4_cfi_median / anl4_netprofita_median', 'anl4_cfi_median / anl4_ptp_low', 'anl4_cfi_median / anl4_ptp_median', 'anl4_cfi_median / cashflow', 'anl4_cfi_median / fnd6_dcvt', 'anl4_cfi_median / fnd6_dd5', 'anl4_cfi_median / fnd6_newa2v1300_oiadp', 'anl4_cfi_median / fnd6_newa2v1300_oibdp', 'anl4_cfi_median / star_val_earnings_projection_fy1', 'anl4_cfi_median / star_val_earnings_projection_fy2', 'anl4_cfi_median / star_val_earnings_projection_fy3', 'anl4_cfi_median / star_val_earnings_projection_fy4', 'anl4_cfi_median / star_val_earnings_projection_fy5', 'anl4_cfi_median / star_val_earnings_projection_fy9', 'anl4_cfi_median / opt6_xpslcy1', 'anl4_cfi_value / anl4_fcf_low', 'anl4_cfi_value / anl4_netprofit_low', 'anl4_cfi_value / anl4_ptp_low', 'anl4_cfo_high / anl4_cfo_value', 'anl4_cfo_high / anl4_ebitda_low', 'anl4_cfo_high / anl4_netprofit_low', 'anl4_cfo_high / anl4_netprofit_median', 'anl4_cfo_high / anl4_netprofita_low', 'anl4_cfo_high / anl4_ptp_low', 'anl4_cfo_high / anl4_ptp_median', 'anl4_cfo_high / anl4_ptpr_low', 'anl4_cfo_high / anl4_totassets_low', 'anl4_cfo_high / fnd2_oprlsfmpdcurr', 'anl4_cfo_high / fnd6_dd2', 'anl4_cfo_high / fnd6_dd3', 'anl4_cfo_high / fnd6_dd5', 'anl4_cfo_high / fnd6_newa1v1300_dvc', 'anl4_cfo_high / fnd6_newa2v1300_oiadp', 'anl4_cfo_high / fnd6_newa2v1300_oibdp', 'anl4_cfo_high / fnd6_newqv1300_lltq', 'anl4_cfo_high / fnd6_newqv1300_recdq', 'anl4_cfo_high / fnd6_recd', 'anl4_cfo_high / fscore_profitability', 'anl4_cfo_high / mdl38_iv_year_div', 'anl4_cfo_high / star_val_earnings_projection_fy1', 'anl4_cfo_high / star_val_earnings_projection_fy2', 'anl4_cfo_high / star_val_earnings_projection_fy3', 'anl4_cfo_high / star_val_earnings_projection_fy4', 'anl4_cfo_high / star_val_earnings_projection_fy7', 'anl4_cfo_high / star_val_earnings_projection_fy8', 'anl4_cfo_high / star_val_earnings_projection_fy9', 'anl4_cfo_high / opt6_vimtaxp', 'anl4_cfo_high / opt6_xpslcy1', 'anl4_cfo_high / pv13_revere_company_total', 'anl4_cfo_high / pv13_revere_key_sector_total', 'anl4_cfo_high / pv13_revere_term_sector_total', 'anl4_cfo_low / anl4_ebit_low', 'anl4_cfo_low / anl4_ebitda_low', 'anl4_cfo_low / anl4_fcf_low', 'anl4_cfo_low / anl4_gric_low', 'anl4_cfo_low / anl4_netdebt_low', 'anl4_cfo_low / anl4_netprofit_low', 'anl4_cfo_low / anl4_netprofita_low', 'anl4_cfo_low / anl4_ptp_low', 'anl4_cfo_low / anl4_ptpr_low', 'anl4_cfo_low / est_ffo', 'anl4_cfo_low / fn_op_lease_min_pay_due_a', 'anl4_cfo_low / fn_op_lease_min_pay_due_in_2y_a', 'anl4_cfo_low / fnd2_a_ltrmdmrepoplinnext12m', 'anl4_cfo_low / fnd2_a_rvndm', 'anl4_cfo_low / fnd2_oprlsfmpdcurr', 'anl4_cfo_low / cashflow', 'anl4_cfo_low / debt', 'anl4_cfo_low / enterprise_value', 'anl4_cfo_low / fnd6_am', 'anl4_cfo_low / fnd6_beta', 'anl4_cfo_low / fnd6_dcvt', 'anl4_cfo_low / fnd6_dd1q', 'anl4_cfo_low / fnd6_dd2', 'anl4_cfo_low / fnd6_dd3', 'anl4_cfo_low / fnd6_dd4', 'anl4_cfo_low / fnd6_dd5', 'anl4_cfo_low / fnd6_ds', 'anl4_cfo_low / fnd6_dudd', 'anl4_cfo_low / fnd6_dvpa', 'anl4_cfo_low / fnd6_lcoxdr', 'anl4_cfo_low / fnd6_newa1v1300_dvc', 'anl4_cfo_low / fnd6_newa2v1300_oiadp', 'anl4_cfo_low / fnd6_newa2v1300_oibdp', 'anl4_cfo_low / fnd6_newa2v1300_ppent', 'anl4_cfo_low / fnd6_newqv1300_ivltq', 'anl4_cfo_low / fnd6_newqv1300_lltq', 'anl4_cfo_low / fnd6_newqv1300_rcpq', 'anl4_cfo_low / fnd6_newqv1300_recdq', 'anl4_cfo_low / fnd6_newqv1300_spcepq', 'anl4_cfo_low / fnd6_niadj', 'anl4_cfo_low / fnd6_npq', 'anl4_cfo_low / fnd6_pifo', 'anl4_cfo_low / fnd6_rea', 'anl4_cfo_low / fnd6_recd', 'anl4_cfo_low / fnd6_txpd', 'anl4_cfo_low / fnd6_xad', 'anl4_cfo_low / fnd6_xrent', 'anl4_cfo_low / income', 'anl4_cfo_low / fscore_profitability', 'anl4_cfo_low / mdl38_iv_discount_rate', 'anl4_cfo_low / mdl38_iv_div_payout_rate', 'anl4_cfo_low / mdl38_iv_year_div', 'anl4_cfo_low / star_val_dividend_projection_fy1', 'anl4_cfo_low / star_val_dividend_projection_fy11', 'anl4_cfo_low / star_val_dividend_projection_fy12', 'anl4_cfo_low / star_val_dividend_projection_fy15', 'anl4_cfo_low / star_val_dividend_projection_fy2', 'anl4_cfo_low / star_val_dividend_projection_fy3', 'anl4_cfo_low / star_val_dividend_projection_fy8', 'anl4_cfo_low / star_val_earnings_projection_fy1', 'anl4_cfo_low / star_val_earnings_projection_fy10', 'anl4_cfo_low / star_val_earnings_projection_fy11', 'anl4_cfo_low / star_val_earnings_projection_fy12', 'anl4_cfo_low / star_val_earnings_projection_fy13', 'anl4_cfo_low / star_val_earnings_projection_fy14', 'anl4_cfo_low / star_val_earnings_projection_fy15', 'anl4_cfo_low / star_val_earnings_projection_fy2', 'anl4_cfo_low / star_val_earnings_projection_fy3', 'anl4_cfo_low / star_val_earnings_projection_fy4', 'anl4_cfo_low / star_val_earnings_projection_fy5', 'anl4_cfo_low / star_val_earnings_projection_fy6', 'anl4_cfo_low / star_val_earnings_projection_fy7', 'anl4_cfo_low / star_val_earnings_projection_fy8', 'anl4_cfo_low / star_val_earnings_projection_fy9', 'anl4_cfo_low / news_dividend_yield', 'anl4_cfo_low / news_eod_vwap', 'anl4_cfo_low / news_open', 'anl4_cfo_low / news_pe_ratio', 'anl4_cfo_low / opt6_divamt', 'anl4_cfo_low / opt6_divfreq', 'anl4_cfo_low / opt6_slcxp', 'anl4_cfo_low / pv13_revere_company_total', 'anl4_cfo_low / pv13_revere_index_cap', 'anl4_cfo_low / pv13_revere_index_value', 'anl4_cfo_low / pv13_revere_key_sector_total', 'anl4_cfo_low / pv13_revere_term_sector_total', 'anl4_cfo_low / rel_num_comp', 'anl4_cfo_low / rel_num_cust', 'anl4_cfo_low / rel_num_part', 'anl4_cfo_low / dividend', 'anl4_cfo_median / anl4_fcf_low', 'anl4_cfo_median / anl4_fcf_median', 'anl4_cfo_median / anl4_median_capexp', 'anl4_cfo_median / anl4_medianepsbfam', 'anl4_cfo_median / anl4_netdebt_median', 'anl4_cfo_median / anl4_netprofit_median', 'anl4_cfo_median / anl4_netprofita_median', 'anl4_cfo_median / anl4_ptp_low', 'anl4_cfo_median / anl4_ptp_median', 'anl4_cfo_median / anl4_ptpr_median', 'anl4_cfo_median / anl4_totassets_median', 'anl4_cfo_median / fnd2_oprlsfmpdcurr', 'anl4_cfo_median / debt', 'anl4_cfo_median / enterprise_value', 'anl4_cfo_median / fnd6_dcvt', 'anl4_cfo_median / fnd6_dd1', 'anl4_cfo_median / fnd6_dd1q', 'anl4_cfo_median / fnd6_dd2', 'anl4_cfo_median / fnd6_dd3', 'anl4_cfo_median / fnd6_dd5', 'anl4_cfo_median / fnd6_dltr', 'anl4_cfo_median / fnd6_dudd', 'anl4_cfo_median / fnd6_fopo', 'anl4_cfo_median / fnd6_newa1v1300_gp', 'anl4_cfo_median / fnd6_newa2v1300_ni', 'anl4_cfo_median / fnd6_newa2v1300_oiadp', 'anl4_cfo_median / fnd6_newa2v1300_oibdp', 'anl4_cfo_median / fnd6_newa2v1300_ppent', 'anl4_cfo_median / fnd6_newqv1300_lltq', 'anl4_cfo_median / fnd6_rea', 'anl4_cfo_median / fnd6_recd', 'anl4_cfo_median / income', 'anl4_cfo_median / mdl38_iv_div_payout_rate', 'anl4_cfo_median / mdl38_iv_year_div', 'anl4_cfo_median / star_val_dividend_projection_fy1', 'anl4_cfo_median / star_val_dividend_projection_fy3', 'anl4_cfo_median / star_val_dividend_projection_fy8', 'anl4_cfo_median / star_val_dividend_projection_fy9', 'anl4_cfo_median / star_val_earnings_projection_fy1', 'anl4_cfo_median / star_val_earnings_projection_fy10', 'anl4_cfo_median / star_val_earnings_projection_fy12', 'anl4_cfo_median / star_val_earnings_projection_fy13', 'anl4_cfo_median / star_val_earnings_projection_fy14', 'anl4_cfo_median / star_val_earnings_projection_fy15', 'anl4_cfo_median / star_val_earnings_projection_fy2', 'anl4_cfo_median / star_val_earnings_projection_fy3', 'anl4_cfo_median / star_val_earnings_projection_fy4', 'anl4_cfo_median / star_val_earnings_projection_fy5', 'anl4_cfo_median / star_val_earnings_projection_fy6', 'anl4_cfo_median / star_val_earnings_projection_fy7', 'anl4_cfo_median / star_val_earnings_projection_fy8', 'anl4_cfo_median / star_val_earnings_projection_fy9', 'anl4_cfo_median / opt6_divamt', 'anl4_cfo_median / opt6_divfreq', 'anl4_cfo_median / opt6_slcxp', 'anl4_cfo_median / opt6_xpslcm1', 'anl4_cfo_median / opt6_xpslcy1', 'anl4_cfo_median / pv13_revere_index_value', 'anl4_cfo_median / pv13_revere_term_sector_total', 'anl4_cfo_median / dividend', 'anl4_cfo_value / anl4_ebit_low', 'anl4_cfo_value / anl4_ebitda_low', 'anl4_cfo_value / anl4_fcf_low', 'anl4_cfo_value / anl4_gric_low', 'anl4_cfo_value / anl4_netdebt_low', 'anl4_cfo_value / anl4_netprofit_low', 'anl4_cfo_value / anl4_netprofita_low', 'anl4_cfo_value / anl4_ptp_low', 'anl4_cfo_value / anl4_ptpr_low', 'anl4_cfo_value / fn_op_lease_rent_exp_a', 'anl4_cfo_value / fnd2_oprlsfmpdcurr', 'anl4_cfo_value / debt', 'anl4_cfo_value / fnd6_dcvt', 'anl4_cfo_value / fnd6_dd1', 'anl4_cfo_value / fnd6_dd2', 'anl4_cfo_value / fnd6_dd5', 'anl4_cfo_value / fnd6_lcoxdr', 'anl4_cfo_value / fnd6_newa1v1300_dvc', 'anl4_cfo_value / fnd6_newa2v1300_ni', 'anl4_cfo_value / fnd6_newa2v1300_oiadp', 'anl4_cfo_value / fnd6_newa2v1300_oibdp', 'anl4_cfo_value / fnd6_newqv1300_lltq', 'anl4_cfo_value / fnd6_newqv1300_recdq', 'anl4_cfo_value / fnd6_niadj', 'anl4_cfo_value / fnd6_recd', 'anl4_cfo_value / income', 'anl4_cfo_value / mdl38_iv_year_div', 'anl4_cfo_value / star_val_earnings_projection_fy1', 'anl4_cfo_value / pv13_revere_term_sector_total', 'anl4_cfo_value / rel_num_cust', 'anl4_cfo_value / rel_num_part', 'anl4_dts_ptp / anl4_ebitda_high', 'anl4_dts_ptp / anl4_ebitda_low', 'anl4_dts_ptp / anl4_ebitda_std', 'anl4_dts_ptp / fnd6_dltr', 'anl4_dts_ptp / fnd6_ds', 'anl4_dts_ptp / fnd6_fopo', 'anl4_dts_ptp / fnd6_newa2v1300_oiadp', 'anl4_dts_ptp / fnd6_newa2v1300_oibdp', 'anl4_dts_ptp / fnd6_newqv1300_recdq', 'anl4_dts_ptp / fnd6_recd', 'anl4_dts_ptp / star_val_earnings_projection_fy1', 'anl4_dts_ptp / pv13_revere_term_sector_total', 'anl4_dts_ptp / rel_num_part', 'anl4_ebit_high / anl4_ebitda_low', 'anl4_ebit_high / anl4_medianepsbfam', 'anl4_ebit_high / anl4_ptp_low', 'anl4_ebit_high / anl4_totassets_low', 'anl4_ebit_high / enterprise_value', 'anl4_ebit_high / fnd6_dudd', 'anl4_ebit_high / fnd6_newa2v1300_oibdp', 'anl4_ebit_high / fnd6_newqv1300_recdq', 'anl4_ebit_high / fnd6_pifo', 'anl4_ebit_high / fnd6_rea', 'anl4_ebit_high / fnd6_recd', 'anl4_ebit_high / mdl38_iv_discount_rate', 'anl4_ebit_high / star_val_earnings_projection_fy4', 'anl4_ebit_low / anl4_ebitda_low', 'anl4_ebit_low / anl4_fcf_low', 'anl4_ebit_low / anl4_netprofita_low', 'anl4_ebit_low / anl4_ptp_low', 'anl4_ebit_low / anl4_ptpr_low', 'anl4_ebit_low / anl4_totassets_low', 'anl4_ebit_low / fn_op_lease_rent_exp_a', 'anl4_ebit_low / fnd2_a_rvndm', 'anl4_ebit_low / cashflow', 'anl4_ebit_low / enterprise_value', 'anl4_ebit_low / fnd6_acqintan', 'anl4_ebit_low / fnd6_beta', 'anl4_ebit_low / fnd6_dcvsub', 'anl4_ebit_low / fnd6_dcvt', 'anl4_ebit_low / fnd6_dd3', 'anl4_ebit_low / fnd6_dd4', 'anl4_ebit_low / fnd6_dltr', 'anl4_ebit_low / fnd6_dudd', 'anl4_ebit_low / fnd6_fopo', 'anl4_ebit_low / fnd6_newa2v1300_oiadp', 'anl4_ebit_low / fnd6_newa2v1300_oibdp', 'anl4_ebit_low / fnd6_newa2v1300_ppent', 'anl4_ebit_low / fnd6_newa2v1300_xsga', 'anl4_ebit_low / fnd6_newqv1300_ivltq', 'anl4_ebit_low / fnd6_newqv1300_rcpq', 'anl4_ebit_low / fnd6_newqv1300_recdq', 'anl4_ebit_low / fnd6_pifo', 'anl4_ebit_low / fnd6_recd', 'anl4_ebit_low / fnd6_xad', 'anl4_ebit_low / fnd6_xrent', 'anl4_ebit_low / fscore_quality', 'anl4_ebit_low / mdl38_iv_discount_rate', 'anl4_ebit_low / star_val_earnings_projection_fy1', 'anl4_ebit_low / star_val_earnings_projection_fy11', 'anl4_ebit_low / star_val_earnings_projection_fy12', 'anl4_ebit_low / star_val_earnings_projection_fy13', 'anl4_ebit_low / star_val_earnings_projection_fy14', 'anl4_ebit_low / star_val_earnings_projection_fy15', 'anl4_ebit_low / star_val_earnings_projection_fy2', 'anl4_ebit_low / star_val_earnings_projection_fy3', 'anl4_ebit_low / star_val_earnings_projection_fy4', 'anl4_ebit_low / star_val_earnings_projection_fy5', 'anl4_ebit_low / star_val_earnings_projection_fy6', 'anl4_ebit_low / star_val_earnings_projection_fy7', 'anl4_ebit_low / star_val_earnings_projection_fy8', 'anl4_ebit_low / star_val_earnings_projection_fy9', 'anl4_ebit_low / news_eod_close', 'anl4_ebit_low / news_eod_vwap', 'anl4_ebit_low / news_open', 'anl4_ebit_low / opt6_slcxp', 'anl4_ebit_low / pv13_revere_company_total', 'anl4_ebit_low / pv13_revere_index_value', 'anl4_ebit_low / pv13_revere_key_sector_total', 'anl4_ebit_low / pv13_revere_term_sector_total', 'anl4_ebit_low / rel_num_comp', 'anl4_ebit_low / rel_num_cust', 'anl4_ebit_low / rel_num_part', 'anl4_ebit_low / split', 'anl4_ebit_median / anl4_fcf_median', 'anl4_ebit_median / anl4_gric_high', 'anl4_ebit_median / anl4_ptp_low', 'anl4_ebit_median / anl4_ptp_median', 'anl4_ebit_median / anl4_ptpr_low', 'anl4_ebit_median / cashflow', 'anl4_ebit_median / fnd6_dcvt', 'anl4_ebit_median / fnd6_dd', 'anl4_ebit_median / fnd6_dltr', 'anl4_ebit_median / fnd6_dn', 'anl4_ebit_median / fnd6_dudd', 'anl4_ebit_median / fnd6_newqv1300_recdq', 'anl4_ebit_median / fnd6_rea', 'anl4_ebit_median / fnd6_recd', 'anl4_ebit_median / fscore_quality', 'anl4_ebit_median / mdl38_iv_div_payout_rate', 'anl4_ebit_median / star_val_earnings_projection_fy1', 'anl4_ebit_median / star_val_earnings_projection_fy4', 'anl4_ebit_median / star_val_earnings_projection_fy6', 'anl4_ebit_median / news_eod_close', 'anl4_ebit_median / opt6_slcxp', 'anl4_ebit_number / fnd6_recd', 'anl4_ebit_std / anl4_ebitda_low', 'anl4_ebit_std / anl4_fcf_low', 'anl4_ebit_std / anl4_ptp_low', 'anl4_ebit_std / fnd6_newqv1300_recdq', 'anl4_ebit_std / fnd6_pifo', 'anl4_ebit_std / fnd6_recd', 'anl4_ebit_value / anl4_ebitda_low', 'anl4_ebit_value / anl4_fcf_low', 'anl4_ebit_value / anl4_netprofit_low', 'anl4_ebit_value / anl4_ptp_low', 'anl4_ebit_value / anl4_ptpr_low', 'anl4_ebit_value / cashflow', 'anl4_ebit_value / debt', 'anl4_ebit_value / enterprise_value', 'anl4_ebit_value / fnd6_acqintan', 'anl4_ebit_value / fnd6_dcvt', 'anl4_ebit_value / fnd6_ds', 'anl4_ebit_value / fnd6_dudd', 'anl4_ebit_value / fnd6_newa2v1300_oiadp', 'anl4_ebit_value / fnd6_newa2v1300_oibdp', 'anl4_ebit_value / fnd6_newa2v1300_ppent', 'anl4_ebit_value / fnd6_newqv1300_lltq', 'anl4_ebit_value / fnd6_newqv1300_recdq', 'anl4_ebit_value / fnd6_recd', 'anl4_ebit_value / fnd6_txdbclq', 'anl4_ebit_value / fscore_quality', 'anl4_ebit_value / mdl38_iv_discount_rate', 'anl4_ebit_value / star_val_earnings_projection_fy1', 'anl4_ebit_value / star_val_earnings_projection_fy8', 'anl4_ebit_value / pv13_revere_term_sector_total', 'anl4_ebit_value / rel_num_part', 'anl4_ebitda_flag / fnd6_newa2v1300_ppent', 'anl4_ebitda_high / anl4_fcf_low', 'anl4_ebitda_high / anl4_gric_low', 'anl4_ebitda_high / anl4_netdebt_low', 'anl4_ebitda_high / anl4_netprofita_low', 'anl4_ebitda_high / anl4_ptp_low', 'anl4_ebitda_high / anl4_ptpr_low', 'anl4_ebitda_high / anl4_totassets_low', 'anl4_ebitda_high / est_ffo', 'anl4_ebitda_high / fn_op_lease_rent_exp_a', 'anl4_ebitda_high / fnd2_a_rvndm', 'anl4_ebitda_high / cashflow', 'anl4_ebitda_high / debt', 'anl4_ebitda_high / enterprise_value', 'anl4_ebitda_high / fnd6_beta', 'anl4_ebitda_high / fnd6_dcvt', 'anl4_ebitda_high / fnd6_dd', 'anl4_ebitda_high / fnd6_dd2', 'anl4_ebitda_high / fnd6_dd3', 'anl4_ebitda_high / fnd6_dd4', 'anl4_ebitda_high / fnd6_dd5', 'anl4_ebitda_high / fnd6_dltr', 'anl4_ebitda_high / fnd6_dn', 'anl4_ebitda_high / fnd6_ds', 'anl4_ebitda_high / fnd6_dudd', 'anl4_ebitda_high / fnd6_newa1v1300_gp', 'anl4_ebitda_high / fnd6_newa2v1300_oiadp', 'anl4_ebitda_high / fnd6_newa2v1300_oibdp', 'anl4_ebitda_high / fnd6_newa2v1300_ppent', 'anl4_ebitda_high / fnd6_newa2v1300_xsga', 'anl4_ebitda_high / fnd6_newqv1300_cshfdq', 'anl4_ebitda_high / fnd6_newqv1300_rcpq', 'anl4_ebitda_high / fnd6_newqv1300_recdq', 'anl4_ebitda_high / fnd6_newqv1300_spcep12', 'anl4_ebitda_high / fnd6_rea', 'anl4_ebitda_high / fnd6_recd', 'anl4_ebitda_high / fscore_quality', 'anl4_ebitda_high / mdl38_iv_discount_rate', 'anl4_ebitda_high / mdl38_iv_div_payout_rate', 'anl4_ebitda_high / mdl38_iv_growth_ear', 'anl4_ebitda_high / star_val_earnings_projection_fy1', 'anl4_ebitda_high / star_val_earnings_projection_fy10', 'anl4_ebitda_high / star_val_earnings_projection_fy11', 'anl4_ebitda_high / star_val_earnings_projection_fy12', 'anl4_ebitda_high / star_val_earnings_projection_fy13', 'anl4_ebitda_high / star_val_earnings_projection_fy14', 'anl4_ebitda_high / star_val_earnings_projection_fy15', 'anl4_ebitda_high / star_val_earnings_projection_fy2', 'anl4_ebitda_high / star_val_earnings_projection_fy3', 'anl4_ebitda_high / star_val_earnings_projection_fy4', 'anl4_ebitda_high / star_val_earnings_projection_fy5', 'anl4_ebitda_high / star_val_earnings_projection_fy6', 'anl4_ebitda_high / star_val_earnings_projection_fy7', 'anl4_ebitda_high / star_val_earnings_projection_fy8', 'anl4_ebitda_high / star_val_earnings_projection_fy9', 'anl4_ebitda_high / news_pe_ratio', 'anl4_ebitda_high / opt6_slcxp', 'anl4_ebitda_high / pv13_revere_company_total', 'anl4_ebitda_high / pv13_revere_index_value', 'anl4_ebitda_high / pv13_revere_term_sector_total', 'anl4_ebitda_high / rel_num_comp', 'anl4_ebitda_high / rel_num_cust', 'anl4_ebitda_high / rel_num_part', 'anl4_ebitda_high / split', 'anl4_ebitda_low / anl4_fcf_low', 'anl4_ebitda_low / anl4_gric_low', 'anl4_ebitda_low / anl4_netdebt_low', 'anl4_ebitda_low / anl4_netprofita_low', 'anl4_ebitda_low / anl4_ptp_low', 'anl4_ebitda_low / anl4_ptpr_low', 'anl4_ebitda_low / anl4_totassets_low', 'anl4_ebitda_low / est_ffo', 'anl4_ebitda_low / fn_op_lease_min_pay_due_in_3y_a', 'anl4_ebitda_low / fn_op_lease_rent_exp_a', 'anl4_ebitda_low / fnd2_a_rvndm', 'anl4_ebitda_low / fnd2_asdm', 'anl4_ebitda_low / cashflow', 'anl4_ebitda_low / debt', 'anl4_ebitda_low / enterprise_value', 'anl4_ebitda_low / fnd6_acqintan', 'anl4_ebitda_low / fnd6_aox', 'anl4_ebitda_low / fnd6_dcvsub', 'anl4_ebitda_low / fnd6_dcvt', 'anl4_ebitda_low / fnd6_dd', 'anl4_ebitda_low / fnd6_dd2', 'anl4_ebitda_low / fnd6_dd3', 'anl4_ebitda_low / fnd6_dd4', 'anl4_ebitda_low / fnd6_dd5', 'anl4_ebitda_low / fnd6_dltr', 'anl4_ebitda_low / fnd6_dn', 'anl4_ebitda_low / fnd6_ds', 'anl4_ebitda_low / fnd6_dudd', 'anl4_ebitda_low / fnd6_fopo', 'anl4_ebitda_low / fnd6_lcoxdr', 'anl4_ebitda_low / fnd6_newa1v1300_gp', 'anl4_ebitda_low / fnd6_newa2v1300_oiadp', 'anl4_ebitda_low / fnd6_newa2v1300_oibdp', 'anl4_ebitda_low / fnd6_newa2v1300_ppent', 'anl4_ebitda_low / fnd6_newa2v1300_xsga', 'anl4_ebitda_low / fnd6_newqv1300_lltq', 'anl4_ebitda_low / fnd6_newqv1300_rcpq', 'anl4_ebitda_low / fnd6_newqv1300_recdq', 'anl4_ebitda_low / fnd6_newqv1300_reunaq', 'anl4_ebitda_low / fnd6_optca', 'anl4_ebitda_low / fnd6_pifo', 'anl4_ebitda_low / fnd6_recd', 'anl4_ebitda_low / fnd6_xad', 'anl4_ebitda_low / fnd6_xrent', 'anl4_ebitda_low / sales_ps', 'anl4_ebitda_low / mdl38_iv_discount_rate', 'anl4_ebitda_low / mdl38_iv_div_payout_rate', 'anl4_ebitda_low / star_val_earnings_projection_fy1', 'anl4_ebitda_low / star_val_earnings_projection_fy10', 'anl4_ebitda_low / star_val_earnings_projection_fy11', 'anl4_ebitda_low / star_val_earnings_projection_fy12', 'anl4_ebitda_low / star_val_earnings_projection_fy13', 'anl4_ebitda_low / star_val_earnings_projection_fy14', 'anl4_ebitda_low / star_val_earnings_projection_fy15', 'anl4_ebitda_low / star_val_earnings_projection_fy2', 'anl4_ebitda_low / star_val_earnings_projection_fy3', 'anl4_ebitda_low / star_val_earnings_projection_fy4', 'anl4_ebitda_low / star_val_earnings_projection_fy5', 'anl4_ebitda_low / star_val_earnings_projection_fy6', 'anl4_ebitda_low / star_val_earnings_projection_fy7', 'anl4_ebitda_low / star_val_earnings_projection_fy8', 'anl4_ebitda_low / star_val_earnings_projection_fy9', 'anl4_ebitda_low / star_val_piv_ratio', 'anl4_ebitda_low / news_eod_close', 'anl4_ebitda_low / news_open', 'anl4_ebitda_low / pv13_revere_company_total', 'anl4_ebitda_low / pv13_revere_index_value', 'anl4_ebitda_low / pv13_revere_key_sector_total', 'anl4_ebitda_low / pv13_revere_term_sector_total', 'anl4_ebitda_low / rel_num_all', 'anl4_ebitda_low / rel_num_comp', 'anl4_ebitda_low / rel_num_cust', 'anl4_ebitda_low / rel_num_part', 'anl4_ebitda_low / split', 'anl4_ebitda_number / fnd6_recd', 'anl4_ebitda_std / anl4_fcf_low', 'anl4_ebitda_std / anl4_totassets_median', 'anl4_ebitda_std / enterprise_value', 'anl4_ebitda_std / fnd6_dcvt', 'anl4_ebitda_std / fnd6_newa2v1300_oibdp', 'anl4_ebitda_std / fnd6_newqv1300_recdq', 'anl4_ebitda_std / fnd6_pifo', 'anl4_ebitda_std / fnd6_recd', 'anl4_ebitda_std / opt6_slcxp', 'anl4_ebitda_std / pv13_revere_term_sector_total', 'anl4_ebitda_std / rel_num_part', 'anl4_ebitda_value / anl4_fcf_low', 'anl4_ebitda_value / anl4_medianepsbfam', 'anl4_ebitda_value / anl4_netdebt_low', 'anl4_ebitda_value / anl4_netprofit_low', 'anl4_ebitda_value / anl4_netprofita_low', 'anl4_ebitda_value / anl4_ptp_low', 'anl4_ebitda_value / anl4_ptpr_low', 'anl4_ebitda_value / anl4_rd_exp_low', 'anl4_ebitda_value / anl4_totassets_low', 'anl4_ebitda_value / est_ffo', 'anl4_ebitda_value / fn_op_lease_rent_exp_a', 'anl4_ebitda_value / fnd2_a_rvndm', 'anl4_ebitda_value / fnd2_oprlsfmpdcurr', 'anl4_ebitda_value / cashflow', 'anl4_ebitda_value / debt', 'anl4_ebitda_value / enterprise_value', 'anl4_ebitda_value / fnd6_dcvt', 'anl4_ebitda_value / fnd6_dd', 'anl4_ebitda_value / fnd6_dd3', 'anl4_ebitda_value / fnd6_dd4', 'anl4_ebitda_value / fnd6_dd5', 'anl4_ebitda_value / fnd6_ds', 'anl4_ebitda_value / fnd6_dudd', 'anl4_ebitda_value / fnd6_fatc', 'anl4_ebitda_value / fnd6_newa1v1300_cshfd', 'anl4_ebitda_value / fnd6_newa2v1300_oiadp', 'anl4_ebitda_value / fnd6_newa2v1300_oibdp', 'anl4_ebitda_value / fnd6_newa2v1300_ppent', 'anl4_ebitda_value / fnd6_newa2v1300_xsga', 'anl4_ebitda_value / fnd6_newqv1300_rcpq', 'anl4_ebitda_value / fnd6_newqv1300_recdq', 'anl4_ebitda_value / fnd6_optca', 'anl4_ebitda_value / fnd6_rea', 'anl4_ebitda_value / fnd6_recd', 'anl4_ebitda_value / fnd6_xad', 'anl4_ebitda_value / fscore_profitability', 'anl4_ebitda_value / fscore_quality', 'anl4_ebitda_value / mdl38_iv_discount_rate', 'anl4_ebitda_value / star_val_earnings_projection_fy1', 'anl4_ebitda_value / star_val_earnings_projection_fy13', 'anl4_ebitda_value / star_val_earnings_projection_fy8', 'anl4_ebitda_value / pv13_revere_term_sector_total', 'anl4_ebitda_value / rel_num_cust', 'anl4_ebitda_value / rel_num_part', 'anl4_epsr_flag / split', 'anl4_epsr_high / anl4_epsr_low', 'anl4_epsr_high / anl4_median_epsreported', 'anl4_epsr_low / anl4_median_epsreported', 'anl4_epsr_value / news_eod_close', 'anl4_epsr_value / news_pe_ratio', 'anl4_fcf_high / anl4_fcf_low', 'anl4_fcf_high / anl4_fcf_median', 'anl4_fcf_high / anl4_fcfps_median', 'anl4_fcf_high / anl4_gric_low', 'anl4_fcf_high / anl4_netprofit_low', 'anl4_fcf_high / anl4_ptp_low', 'anl4_fcf_high / fnd2_a_restructuringcharges', 'anl4_fcf_high / debt', 'anl4_fcf_high / enterprise_value', 'anl4_fcf_high / fnd6_beta', 'anl4_fcf_high / fnd6_dd2', 'anl4_fcf_high / fnd6_dd3', 'anl4_fcf_high / fnd6_dd5', 'anl4_fcf_high / fnd6_dltr', 'anl4_fcf_high / fnd6_dudd', 'anl4_fcf_high / fnd6_newa2v1300_ppent', 'anl4_fcf_high / fnd6_newqv1300_ivltq', 'anl4_fcf_high / fnd6_newqv1300_recdq', 'anl4_fcf_high / fnd6_rea', 'anl4_fcf_high / fnd6_recd', 'anl4_fcf_high / income', 'anl4_fcf_high / star_val_dividend_projection_fy1', 'anl4_fcf_high / star_val_earnings_projection_fy1', 'anl4_fcf_high / star_val_earnings_projection_fy10', 'anl4_fcf_high / star_val_earnings_projection_fy12', 'anl4_fcf_high / star_val_earnings_projection_fy13', 'anl4_fcf_high / star_val_earnings_projection_fy2', 'anl4_fcf_high / star_val_earnings_projection_fy4', 'anl4_fcf_high / star_val_earnings_projection_fy6', 'anl4_fcf_high / star_val_earnings_projection_fy7', 'anl4_fcf_high / star_val_earnings_projection_fy8', 'anl4_fcf_high / news_cap', 'anl4_fcf_high / news_open', 'anl4_fcf_high / opt6_slcxp', 'anl4_fcf_high / opt6_xpslcy1', 'anl4_fcf_high / pv13_revere_company_total', 'anl4_fcf_high / pv13_revere_index_value', 'anl4_fcf_high / pv13_revere_term_sector_total', 'anl4_fcf_high / rel_num_cust', 'anl4_fcf_low / anl4_gric_low', 'anl4_fcf_low / anl4_netprofit_low', 'anl4_fcf_low / anl4_netprofita_low', 'anl4_fcf_low / anl4_ptp_low', 'anl4_fcf_low / anl4_ptpr_low', 'anl4_fcf_low / cashflow', 'anl4_fcf_low / enterprise_value', 'anl4_fcf_low / fnd6_dd2', 'anl4_fcf_low / fnd6_dd3', 'anl4_fcf_low / fnd6_dd5', 'anl4_fcf_low / fnd6_dltr', 'anl4_fcf_low / fnd6_newa2v1300_oiadp', 'anl4_fcf_low / fnd6_newa2v1300_oibdp', 'anl4_fcf_low / fnd6_newqv1300_ivltq', 'anl4_fcf_low / fnd6_newqv1300_recdq', 'anl4_fcf_low / fnd6_rea', 'anl4_fcf_low / fnd6_recd', 'anl4_fcf_low / fnd6_xad', 'anl4_fcf_low / income', 'anl4_fcf_low / fscore_profitability', 'anl4_fcf_low / mdl38_iv_year_div', 'anl4_fcf_low / star_val_dividend_projection_fy1', 'anl4_fcf_low / star_val_dividend_projection_fy11', 'anl4_fcf_low / star_val_dividend_projection_fy4', 'anl4_fcf_low / star_val_dividend_projection_fy8', 'anl4_fcf_low / star_val_earnings_projection_fy1', 'anl4_fcf_low / star_val_earnings_projection_fy10', 'anl4_fcf_low / star_val_earnings_projection_fy11', 'anl4_fcf_low / star_val_earnings_projection_fy12', 'anl4_fcf_low / star_val_earnings_projection_fy13', 'anl4_fcf_low / star_val_earnings_projection_fy14', 'anl4_fcf_low / star_val_earnings_projection_fy15', 'anl4_fcf_low / star_val_earnings_projection_fy2', 'anl4_fcf_low / star_val_earnings_projection_fy3', 'anl4_fcf_low / star_val_earnings_projection_fy4', 'anl4_fcf_low / star_val_earnings_projection_fy5', 'anl4_fcf_low / star_val_earnings_projection_fy7', 'anl4_fcf_low / star_val_earnings_projection_fy8', 'anl4_fcf_low / star_val_earnings_projection_fy9', 'anl4_fcf_low / news_open', 'anl4_fcf_low / news_ton_last', 'anl4_fcf_low / opt6_divamt', 'anl4_fcf_low / opt6_iratelt', 'anl4_fcf_low / opt6_slcxp', 'anl4_fcf_low / pv13_revere_company_total', 'anl4_fcf_low / pv13_revere_key_sector_total', 'anl4_fcf_low / pv13_revere_term_sector_total', 'anl4_fcf_low / rel_num_comp', 'anl4_fcf_low / rel_num_cust', 'anl4_fcf_low / rel_num_part', 'anl4_fcf_low / dividend', 'anl4_fcf_low / sharesout', 'anl4_fcf_median / anl4_fcf_value', 'anl4_fcf_median / anl4_gric_low', 'anl4_fcf_median / anl4_netprofit_low', 'anl4_fcf_median / anl4_netprofit_median', 'anl4_fcf_median / anl4_netprofita_median', 'anl4_fcf_median / anl4_ptp_low', 'anl4_fcf_median / fnd2_oprlsfmpdcurr', 'anl4_fcf_median / cashflow', 'anl4_fcf_median / enterprise_value', 'anl4_fcf_median / fnd6_dcvt', 'anl4_fcf_median / fnd6_dd2', 'anl4_fcf_median / fnd6_dd5', 'anl4_fcf_median / fnd6_newa1v1300_cshfd', 'anl4_fcf_median / fnd6_newa1v1300_dvc', 'anl4_fcf_median / fnd6_newa2v1300_oiadp', 'anl4_fcf_median / fnd6_newqv1300_recdq', 'anl4_fcf_median / fnd6_rea', 'anl4_fcf_median / fnd6_recd', 'anl4_fcf_median / fscore_profitability', 'anl4_fcf_median / mdl38_iv_discount_rate', 'anl4_fcf_median / mdl38_iv_div_payout_rate', 'anl4_fcf_median / mdl38_iv_year_div', 'anl4_fcf_median / star_val_dividend_projection_fy1', 'anl4_fcf_median / star_val_dividend_projection_fy2', 'anl4_fcf_median / star_val_earnings_projection_fy1', 'anl4_fcf_median / star_val_earnings_projection_fy10', 'anl4_fcf_median / star_val_earnings_projection_fy11', 'anl4_fcf_median / star_val_earnings_projection_fy13', 'anl4_fcf_median / star_val_earnings_projection_fy2', 'anl4_fcf_median / star_val_earnings_projection_fy3', 'anl4_fcf_median / star_val_earnings_projection_fy4', 'anl4_fcf_median / star_val_earnings_projection_fy6', 'anl4_fcf_median / star_val_earnings_projection_fy7', 'anl4_fcf_median / star_val_earnings_projection_fy8', 'anl4_fcf_median / star_val_earnings_projection_fy9', 'anl4_fcf_median / news_cap', 'anl4_fcf_median / news_open', 'anl4_fcf_median / opt6_iratelt', 'anl4_fcf_median / opt6_xpslcm1', 'anl4_fcf_median / pv13_revere_index_cap', 'anl4_fcf_median / rel_num_cust', 'anl4_fcf_median / rel_num_part', 'anl4_fcf_median / dividend', 'anl4_fcf_number / fnd6_recd']
+# 推荐的 fields 存在 recommended_fields.txt 里("# 名称" 开头分组，每行一个表达式)，
+# 第一次用到时才读，import 本模块不需要解析整张表
+RECOMMENDED_FIELDS_PATH = os.path.join(os.path.dirname(__file__), 'recommended_fields.txt')
 
+__all__ = ['RECOMMENDED_FIELDS_PATH', 'recommended_fields', 'recommended_field_sets']
+
+_FIELD_RE = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
+
+@functools.lru_cache(maxsize=None)
+def _load(path=RECOMMENDED_FIELDS_PATH):
+    sets = {}
+    current = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('#'):
+                current = sets.setdefault(line[1:].strip(), [])
+            else:
+                current.append(line)
+    return {name: tuple(items) for name, items in sets.items()}
+
+
+def recommended_field_sets():
+    return list(_load())
+
+
+def recommended_fields(name='recommended_fields_1', prefix='', fields=None):
+    """
+    返回推荐字段列表。
+    prefix: 只保留用到了以 prefix 开头的字段的表达式，如 'anl4'、'fnd6'
+    fields: 字段 id 的集合(如 get_datafields(...)['id'])，只保留所有字段都在里面的表达式，用来按数据集筛选
+    """
+    items = _load()[name]
+    if not prefix and fields is None:
+        return list(items)
+    fields = set(fields) if fields is not None else None
+    result = []
+    for expr in items:
+        used = _FIELD_RE.findall(expr)
+        if prefix and not any(field.startswith(prefix) for field in used):
+            continue
+        if fields is not None and not all(field in fields for field in used):
+            continue
+        result.append(expr)
+    return result
+
+
+def __getattr__(name):
+    # 兼容原来的 from fields import recommended_fields_1
+    if name.startswith('recommended_fields_') and name in _load():
+        return list(_load()[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
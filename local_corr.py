@@ -0,0 +1,491 @@
+import asyncio
+import json
+import os
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from config import CORR_PATH, PNL_PATH
+from machine_lib import brain_api_url, brain_wait
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path):
+    """
+    跨进程的排他文件锁(check.py 和 submit_alpha.py 同时运行时共用同一份矩阵)
+    """
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class PnlCache:
+    """
+    alpha 日 PnL(/alphas/{id}/recordsets/pnl)的本地缓存，每个 alpha 一个 .npy(2×T：日期的天数 + 累计 pnl)，
+    读一个文件只要几十微秒。
+    候选 alpha 的 IS PnL 不会再变，只下载一次；已提交 alpha 的 PnL 会随时间变长，可以用 ttl 定期重新下载
+    """
+
+    def __init__(self, path=PNL_PATH):
+        self.path = path
+
+    def path_of(self, alpha_id):
+        return os.path.join(self.path, alpha_id + '.npy')
+
+    def is_fresh(self, alpha_id, ttl=None):
+        path = self.path_of(alpha_id)
+        if not os.path.exists(path):
+            return False
+        return ttl is None or time.time() - os.path.getmtime(path) < ttl
+
+    def arrays(self, alpha_id):
+        """
+        返回 (日期 datetime64[D] 数组, 累计 pnl 数组)，没缓存时返回 None
+        """
+        path = self.path_of(alpha_id)
+        if not os.path.exists(path):
+            return None
+        data = np.load(path)
+        return data[0].astype('int64').astype('datetime64[D]'), data[1]
+
+    def get(self, alpha_id):
+        """
+        返回以日期为索引的累计 pnl Series，没缓存时返回 None
+        """
+        arrays = self.arrays(alpha_id)
+        if arrays is None:
+            return None
+        dates, pnl = arrays
+        return pd.Series(pnl, index=pd.to_datetime(dates), name=alpha_id)
+
+    def put(self, alpha_id, json_data):
+        """
+        保存 recordsets/pnl 的返回，没有记录时返回 False
+        """
+        if not json_data or not json_data.get("records"):
+            return False
+        columns = [dct["name"] for dct in json_data["schema"]["properties"]]
+        df = pd.DataFrame(json_data["records"], columns=columns)
+        dates = pd.to_datetime(df["date"]).values.astype('datetime64[D]')
+        tmp_path = self.path_of(alpha_id) + '.tmp.npy'
+        np.save(tmp_path, np.vstack([dates.astype('int64'), df["pnl"].astype(float).values]))
+        os.replace(tmp_path, self.path_of(alpha_id))
+        return True
+
+    def fetch_sync(self, s, alpha_id, ttl=None):
+        """
+        同步下载一个 alpha 的 PnL(已缓存且没超过 ttl 时不下载)，返回是否有 PnL
+        """
+        if self.is_fresh(alpha_id, ttl):
+            return True
+        return self.put(alpha_id, brain_wait(s, f"{brain_api_url}/alphas/{alpha_id}/recordsets/pnl").json())
+
+    async def fetch(self, client, alpha_ids, ttl=None):
+        """
+        下载还没缓存(或超过 ttl 秒)的 alpha 的 PnL，轮询交给 client.poller 统一调度，返回下载的个数
+        """
+        todo = [alpha_id for alpha_id in dict.fromkeys(alpha_ids) if not self.is_fresh(alpha_id, ttl)]
+        if not todo:
+            return 0
+        print(f"Downloading PnL of {len(todo)} alphas")
+
+        async def fetch_one(alpha_id):
+            try:
+                json_data = await client.poller.watch(f"{brain_api_url}/alphas/{alpha_id}/recordsets/pnl")
+                return self.put(alpha_id, json_data)
+            except Exception as e:
+                print(f"Failed to download PnL of {alpha_id}: {e}")
+                return False
+
+        results = await asyncio.gather(*[fetch_one(alpha_id) for alpha_id in todo])
+        return sum(results)
+
+
+class SelfCorrelationEngine:
+    """
+    本地 self correlation：把已提交 alpha 池最近 years 年的日收益(累计 pnl 的差分)标准化成 T×N 矩阵，
+    候选 alpha 同样标准化成 T×M，一次矩阵乘法得到所有候选和整个池子的相关系数，取每个候选的最大值。
+    门槛和 check_self_corr_test 一样(默认 0.7)，本地不过的直接淘汰，通过的再交给服务器确认
+    """
+
+    def __init__(self, cache=None, threshold=0.7, years=4):
+        self.cache = cache or PnlCache()
+        self.threshold = threshold
+        self.years = years
+        self.pool_ids = []
+        self.dates = None
+        self._pool = None
+
+    def _returns(self, alpha_ids, dates=None):
+        """
+        返回 (alpha_id 列表, 日期数组, T×N 日收益矩阵)。
+        dates 为 None 时用所有 alpha 日期的并集，否则对齐到给定日期
+        """
+        ids, loaded = [], []
+        for alpha_id in dict.fromkeys(alpha_ids):
+            arrays = self.cache.arrays(alpha_id)
+            if arrays is not None:
+                ids.append(alpha_id)
+                loaded.append(arrays)
+        if not ids:
+            return [], dates, None
+        if dates is None:
+            dates = np.unique(np.concatenate([d for d, pnl in loaded]))
+        pnl = np.full((len(dates), len(ids)), np.nan)
+        for j, (d, values) in enumerate(loaded):
+            # 累计 pnl 只取 dates 里有的日子，差分后中间的收益自然算进下一个日期
+            index = np.minimum(np.searchsorted(dates, d), len(dates) - 1)
+            keep = dates[index] == d
+            pnl[index[keep], j] = values[keep]
+        returns = pd.DataFrame(pnl).ffill().diff().values
+        return ids, dates, returns
+
+    @staticmethod
+    def _moments(values):
+        """
+        每列去均值、除以模长，缺失值填 0，之后两列的点积就是相关系数。返回 (均值, 模长, 标准化后的矩阵)
+        """
+        with np.errstate(invalid='ignore'):
+            means = np.nanmean(values, axis=0)
+        centered = np.nan_to_num(values - means)
+        norms = np.linalg.norm(centered, axis=0)
+        norms[norms == 0] = 1
+        return np.nan_to_num(means), norms, centered / norms
+
+    def _standardize(self, values):
+        return self._moments(values)[2]
+
+    def set_pool(self, alpha_ids, region=None):
+        """
+        设置比较用的 alpha 池(通常是同一 region 下已提交的 alpha)，PnL 需要已经在缓存里
+        """
+        ids, dates, returns = self._returns(alpha_ids)
+        if not ids:
+            self.pool_ids, self.dates, self._pool = [], None, None
+            return
+        recent = dates > (pd.Timestamp(dates[-1]) - pd.DateOffset(years=self.years)).to_datetime64()
+        self.pool_ids = ids
+        self.dates = dates[recent]
+        self._pool = self._standardize(returns[recent])
+
+    async def refresh_pool(self, client, region, alpha_ids, ttl=None):
+        """
+        下载池子里缺的(或超过 ttl 秒的) PnL 后 set_pool
+        """
+        await self.cache.fetch(client, alpha_ids, ttl=ttl)
+        self.set_pool(alpha_ids, region)
+
+    def max_corr(self, alpha_ids):
+        """
+        返回 DataFrame(index=alpha_id，列 max_corr / most_correlated)，池子为空时 max_corr 为 0，
+        没有 PnL 缓存的候选不在结果里
+        """
+        if self._pool is None:
+            ids = [alpha_id for alpha_id in dict.fromkeys(alpha_ids) if self.cache.is_fresh(alpha_id)]
+            return pd.DataFrame({'max_corr': 0.0, 'most_correlated': None}, index=ids)
+        ids, dates, returns = self._returns(alpha_ids, self.dates)
+        if not ids:
+            return pd.DataFrame(columns=['max_corr', 'most_correlated'])
+        candidates = self._standardize(returns)
+        corr = self._pool.T @ candidates
+        # 候选本身也在池子里时不和自己比
+        position = {alpha_id: i for i, alpha_id in enumerate(self.pool_ids)}
+        for j, alpha_id in enumerate(ids):
+            if alpha_id in position:
+                corr[position[alpha_id], j] = -np.inf
+        best = corr.argmax(axis=0)
+        return pd.DataFrame({'max_corr': corr[best, np.arange(corr.shape[1])],
+                             'most_correlated': [self.pool_ids[i] for i in best]}, index=ids)
+
+    def screen(self, alpha_ids):
+        """
+        返回 (本地通过的 alpha_id 列表, {没通过的 alpha_id: 最大相关系数})，
+        没有 PnL 缓存的算作通过，交给服务器判断
+        """
+        result = self.max_corr(alpha_ids)
+        failed = result[result['max_corr'] >= self.threshold]['max_corr'].to_dict()
+        return [alpha_id for alpha_id in alpha_ids if alpha_id not in failed], failed
+
+
+class CorrelationState(SelfCorrelationEngine):
+    """
+    持久化的已提交 alpha 池：每个 region 一份标准化后的 T×N 收益矩阵(float32 .npy，内存映射打开)
+    和 json 元数据(alpha id、每个 alpha 的均值/模长、日期网格)，放在 CORR_PATH 下。
+    启动时直接映射进来，不用重算；提交成功一个 alpha 只追加一列(add)，
+    检查候选时是一次 O(池子大小) 的点积。日期网格超过 rebuild_days 天后整体重建一次。
+    读写都在 {region}.lock 文件锁里做，追加前总是重新读元数据、重新映射矩阵，
+    多个进程同时追加不会互相覆盖
+    """
+
+    def __init__(self, cache=None, threshold=0.7, years=4, path=CORR_PATH, rebuild_days=30):
+        super().__init__(cache, threshold, years)
+        self.path = path
+        self.rebuild_days = rebuild_days
+        self.region = None
+        self._matrix = None
+        self._meta = None
+
+    def _files(self, region):
+        return (os.path.join(self.path, f"{region}.returns.npy"), os.path.join(self.path, f"{region}.json"))
+
+    def _lock(self, region):
+        return file_lock(os.path.join(self.path, f"{region}.lock"))
+
+    @property
+    def _pool(self):
+        if self._matrix is None or not self.pool_ids:
+            return None
+        return self._matrix[:, :len(self.pool_ids)]
+
+    @_pool.setter
+    def _pool(self, value):
+        # 基类 __init__ 里的赋值，状态都在 _matrix 里
+        pass
+
+    def load(self, region):
+        """
+        映射 region 的矩阵，没有或已过期时返回 False
+        """
+        with self._lock(region):
+            return self._load(region)
+
+    def _load(self, region):
+        matrix_path, meta_path = self._files(region)
+        self.region = region
+        self._matrix, self._meta, self.pool_ids, self.dates = None, None, [], None
+        if not os.path.exists(matrix_path) or not os.path.exists(meta_path):
+            return False
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if time.time() - meta['built_at'] > self.rebuild_days * 24 * 60 * 60:
+            return False
+        self._meta = meta
+        self.pool_ids = list(meta['ids'])
+        self.dates = np.array(meta['dates'], dtype='datetime64[D]')
+        self._matrix = np.load(matrix_path, mmap_mode='r+')
+        return True
+
+    def _save_meta(self):
+        matrix_path, meta_path = self._files(self.region)
+        self._meta['ids'] = self.pool_ids
+        tmp_path = meta_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def build(self, region, alpha_ids):
+        """
+        用缓存里的 PnL 重建 region 的矩阵(alpha_ids 是全部已提交 alpha)
+        """
+        ids, dates, returns = self._returns(alpha_ids)
+        self.region = region
+        if not ids:
+            self._matrix, self._meta, self.pool_ids, self.dates = None, None, [], None
+            return
+        with self._lock(region):
+            self._build(region, ids, dates, returns)
+        print(f"Built correlation state of {region}: {len(ids)} alphas x {len(self.dates)} days")
+
+    def _build(self, region, ids, dates, returns):
+        recent = dates > (pd.Timestamp(dates[-1]) - pd.DateOffset(years=self.years)).to_datetime64()
+        returns = returns[recent]
+        self.dates = dates[recent]
+        means, norms, columns = self._moments(returns)
+        capacity = max(64, 2 * len(ids))
+        matrix_path, meta_path = self._files(region)
+        tmp_path = matrix_path + '.tmp.npy'
+        matrix = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(len(self.dates), capacity))
+        matrix[:, :len(ids)] = columns
+        matrix.flush()
+        del matrix
+        self._matrix = None
+        os.replace(tmp_path, matrix_path)
+        self._matrix = np.load(matrix_path, mmap_mode='r+')
+        self.pool_ids = ids
+        self._meta = {'built_at': time.time(), 'dates': [str(d) for d in self.dates],
+                      'moments': {alpha_id: [float(m), float(n)] for alpha_id, m, n in zip(ids, means, norms)}}
+        self._save_meta()
+
+    def add(self, alpha_ids):
+        """
+        把新提交的 alpha 追加进矩阵(PnL 需要已经在缓存里)，返回追加的个数
+        """
+        if self._meta is None:
+            return 0
+        with self._lock(self.region):
+            # 别的进程可能刚追加过(甚至扩容换了文件)，在锁里重新读元数据、重新映射后再追加
+            if not self._load(self.region):
+                return 0
+            return self._append(alpha_ids)
+
+    def _append(self, alpha_ids):
+        known = set(self.pool_ids)
+        ids, dates, returns = self._returns([alpha_id for alpha_id in alpha_ids if alpha_id not in known], self.dates)
+        if not ids:
+            return 0
+        means, norms, columns = self._moments(returns)
+        n = len(self.pool_ids)
+        if n + len(ids) > self._matrix.shape[1]:
+            self._grow(max(2 * self._matrix.shape[1], n + len(ids)))
+        self._matrix[:, n:n + len(ids)] = columns
+        self._matrix.flush()
+        self.pool_ids = self.pool_ids + ids
+        self._meta['moments'].update({alpha_id: [float(m), float(s)] for alpha_id, m, s in zip(ids, means, norms)})
+        self._save_meta()
+        return len(ids)
+
+    def _grow(self, capacity):
+        matrix_path, meta_path = self._files(self.region)
+        tmp_path = matrix_path + '.tmp.npy'
+        matrix = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32,
+                                           shape=(self._matrix.shape[0], capacity))
+        n = len(self.pool_ids)
+        matrix[:, :n] = self._matrix[:, :n]
+        matrix.flush()
+        del matrix
+        self._matrix = None
+        os.replace(tmp_path, matrix_path)
+        self._matrix = np.load(matrix_path, mmap_mode='r+')
+
+    def set_pool(self, alpha_ids, region=None):
+        """
+        切到 region 的矩阵：能映射就映射，只追加 alpha_ids 里新出现的 alpha；没有或过期时重建
+        """
+        if region != self.region or self._meta is None:
+            if not self.load(region):
+                self.build(region, alpha_ids)
+                return
+        self.add(alpha_ids)
+        if self._meta is None:
+            # 追加时重新读到的矩阵已经过期
+            self.build(region, alpha_ids)
+
+    async def refresh_pool(self, client, region, alpha_ids, ttl=None):
+        """
+        矩阵还能用时只下载新提交 alpha 的 PnL 并追加；要重建时才按 ttl 重新下载整个池子
+        """
+        if region == self.region and self._meta is not None or self.load(region):
+            known = set(self.pool_ids)
+            await self.cache.fetch(client, [alpha_id for alpha_id in alpha_ids if alpha_id not in known])
+            self.add(alpha_ids)
+            if self._meta is not None:
+                return
+        await self.cache.fetch(client, alpha_ids, ttl=ttl)
+        self.build(region, alpha_ids)
+
+
+def record_submitted(s, alpha_id, region=None, state=None):
+    """
+    alpha 提交成功后调用：下载它的 PnL 并追加进对应 region 的 CorrelationState
+    """
+    state = state or CorrelationState()
+    if region is None:
+        region = brain_wait(s, f"{brain_api_url}/alphas/{alpha_id}").json()['settings']['region']
+    if not state.cache.fetch_sync(s, alpha_id):
+        return False
+    if not state.load(region):
+        # 还没建过(或已过期)，下次检查时用 set_pool 整体重建
+        return False
+    return state.add([alpha_id]) > 0
+
+
+async def async_record_submitted(client, alpha_id, region, state=None):
+    """
+    record_submitted 的异步版本，PnL 通过 client.poller 下载
+    """
+    state = state or CorrelationState()
+    await state.cache.fetch(client, [alpha_id])
+    if not state.load(region):
+        return False
+    return state.add([alpha_id]) > 0
+
+
+def greedy_independent_set(conflicts, weights):
+    """
+    贪心求最大权独立集：每次选 weight / (剩余度数 + 1) 最大的点，再删掉它和它的邻居。
+    conflicts 是 M×M 的 bool 邻接矩阵(对角线为 False)，weights 长度为 M。
+    返回 (选中的下标(按选中顺序), {被排除的下标: 排除它的下标})
+    """
+    conflicts = np.asarray(conflicts, dtype=bool)
+    weights = np.asarray(weights, dtype=float)
+    alive = np.ones(len(weights), dtype=bool)
+    degree = conflicts.sum(axis=1).astype(float)
+    selected, excluded = [], {}
+    while alive.any():
+        score = np.where(alive, weights / (degree + 1), -np.inf)
+        best = int(np.argmax(score))
+        selected.append(best)
+        removed = alive & conflicts[best]
+        for i in np.flatnonzero(removed):
+            excluded[int(i)] = best
+        removed[best] = True
+        alive &= ~removed
+        degree -= conflicts[:, removed].sum(axis=1)
+    return selected, excluded
+
+
+def plan_submissions(df, s=None, state=None, weight=None):
+    """
+    给待提交的 alpha(DataFrame，至少有 id、region 两列，顺序作为同分时的先后)排提交顺序：
+    1. 和已提交池子(CorrelationState)的相关性已经超过门槛的，提交了也会被拒，直接跳过；
+    2. 剩下的候选之间两两相关性超过门槛的连一条边，用贪心最大权独立集选出互相不冲突的一组，
+       weight 是权重列(None 时每个 alpha 权重为 1，即尽量多提交)，按选中顺序提交。
+    s 不为 None 时先下载缺的 PnL；没有 PnL 的候选排在最后，交给服务器判断。
+    返回 (按计划顺序排好的 DataFrame, {跳过的 alpha_id: 原因})
+    """
+    state = state or CorrelationState()
+    order, skipped = [], {}
+    for region, group in df.groupby('region', sort=False):
+        ids = group['id'].tolist()
+        if s is not None:
+            for alpha_id in ids:
+                try:
+                    state.cache.fetch_sync(s, alpha_id)
+                except Exception as e:
+                    print(f"Failed to download PnL of {alpha_id}: {e}")
+        state.load(region)
+        passed, failed = state.screen(ids)
+        for alpha_id, value in failed.items():
+            skipped[alpha_id] = f"self corr {value:.3f} with the submitted pool"
+
+        have, dates, returns = state._returns(passed)
+        if have:
+            recent = dates > (pd.Timestamp(dates[-1]) - pd.DateOffset(years=state.years)).to_datetime64()
+            standardized = state._standardize(returns[recent])
+            corr = standardized.T @ standardized
+            conflicts = corr >= state.threshold
+            np.fill_diagonal(conflicts, False)
+            weights = group.set_index('id').loc[have, weight].fillna(0).values if weight else np.ones(len(have))
+            selected, excluded = greedy_independent_set(conflicts, weights)
+            order += [have[i] for i in selected]
+            for i, by in excluded.items():
+                skipped[have[i]] = f"self corr {corr[i, by]:.3f} with {have[by]} planned before it"
+        have_set = set(have)
+        order += [alpha_id for alpha_id in passed if alpha_id not in have_set]
+    print(f"Submission plan: {len(order)} alphas, {len(skipped)} skipped")
+    plan = df.set_index('id').loc[order].reset_index()
+    return plan, skipped
@@ -1,5 +1,7 @@
 
 import os
+import functools
+import threading
 
 import requests
 from time import sleep
@@ -7,26 +9,38 @@ import time
 import json
 import pandas as pd
 from itertools import product
-from collections import defaultdict
-import aiofiles
+from collections import defaultdict, deque
+from collections.abc import Sequence
 import aiohttp
 import asyncio
+from contextlib import asynccontextmanager
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from itertools import chain
 
-def login():
+from config import DATA_PATH, FIELDS_PATH, MULTI_SIZE
+from fastexpr import ExpressionValidator, dedup_expressions
+from result_store import ResultStore, expression_hash
+from alpha_mirror import AlphaMirror
+from retry_policy import RetryPolicy
+
+
+def load_decrypted_data(txt_file='user_info.txt'):
     # 从txt文件解密并读取数据
     # txt格式:
     # password: 'password'
     # username: 'username'
-    def load_decrypted_data(txt_file='user_info.txt'):
-        with open(txt_file, 'r') as f:
-            data = f.read()
-            data = data.strip().split('\n')
+    with open(txt_file, 'r') as f:
+        data = f.read()
+        data = data.strip().split('\n')
 
-            data = {line.split(': ')[0]: line.split(': ')[1] for line in data}
+        data = {line.split(': ')[0]: line.split(': ')[1] for line in data}
 
-        return data['username'][1:-1], data['password'][1:-1]
+    return data['username'][1:-1], data['password'][1:-1]
 
+
+def login():
     username, password = load_decrypted_data("user_info.txt")
 
     # Create a session to persistently store the headers
@@ -45,6 +59,31 @@ def login():
                         "Your username or password is incorrect. Please enter the correct email and password!")
     return s
 
+
+# 同步(requests)和异步(BrainClient)请求共用的重试策略和熔断器
+retry_policy = RetryPolicy()
+
+
+def brain_request(s, method, url, throttle=True, **kwargs):
+    """
+    同步请求统一走 retry_policy：带超时，401 时用 s.auth 重新登录，429/5xx/网络错误按退避重试
+    """
+    kwargs.setdefault('timeout', retry_policy.timeout)
+    return retry_policy.call(lambda: s.request(method, url, **kwargs),
+                             relogin=lambda: s.post(brain_api_url + '/authentication', timeout=retry_policy.timeout),
+                             throttle=throttle)
+
+
+def brain_wait(s, url, max_wait=600, **kwargs):
+    """
+    GET 一个要算一会儿的结果(check、alpha 详情、progress url)，按 Retry-After 等它算完，
+    最多等 max_wait 秒，超时抛 TimeoutError
+    """
+    kwargs.setdefault('timeout', retry_policy.timeout)
+    return retry_policy.wait_ready(lambda: s.get(url, **kwargs), max_wait=max_wait,
+                                   relogin=lambda: s.post(brain_api_url + '/authentication',
+                                                          timeout=retry_policy.timeout))
+
 pd.set_option('expand_frame_repr', False)
 pd.set_option('display.max_rows', 1000)
 
@@ -74,15 +113,157 @@ vec_ops = ["vec_avg", "vec_sum", "vec_ir", "vec_max",
 
 ops_set = basic_ops + ts_ops + arsenal + group_ops
 
-s = login()
-res = s.get("https://api.worldquantbrain.com/operators")
-aval = pd.DataFrame(res.json())['name'].tolist()
-ts_ops = [op for op in ts_ops if op in aval]
-basic_ops = [op for op in basic_ops if op in aval]
-group_ops = [op for op in group_ops if op in aval]
-twin_field_ops = [op for op in twin_field_ops if op in aval]
-arsenal = [op for op in arsenal if op in aval]
-vec_ops = [op for op in vec_ops if op in aval]
+
+def while_true_try_decorator(func):
+    """
+    任务出错后按 retry_policy 的退避(带抖动，最长 max_delay 秒)等待后重新运行，直到正常结束。
+    重新运行时 simulate_multiple_tasks / simulate_stream 会先从回测日志里接上中断前还在跑的回测
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except KeyboardInterrupt:
+                raise
+            except Exception as e:
+                delay = retry_policy.backoff(attempt)
+                attempt += 1
+                print("%s failed, restarting in %.0fs: %s" % (func.__name__, delay, e))
+                sleep(delay)
+
+    return wrapper
+
+
+class OperatorCatalog:
+    """
+    平台算子目录。第一次真正用到时才加载：优先读 DATA_PATH 下的本地快照，
+    快照超过 ttl 秒才登录并重新拉取 /operators；拉取失败时退回旧快照，
+    连快照都没有时不做过滤（离线也能 import machine_lib）。
+    """
+
+    def __init__(self, snapshot_path=None, ttl=24 * 60 * 60):
+        self.snapshot_path = snapshot_path or os.path.join(DATA_PATH, 'operators.json')
+        self.ttl = ttl
+        self._operators = None
+
+    def _read_snapshot(self):
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            return snapshot['fetched_at'], snapshot['operators']
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def _write_snapshot(self, operators):
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'fetched_at': time.time(), 'operators': operators}, f)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def _fetch(self):
+        s = login()
+        try:
+            res = s.get(brain_api_url + "/operators")
+            return res.json()
+        finally:
+            s.close()
+
+    def load(self, refresh=False):
+        snapshot = self._read_snapshot()
+        if not refresh and snapshot is not None and time.time() - snapshot[0] < self.ttl:
+            self._operators = snapshot[1]
+            return self._operators
+
+        try:
+            operators = self._fetch()
+            self._write_snapshot(operators)
+            self._operators = operators
+        except Exception as e:
+            if snapshot is None:
+                print(f"Failed to fetch operators and no snapshot found, operator lists are not filtered: {e}")
+                self._operators = []
+            else:
+                print(f"Failed to fetch operators, using stale snapshot: {e}")
+                self._operators = snapshot[1]
+        return self._operators
+
+    @property
+    def operators(self):
+        if self._operators is None:
+            self.load()
+        return self._operators
+
+    @property
+    def names(self):
+        return {op['name'] for op in self.operators}
+
+    def filter(self, candidates):
+        names = self.names
+        if not names:
+            return list(candidates)
+        return [op for op in candidates if op in names]
+
+    def ops(self, candidates):
+        return OperatorList(self, candidates)
+
+    def validator(self, fields=None, strict_fields=False):
+        """
+        基于算子目录(和 get_datafields 返回的字段)的本地表达式检查器，
+        在提交前过滤掉算子不存在、参数不对、字段类型用错的表达式
+        """
+        return ExpressionValidator(self.operators, fields, strict_fields)
+
+
+class OperatorList(Sequence):
+    """
+    按算子目录过滤后的算子列表，第一次访问时才触发目录加载。
+    用法和 list 一致：for / in / len / 下标 / ts_ops + basic_ops。
+    """
+
+    def __init__(self, catalog, candidates):
+        self._catalog = catalog
+        self._candidates = list(candidates)
+        self._ops = None
+
+    def _resolve(self):
+        if self._ops is None:
+            self._ops = self._catalog.filter(self._candidates)
+        return self._ops
+
+    def __getitem__(self, index):
+        return self._resolve()[index]
+
+    def __len__(self):
+        return len(self._resolve())
+
+    def __iter__(self):
+        return iter(self._resolve())
+
+    def __contains__(self, op):
+        return op in self._resolve()
+
+    def __add__(self, other):
+        return self._resolve() + list(other)
+
+    def __radd__(self, other):
+        return list(other) + self._resolve()
+
+    def __eq__(self, other):
+        return self._resolve() == list(other)
+
+    def __repr__(self):
+        return repr(self._resolve())
+
+
+operator_catalog = OperatorCatalog()
+ts_ops = operator_catalog.ops(ts_ops)
+basic_ops = operator_catalog.ops(basic_ops)
+group_ops = operator_catalog.ops(group_ops)
+twin_field_ops = operator_catalog.ops(twin_field_ops)
+arsenal = operator_catalog.ops(arsenal)
+vec_ops = operator_catalog.ops(vec_ops)
 
 
 def locate_alpha(s, alpha_id):
@@ -156,7 +337,9 @@ def check_submission(alpha_bag, gold_bag, start):
             s = login()
         # print(idx)
         pc = get_check_submission(s, g)
-        if pc == "sleep":
+        if pc == "timeout":
+            alpha_bag.append(g)
+        elif pc == "sleep":
             sleep(100)
             s = login()
             alpha_bag.append(g)
@@ -176,13 +359,18 @@ def check_submission(alpha_bag, gold_bag, start):
     return gold_bag
 
 
-def get_check_submission(s, alpha_id):
-    while True:
-        result = s.get("https://api.worldquantbrain.com/alphas/" + alpha_id + "/check")
-        if "retry-after" in result.headers:
-            time.sleep(float(result.headers["Retry-After"]))
-        else:
-            break
+def get_check_submission(s, alpha_id, max_wait=600):
+    """
+    等 check 算完后判断是否通过，最多等 max_wait 秒，超时返回 "timeout"(稍后再查)
+    """
+    try:
+        result = brain_wait(s, brain_api_url + "/alphas/" + alpha_id + "/check", max_wait=max_wait)
+    except TimeoutError:
+        print("check of %s is still running after %ds" % (alpha_id, max_wait))
+        return "timeout"
+    except Exception as e:
+        print("error while checking %s: %s" % (alpha_id, e))
+        return "error"
     try:
         if result.json().get("is", 0) == 0:
             print("logged out")
@@ -252,28 +440,25 @@ def simulate(alpha_dict, region_dict, name, neut, start, stone_bag, tags='None')
                         'visualization': False,
                     },
                     'regular': alpha}
+                # 限流、5xx、网络错误和登录过期由 brain_request 退避重试，仍失败的跳过
                 try:
-                    simulation_response = s.post('https://api.worldquantbrain.com/simulations', json=simulation_data)
+                    simulation_response = brain_request(s, 'POST', brain_api_url + '/simulations',
+                                                        json=simulation_data)
                     simulation_progress_url = simulation_response.headers['Location']
                     progress_urls.append(simulation_progress_url)
                 except KeyError:
-                    print(" loc key error")
-                    sleep(600)
-                    s = login()
-                except:
-                    print("1")
-                    sleep(600)
-                    s = login()
+                    print(" loc key error: %s" % simulation_response.text)
+                except Exception as e:
+                    print("simulation request failed: %s" % e)
 
             print("group %d post done" % (idx))
 
             for progress in progress_urls:
-                while True:
-                    simulation_progress = s.get(progress)
-                    if simulation_progress.headers.get("Retry-After", 0) == 0:
-                        break
-                    # print("Sleeping for " + simulation_progress.headers["Retry-After"] + " seconds")
-                    sleep(float(simulation_progress.headers["Retry-After"]))
+                try:
+                    simulation_progress = brain_wait(s, progress, max_wait=24 * 60 * 60)
+                except Exception as e:
+                    print("look into: %s, %s" % (progress, e))
+                    continue
 
                 print("%s done simulating, getting alpha details" % (progress))
                 try:
@@ -313,24 +498,19 @@ def multi_simulate(alpha_pools, neut, region, universe, start):
             # 10 tasks, 10 alpha in each task
             sim_data_list = generate_sim_data(task, region, universe, neut)
             try:
-                simulation_response = s.post('https://api.worldquantbrain.com/simulations', json=sim_data_list)
+                simulation_response = brain_request(s, 'POST', brain_api_url + '/simulations', json=sim_data_list)
                 simulation_progress_url = simulation_response.headers['Location']
                 progress_urls.append(simulation_progress_url)
-            except:
-                print(" loc key error")
-                sleep(600)
-                s = login()
+            except KeyError:
+                print(" loc key error: %s" % simulation_response.text)
+            except Exception as e:
+                print("simulation request failed: %s" % e)
 
         print("pool %d task %d post done" % (x, y))
 
         for j, progress in enumerate(progress_urls):
             try:
-                while True:
-                    simulation_progress = s.get(progress)
-                    if simulation_progress.headers.get("Retry-After", 0) == 0:
-                        break
-                    # print("Sleeping for " + simulation_progress.headers["Retry-After"] + " seconds")
-                    sleep(float(simulation_progress.headers["Retry-After"]))
+                simulation_progress = brain_wait(s, progress, max_wait=24 * 60 * 60)
 
                 status = simulation_progress.json().get("status", 0)
                 if status == "ERROR":
@@ -361,7 +541,7 @@ def multi_simulate(alpha_pools, neut, region, universe, start):
     print("Simulate done")
 
 
-def generate_sim_data(alpha_list, region, uni, neut):
+def generate_sim_data(alpha_list, region, uni, neut, delay=1):
     sim_data_list = []
     for alpha, decay in alpha_list:
         simulation_data = {
@@ -370,7 +550,7 @@ def generate_sim_data(alpha_list, region, uni, neut):
                 'instrumentType': 'EQUITY',
                 'region': region,
                 'universe': uni,
-                'delay': 1,
+                'delay': delay,
                 'decay': decay,
                 'neutralization': neut,
                 'truncation': 0.08,
@@ -405,20 +585,42 @@ def load_task_pool(alpha_list, limit_of_multi_simulations, limit_of_concurrent_s
     return pools
 
 
+def _get_page(s, url):
+    res = brain_request(s, 'GET', url)
+    if res.status_code == 429:
+        raise RuntimeError(f"Too many requests while fetching {url}")
+    return res.json()
+
+
 def get_datasets(
         s,
         instrument_type: str = 'EQUITY',
         region: str = 'USA',
         delay: int = 1,
-        universe: str = 'TOP3000'
+        universe: str = 'TOP3000',
+        max_workers: int = 4
 ):
-    url = "https://api.worldquantbrain.com/data-sets?" + \
-          f"instrumentType={instrument_type}&region={region}&delay={str(delay)}&universe={universe}"
-    result = s.get(url)
-    datasets_df = pd.DataFrame(result.json()['results'])
+    """
+    拉取 region/delay/universe 下的全部数据集(按 50 条分页，第一页之后并发请求)
+    """
+    url_template = "https://api.worldquantbrain.com/data-sets?" + \
+                   f"instrumentType={instrument_type}&region={region}&delay={str(delay)}&universe={universe}" + \
+                   "&limit=50&offset={x}"
+    first_page = _get_page(s, url_template.format(x=0))
+    urls = [url_template.format(x=x) for x in range(50, first_page.get('count', 0), 50)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pages = list(executor.map(lambda url: _get_page(s, url), urls))
+    datasets_df = pd.DataFrame(first_page['results'] + [item for page in pages for item in page['results']])
     return datasets_df
 
 
+def datafields_cache_path(instrument_type, region, delay, universe, dataset_id='', search=''):
+    name = f"{instrument_type}_{region}_{delay}_{universe}_{dataset_id or 'all'}"
+    if search:
+        name += "_search_" + "".join(c if c.isalnum() else '_' for c in search)
+    return os.path.join(FIELDS_PATH, name + ".json")
+
+
 def get_datafields(
         s,
         instrument_type: str = 'EQUITY',
@@ -426,29 +628,55 @@ def get_datafields(
         delay: int = 1,
         universe: str = 'TOP3000',
         dataset_id: str = '',
-        search: str = ''
+        search: str = '',
+        ttl: int = 86400,
+        refresh: bool = False,
+        max_workers: int = 8
 ):
-    if len(search) == 0:
-        url_template = "https://api.worldquantbrain.com/data-fields?" + \
-                       f"&instrumentType={instrument_type}" + \
-                       f"&region={region}&delay={str(delay)}&universe={universe}&dataset.id={dataset_id}&limit=50" + \
-                       "&offset={x}"
-        count = s.get(url_template.format(x=0)).json()['count']
-
-    else:
-        url_template = "https://api.worldquantbrain.com/data-fields?" + \
-                       f"&instrumentType={instrument_type}" + \
-                       f"&region={region}&delay={str(delay)}&universe={universe}&limit=50" + \
-                       f"&search={search}" + \
-                       "&offset={x}"
-        count = 100
-
-    datafields_list = []
-    for x in range(0, count, 50):
-        datafields = s.get(url_template.format(x=x))
-        datafields_list.append(datafields.json()['results'])
+    """
+    拉取字段信息，结果按 dataset/region/delay/universe 缓存在 FIELDS_PATH 下，
+    ttl 秒内重复调用直接读缓存，不发请求。s 为 None 时只在需要联网时才登录。
+    第一页拿到 count 后，其余页并发请求
+    """
+    cache_path = datafields_cache_path(instrument_type, region, delay, universe, dataset_id, search)
+    if not refresh and os.path.exists(cache_path) and time.time() - os.path.getmtime(cache_path) < ttl:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return pd.DataFrame(json.load(f))
+
+    own_session = s is None
+    if own_session:
+        s = login()
+    try:
+        if len(search) == 0:
+            url_template = "https://api.worldquantbrain.com/data-fields?" + \
+                           f"&instrumentType={instrument_type}" + \
+                           f"&region={region}&delay={str(delay)}&universe={universe}&dataset.id={dataset_id}&limit=50" + \
+                           "&offset={x}"
+            first_page = _get_page(s, url_template.format(x=0))
+            count = first_page['count']
 
-    datafields_list_flat = [item for sublist in datafields_list for item in sublist]
+        else:
+            url_template = "https://api.worldquantbrain.com/data-fields?" + \
+                           f"&instrumentType={instrument_type}" + \
+                           f"&region={region}&delay={str(delay)}&universe={universe}&limit=50" + \
+                           f"&search={search}" + \
+                           "&offset={x}"
+            first_page = _get_page(s, url_template.format(x=0))
+            count = 100
+
+        urls = [url_template.format(x=x) for x in range(50, count, 50)]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pages = list(executor.map(lambda url: _get_page(s, url), urls))
+    finally:
+        if own_session:
+            s.close()
+
+    datafields_list_flat = first_page['results'] + [item for page in pages for item in page['results']]
+
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(datafields_list_flat, f)
+    os.replace(tmp_path, cache_path)
 
     datafields_df = pd.DataFrame(datafields_list_flat)
     return datafields_df
@@ -484,12 +712,7 @@ def view_alphas(gold_bag):
 
 
 def locate_alpha(s, alpha_id):
-    while True:
-        alpha = s.get("https://api.worldquantbrain.com/alphas/" + alpha_id)
-        if "retry-after" in alpha.headers:
-            time.sleep(float(alpha.headers["Retry-After"]))
-        else:
-            break
+    alpha = brain_wait(s, brain_api_url + "/alphas/" + alpha_id)
     string = alpha.content.decode('utf-8')
     metrics = json.loads(string)
     # print(metrics["regular"]["code"])
@@ -506,139 +729,285 @@ def locate_alpha(s, alpha_id):
     return triple
 
 
+class RateLimiter:
+    """
+    线程安全的简单限速器，两次请求之间至少间隔 1 / rate 秒
+    """
+
+    def __init__(self, rate=8):
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def wait(self):
+        with self._lock:
+            now = time.time()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            sleep(delay)
+
+
+ALPHA_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S-04:00"
+
+
+def iter_user_alphas(s, queries, start_date, end_date, max_workers=8, rate=8, cap=9900, date_field='dateCreated'):
+    """
+    按 queries(不含 offset/limit/日期的 /users/self/alphas 查询条件)流式返回 alpha。
+    start_date/end_date 是 "%Y-%m-%d" 字符串或 datetime，按 date_field(dateCreated/dateModified)筛选。
+    先查每个时间窗口的 count，超过 cap(offset 上限)就把窗口对半拆开，直到每个窗口都在上限内；
+    各窗口、各页在线程池里并发请求，按 rate 限速，拿到一页就产出一页。
+    产出顺序是请求完成的顺序，不保留查询里的 order，需要排序的调用方自己排
+    """
+    limiter = RateLimiter(rate)
+    base_url = "https://api.worldquantbrain.com/users/self/alphas?"
+
+    def window_url(query, start, end, limit, offset):
+        return (f"{base_url}limit={limit}&offset={offset}&{query}"
+                f"&{date_field}%3E={start.strftime(ALPHA_DATE_FORMAT)}"
+                f"&{date_field}%3C{end.strftime(ALPHA_DATE_FORMAT)}")
+
+    def fetch(url):
+        limiter.wait()
+        page = _get_page(s, url)
+        if 'results' not in page:
+            raise RuntimeError(f"Failed to get alphas: {page}")
+        return page
+
+    if isinstance(start_date, str):
+        start_date = datetime.strptime(start_date, "%Y-%m-%d")
+    if isinstance(end_date, str):
+        end_date = datetime.strptime(end_date, "%Y-%m-%d")
+    windows = [(query, start_date, end_date) for query in queries]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pages = []
+        while windows:
+            counts = executor.map(lambda w: fetch(window_url(w[0], w[1], w[2], 1, 0))['count'], windows)
+            split = []
+            for (query, start, end), count in zip(windows, counts):
+                if count > cap and end - start > timedelta(seconds=1):
+                    middle = start + (end - start) / 2
+                    split += [(query, start, middle), (query, middle, end)]
+                    continue
+                if count > cap:
+                    print(f"More than {cap} alphas created at {start}, only the first {cap} are listed")
+                    count = cap
+                pages += [executor.submit(fetch, window_url(query, start, end, 100, offset))
+                          for offset in range(0, count, 100)]
+            windows = split
+
+        for future in as_completed(pages):
+            yield from future.result()['results']
+
+
+def passes_is_checks(is_, sharpe_th, region):
+    """
+    get_alphas 晋级下一阶段的条件：多空数量、集中度、子 universe/近两年/ladder sharpe
+    """
+    sharpe = is_["sharpe"]
+    longCount = is_["longCount"]
+    shortCount = is_["shortCount"]
+    concentrated_weight = next(
+        (check.get('value', 0) for check in is_["checks"] if
+         check["name"] == "CONCENTRATED_WEIGHT"), 0)
+    sub_universe_sharpe = next(
+        (check.get('value', 99) for check in is_["checks"] if
+         check["name"] == "LOW_SUB_UNIVERSE_SHARPE"), 99)
+    two_year_sharpe = next(
+        (check.get('value', 99) for check in is_["checks"] if check["name"] == "LOW_2Y_SHARPE"),
+        99)
+    ladder_sharpe = next(
+        (check.get('value', 99) for check in is_["checks"] if
+         check["name"] == "IS_LADDER_SHARPE"), 99)
+
+    return ((longCount > 100 or shortCount > 100) and
+            (concentrated_weight < 0.2) and
+            (abs(sub_universe_sharpe) > sharpe_th / 1.66) and
+            (abs(two_year_sharpe) > sharpe_th) and
+            (abs(ladder_sharpe) > sharpe_th) and
+            (not (region == "CHN" and sharpe < 0))
+            )
+
+
+def ladder_decay(decay, turnover):
+    """
+    按 turnover 调大 decay，turnover 不高(<= 0.3)时返回 None，表示不用调整
+    """
+    if turnover > 0.7:
+        return decay * 4
+    elif turnover > 0.6:
+        return decay * 3 + 3
+    elif turnover > 0.5:
+        return decay * 3
+    elif turnover > 0.4:
+        return decay * 2
+    elif turnover > 0.35:
+        return decay + 4
+    elif turnover > 0.3:
+        return decay + 2
+    return None
+
+
+def get_local_alphas(tag, sharpe_th, fitness_th, longCount_th=100, shortCount_th=100, region='', universe='',
+                     delay='', instrumentType='', start_date="2024-01-01", end_date="2100-01-01"):
+    """
+    get_alphas(usage="track") 的本地版本：用结果库里回测完成时记下的 IS 指标筛选，
+    返回同样的 {"next": [...], "decay": [...]}，可以直接交给 prune/transform。
+    没记 IS 指标的回测(旧 txt 导入的、当时没拿到指标的)先从 alpha 镜像里按 alpha id / 表达式补上；
+    整个 tag 都没有指标时才改用 get_alphas，region 及之后的参数只在这时使用
+    """
+    store = get_result_store()
+    with_metrics, missing = store.metric_counts(tag)
+    if missing:
+        try:
+            sync_alpha_mirror()
+        except Exception as e:
+            print("Failed to sync alpha mirror:", str(e))
+        filled = store.backfill_metrics(tag, get_alpha_mirror().tagged(tag))
+        print(f"Filled IS metrics of {filled}/{missing} simulations of {tag} from the alpha mirror")
+        with_metrics += filled
+    if not with_metrics:
+        print(f"No IS metrics stored for {tag}, falling back to get_alphas")
+        return get_alphas(start_date, end_date, sharpe_th, fitness_th, longCount_th, shortCount_th,
+                          region, universe, delay, instrumentType, 500, "track", tag=tag)
+    next_alphas = []
+    decay_alphas = []
+    seen = set()
+    for row in store.completed(tag, sharpe_th, fitness_th):
+        # 旧 txt 记录和带 settings 的记录可能补到同一个 alpha 上
+        if row["alpha_id"] in seen:
+            continue
+        seen.add(row["alpha_id"])
+        is_ = {"sharpe": row["sharpe"], "fitness": row["fitness"], "longCount": row["long_count"],
+               "shortCount": row["short_count"], "checks": row["checks"] or []}
+        settings = row["settings"] or {}
+        # 和 API 的 is.longCount>=th & is.shortCount>=th 一致，多空数量都要够
+        if (row["long_count"] or 0) < longCount_th or (row["short_count"] or 0) < shortCount_th:
+            continue
+        if not passes_is_checks(is_, sharpe_th, settings.get("region")):
+            continue
+        exp = row["expression"]
+        if row["sharpe"] < 0:
+            exp = "-%s" % exp
+        decay = settings.get("decay", 0)
+        rec = [row["alpha_id"], exp, row["sharpe"], row["turnover"], row["fitness"], row["margin"],
+               row["long_count"], row["short_count"], row["created_at"], decay]
+        new_decay = ladder_decay(decay, row["turnover"] or 0)
+        if new_decay is None:
+            next_alphas.append(rec)
+        else:
+            rec.append(new_decay)
+            decay_alphas.append(rec)
+    print("count: %d" % (len(next_alphas) + len(decay_alphas)))
+    return {"next": next_alphas, "decay": decay_alphas}
+
+
+_alpha_mirror = None
+
+
+def get_alpha_mirror():
+    """
+    进程内共用的 alpha 本地镜像
+    """
+    global _alpha_mirror
+    if _alpha_mirror is None:
+        _alpha_mirror = AlphaMirror()
+    return _alpha_mirror
+
+
+def sync_alpha_mirror(s=None, since='2024-01-01', overlap=3600):
+    """
+    把上次水位线(减去 overlap 秒，防止边界上漏掉)之后新建或修改过的 alpha 同步到本地镜像，
+    第一次同步从 since 开始。返回同步的条数
+    """
+    mirror = get_alpha_mirror()
+    # 水位线和查询条件都用 -04:00 时区
+    now = datetime.now(timezone(timedelta(hours=-4))).replace(tzinfo=None)
+    watermark = mirror.watermark
+    if watermark is None:
+        start = datetime.strptime(since, "%Y-%m-%d")
+    else:
+        start = datetime.strptime(watermark, "%Y-%m-%dT%H:%M:%S") - timedelta(seconds=overlap)
+
+    own_session = s is None
+    if own_session:
+        s = login()
+    try:
+        count = mirror.upsert(iter_user_alphas(s, ["type=REGULAR"], start, now + timedelta(minutes=1),
+                                               date_field='dateModified'))
+    finally:
+        if own_session:
+            s.close()
+    mirror.set_watermark(now.strftime("%Y-%m-%dT%H:%M:%S"))
+    print("Synced %d alphas modified since %s, %d alphas in local mirror" % (count, start, mirror.count()))
+    return count
+
+
 def get_alphas(start_date, end_date, sharpe_th, fitness_th, longCount_th, shortCount_th, region, universe, delay,
-               instrumentType, alpha_num, usage, tag: str = '', color_exclude=''):
+               instrumentType, alpha_num, usage, tag: str = '', color_exclude='', local=True):
+    """
+    local=True 时先把镜像同步到最新(只拉上次之后改过的 alpha)，再在本地按同样的条件筛选；
+    local=False 时直接按条件分窗口查 /users/self/alphas
+    """
     # color None, RED, YELLOW, GREEN, BLUE, PURPLE
     s = login()
-    alpha_list = []
     next_alphas = []
     decay_alphas = []
     check_alphas = []
     # 3E large 3C less
+    common = (f"tag%3D{tag}&is.longCount%3E={longCount_th}&is.shortCount%3E={shortCount_th}"
+              f"&settings.region={region}&settings.universe={universe}&status=UNSUBMITTED"
+              f"&type=REGULAR&color!={color_exclude}&settings.delay={delay}"
+              f"&settings.instrumentType={instrumentType}&order=-is.sharpe&hidden=false&type!=SUPER")
     # 正的
-    i = 0
-    while True:
-        url_e = (f"https://api.worldquantbrain.com/users/self/alphas?limit=100&offset={i}"
-                 f"&tag%3D{tag}&is.longCount%3E={longCount_th}&is.shortCount%3E={shortCount_th}"
-                 f"&settings.region={region}&is.sharpe%3E={sharpe_th}&is.fitness%3E={fitness_th}"
-                 f"&settings.universe={universe}&status=UNSUBMITTED&dateCreated%3E={start_date}"
-                 f"T00:00:00-04:00&dateCreated%3C{end_date}T00:00:00-04:00&type=REGULAR&color!={color_exclude}&"
-                 f"settings.delay={delay}&settings.instrumentType={instrumentType}&order=-is.sharpe&hidden=false&type!=SUPER")
-
-        response = s.get(url_e)
-        # print(response.json())
-        try:
-            print(i)
-            i += 100
-            count = response.json()["count"]
-            print("count: %d" % count)
-            alpha_list.extend(response.json()["results"])
-            if i >= count or i == 9900:
-                break
-            time.sleep(0.01)
-        except Exception as e:
-            print(f"Failed to get alphas: {e}")
-            i -= 100
-            print("%d finished re-login" % i)
-            s = login()
-
+    queries = [f"{common}&is.sharpe%3E={sharpe_th}&is.fitness%3E={fitness_th}"]
     # 负的
     if usage != "submit":
-        i = 0
-        while True:
-            url_c = (f"https://api.worldquantbrain.com/users/self/alphas?limit=100&offset={i}"
-                     f"&tag%3D{tag}&is.longCount%3E={longCount_th}&is.shortCount%3E={shortCount_th}"
-                     f"&settings.region={region}&is.sharpe%3C=-{sharpe_th}&is.fitness%3C=-{fitness_th}"
-                     f"&settings.universe={universe}&status=UNSUBMITTED&dateCreated%3E={start_date}"
-                     f"T00:00:00-04:00&dateCreated%3C{end_date}T00:00:00-04:00&type=REGULAR&color!={color_exclude}&"
-                     f"settings.delay={delay}&settings.instrumentType={instrumentType}&order=-is.sharpe&hidden=false&type!=SUPER")
-
-            response = s.get(url_c)
-            # print(response.json())
-            try:
-                count = response.json()["count"]
-                if i >= count or i == 9900:
-                    break
-                alpha_list.extend(response.json()["results"])
-                i += 100
-            except Exception as e:
-                print(f"Failed to get alphas: {e}")
-                print("%d finished re-login" % i)
-                s = login()
-
-    # print(alpha_list)
-    if len(alpha_list) == 0:
+        queries.append(f"{common}&is.sharpe%3C=-{sharpe_th}&is.fitness%3C=-{fitness_th}")
+    if local:
+        sync_alpha_mirror(s)
+        mirror = get_alpha_mirror()
+        args = (start_date, end_date, sharpe_th, fitness_th, longCount_th, shortCount_th, region, universe,
+                delay, instrumentType, tag, color_exclude)
+        alpha_stream = mirror.query(*args)
         if usage != "submit":
-            return {"next": [], "decay": []}
-        else:
-            return {"check": []}
+            alpha_stream = chain(alpha_stream, mirror.query(*args, negative=True))
+    else:
+        # 分窗口并发拿到的顺序是乱的，按 order=-is.sharpe 的结果重新排：先正的 sharpe 从高到低，再负的
+        alpha_stream = sorted(iter_user_alphas(s, queries, start_date, end_date),
+                              key=lambda alpha: (alpha["is"]["sharpe"] < 0, -alpha["is"]["sharpe"]))
 
-    # print(response.json())
     if usage != "submit":
-        for j in range(len(alpha_list)):
-            alpha_id = alpha_list[j]["id"]
-            name = alpha_list[j]["name"]
-            dateCreated = alpha_list[j]["dateCreated"]
-            sharpe = alpha_list[j]["is"]["sharpe"]
-            fitness = alpha_list[j]["is"]["fitness"]
-            turnover = alpha_list[j]["is"]["turnover"]
-            margin = alpha_list[j]["is"]["margin"]
-            longCount = alpha_list[j]["is"]["longCount"]
-            shortCount = alpha_list[j]["is"]["shortCount"]
-            decay = alpha_list[j]["settings"]["decay"]
-            exp = alpha_list[j]['regular']['code']
-            region = alpha_list[j]["settings"]["region"]
-
-            concentrated_weight = next(
-                (check.get('value', 0) for check in alpha_list[j]["is"]["checks"] if
-                 check["name"] == "CONCENTRATED_WEIGHT"), 0)
-            sub_universe_sharpe = next(
-                (check.get('value', 99) for check in alpha_list[j]["is"]["checks"] if
-                 check["name"] == "LOW_SUB_UNIVERSE_SHARPE"), 99)
-            two_year_sharpe = next(
-                (check.get('value', 99) for check in alpha_list[j]["is"]["checks"] if check["name"] == "LOW_2Y_SHARPE"),
-                99)
-            ladder_sharpe = next(
-                (check.get('value', 99) for check in alpha_list[j]["is"]["checks"] if
-                 check["name"] == "IS_LADDER_SHARPE"), 99)
-
-            conditions = ((longCount > 100 or shortCount > 100) and
-                          (concentrated_weight < 0.2) and
-                          (abs(sub_universe_sharpe) > sharpe_th / 1.66) and
-                          (abs(two_year_sharpe) > sharpe_th) and
-                          (abs(ladder_sharpe) > sharpe_th) and
-                          (not (region == "CHN" and sharpe < 0))
-                          )
+        for alpha in alpha_stream:
+            alpha_id = alpha["id"]
+            name = alpha["name"]
+            dateCreated = alpha["dateCreated"]
+            sharpe = alpha["is"]["sharpe"]
+            fitness = alpha["is"]["fitness"]
+            turnover = alpha["is"]["turnover"]
+            margin = alpha["is"]["margin"]
+            longCount = alpha["is"]["longCount"]
+            shortCount = alpha["is"]["shortCount"]
+            decay = alpha["settings"]["decay"]
+            exp = alpha['regular']['code']
+            region = alpha["settings"]["region"]
+
             # if (sharpe > 1.2 and sharpe < 1.6) or (sharpe < -1.2 and sharpe > -1.6):
-            if conditions:
+            if passes_is_checks(alpha["is"], sharpe_th, region):
                 if sharpe < 0:
                     exp = "-%s" % exp
                 rec = [alpha_id, exp, sharpe, turnover, fitness, margin, longCount, shortCount, dateCreated, decay]
                 # print(rec)
-                if turnover > 0.7:
-                    rec.append(decay * 4)
-                    decay_alphas.append(rec)
-                elif turnover > 0.6:
-                    rec.append(decay * 3 + 3)
-                    decay_alphas.append(rec)
-                elif turnover > 0.5:
-                    rec.append(decay * 3)
-                    decay_alphas.append(rec)
-                elif turnover > 0.4:
-                    rec.append(decay * 2)
-                    decay_alphas.append(rec)
-                elif turnover > 0.35:
-                    rec.append(decay + 4)
-                    decay_alphas.append(rec)
-                elif turnover > 0.3:
-                    rec.append(decay + 2)
-                    decay_alphas.append(rec)
-                else:
+                new_decay = ladder_decay(decay, turnover)
+                if new_decay is None:
                     next_alphas.append(rec)
+                else:
+                    rec.append(new_decay)
+                    decay_alphas.append(rec)
         output_dict = {"next": next_alphas, "decay": decay_alphas}
         print("count: %d" % (len(next_alphas) + len(decay_alphas)))
     else:
-        for alpha_detail in alpha_list:
+        for alpha_detail in alpha_stream:
             id = alpha_detail["id"]
             type = alpha_detail["type"]
             author = alpha_detail["author"]
@@ -715,15 +1084,7 @@ def get_alphas(start_date, end_date, sharpe_th, fitness_th, longCount_th, shortC
                 check_alphas.append(rec)
         output_dict = {"check": check_alphas}
 
-    # 超过了限制
-    if usage == 'submit' and count >= 9900:
-        if len(output_dict['check']) < len(alpha_list):
-            # 那么就再来一遍
-            output_dict = get_alphas(start_date, end_date, sharpe_th, fitness_th, longCount_th, shortCount_th,
-                                     region, universe, delay, instrumentType, alpha_num, usage, tag, color_exclude)
-        else:
-            raise Exception("Too many alphas to check!! over 10000, universe: %s, region: %s" % (universe, region))
-
+    s.close()
     return output_dict
 
 
@@ -753,64 +1114,70 @@ def transform(next_alpha_recs):
     return output
 
 
-def first_order_factory(fields, ops_set):
-    alpha_set = []
+def iter_first_order(fields, ops_set):
+    """
+    first_order_factory 的生成器版本，按字段逐个产出表达式(未去重)
+    """
     for field in fields:
         # reverse op does the work
-        alpha_set.append(field)
+        yield field
         # alpha_set.append("-%s"%field)
         for op in ops_set:
 
             if op == "ts_percentage":
 
                 # lpha_set += ts_comp_factory(op, field, "percentage", [0.2, 0.5, 0.8])
-                alpha_set += ts_comp_factory(op, field, "percentage", [0.5])
+                yield from ts_comp_factory(op, field, "percentage", [0.5])
 
 
             elif op == "ts_decay_exp_window":
 
-                # alpha_set += ts_comp_factory(op, field, "factor", [0.2, 0.5, 0.8])
-                alpha_set += ts_comp_factory(op, field, "factor", [0.5])
+                # yield from ts_comp_factory(op, field, "factor", [0.2, 0.5, 0.8])
+                yield from ts_comp_factory(op, field, "factor", [0.5])
 
             elif op == "ts_moment":
 
-                alpha_set += ts_comp_factory(op, field, "k", [2, 3, 4])
+                yield from ts_comp_factory(op, field, "k", [2, 3, 4])
 
             elif op == "ts_entropy":
 
-                # alpha_set += ts_comp_factory(op, field, "buckets", [5, 10, 15, 20])
-                alpha_set += ts_comp_factory(op, field, "buckets", [10])
+                # yield from ts_comp_factory(op, field, "buckets", [5, 10, 15, 20])
+                yield from ts_comp_factory(op, field, "buckets", [10])
 
             elif op.startswith("ts_") or op == "inst_tvr":
 
-                alpha_set += ts_factory(op, field)
+                yield from ts_factory(op, field)
 
             elif op.startswith("group_"):
 
-                alpha_set += group_factory(op, field, "usa")
+                yield from group_factory(op, field, "usa")
 
             elif op.startswith("vector"):
 
-                alpha_set += vector_factory(op, field)
+                yield from vector_factory(op, field)
 
             elif op == "signed_power":
 
                 alpha = "%s(%s, 2)" % (op, field)
-                alpha_set.append(alpha)
+                yield alpha
 
             else:
                 alpha = "%s(%s)" % (op, field)
-                alpha_set.append(alpha)
+                yield alpha
 
-    return alpha_set
 
+def first_order_factory(fields, ops_set):
+    return dedup_expressions(iter_first_order(fields, ops_set))
 
-def get_group_second_order_factory(first_order, group_ops, region):
-    second_order = []
+
+def iter_group_second_order(first_order, group_ops, region):
     for fo in first_order:
         for group_op in group_ops:
-            second_order += group_factory(group_op, fo, region)
-    return second_order
+            yield from group_factory(group_op, fo, region)
+
+
+def get_group_second_order_factory(first_order, group_ops, region):
+    return dedup_expressions(iter_group_second_order(first_order, group_ops, region))
 
 
 def get_ts_second_order_factory(first_order, ts_ops):
@@ -954,6 +1321,11 @@ def trade_when_factory(op, field, region, delay=1):
     return output
 
 
+def iter_trade_when(op, fields, region, delay=1):
+    for field in fields:
+        yield from trade_when_factory(op, field, region, delay)
+
+
 def ts_factory(op, field):
     output = []
     # days = [3, 5, 10, 20, 60, 120, 240]
@@ -998,6 +1370,11 @@ def twin_field_factory(op, field, fields):
     return output
 
 
+def iter_twin_field(op, fields):
+    for field in fields:
+        yield from twin_field_factory(op, field, fields)
+
+
 def group_factory(op, field, region):
     output = []
     vectors = ["cap"]
@@ -1223,159 +1600,786 @@ def group_factory(op, field, region):
             alpha = "%s(%s,densify(%s))" % (op, field, group)
             output.append(alpha)
 
-    return output
+    return dedup_expressions(output)
 
 
-async def async_login():
+class BrainClient:
     """
-    从YAML文件加载用户信息并异步登录到指定API
+    共享的异步 BRAIN API 客户端。
+    所有任务共用一个带 keep-alive 和 DNS 缓存的连接池；登录过期(默认 3 小时)
+    或遇到 401 时只由一个任务重新登录，其余任务等它完成后直接复用新的 cookie。
+    get/post/patch 的用法与 aiohttp.ClientSession 相同：async with client.get(url) as resp。
+    每个请求都带超时并走 policy(默认和同步请求共用 retry_policy)的退避重试和熔断，
+    throttle=False 时 429 直接返回给调用方(提交回测时由 ConcurrencyController 处理)。
+    所有 progress url(以及 correlations 这类按 Retry-After 轮询的结果)由 client.poller(ProgressPoller)统一轮询，
+    poll_rate 是轮询的每秒请求预算
     """
-    def load_decrypted_data(txt_file='user_info.txt'):
-        with open(txt_file, 'r') as f:
-            data = f.read()
-            data = data.strip().split('\n')
-            data = {line.split(': ')[0]: line.split(': ')[1] for line in data}
 
-        return data['username'][1:-1], data['password'][1:-1]
+    def __init__(self, limit=20, expiry_time=3 * 60 * 60, poll_rate=5, policy=None):
+        self.limit = limit
+        self.expiry_time = expiry_time
+        self.poll_rate = poll_rate
+        self.policy = policy or retry_policy
+        self.session = None
+        self.poller = None
+        self.start_time = 0
+        self._generation = 0
+        self._login_lock = None
+
+    async def open(self):
+        if self.session is None:
+            conn = aiohttp.TCPConnector(ssl=False, limit=self.limit, ttl_dns_cache=300, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(connector=conn)
+            self._login_lock = asyncio.Lock()
+            self.poller = ProgressPoller(self, rate=self.poll_rate)
+        await self.login()
+        return self
+
+    async def close(self):
+        if self.poller is not None:
+            await self.poller.close()
+            self.poller = None
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def login(self, generation=None):
+        """
+        single-flight 登录：generation 是调用方看到的登录代数，
+        等锁期间如果别的任务已经登录过，就直接返回
+        """
+        async with self._login_lock:
+            if generation is not None and generation != self._generation:
+                return
+            if generation is not None:
+                print("Session expired, logging in again...")
+            username, password = load_decrypted_data("user_info.txt")
+            async with self.session.post(brain_api_url + '/authentication',
+                                         auth=aiohttp.BasicAuth(username, password)) as response:
+                if response.status != 201:
+                    raise Exception(f"Login failed! Status code: {response.status}, "
+                                    f"Response: {await response.text()}")
+            print("Login successful!")
+            self.start_time = time.time()
+            self._generation += 1
+
+    async def ensure_login(self):
+        if time.time() - self.start_time > self.expiry_time:
+            await self.login(self._generation)
+
+    @asynccontextmanager
+    async def request(self, method, url, throttle=True, **kwargs):
+        kwargs.setdefault('timeout', aiohttp.ClientTimeout(total=self.policy.timeout))
+        await self.ensure_login()
+        generation = self._generation
+
+        async def send():
+            nonlocal generation
+            generation = self._generation
+            return await self.session.request(method, url, **kwargs)
+
+        async def relogin():
+            await self.login(generation)
+
+        resp = await self.policy.acall(send, relogin, throttle)
+        try:
+            yield resp
+        finally:
+            resp.release()
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
 
-    username, password = load_decrypted_data("user_info.txt")
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
 
-    # 创建一个aiohttp的Session
-    conn = aiohttp.TCPConnector(ssl=False)
-    session = aiohttp.ClientSession(connector=conn)
+    def patch(self, url, **kwargs):
+        return self.request('PATCH', url, **kwargs)
 
-    try:
-        # 发送一个POST请求到/authentication API
-        async with session.post('https://api.worldquantbrain.com/authentication',
-                                auth=aiohttp.BasicAuth(username, password)) as response:
-            # 检查状态码是否为201，确保登录成功
-            if response.status == 201:
-                print("Login successful!")
+
+class ProgressPoller:
+    """
+    所有在途回测的 progress url 由这一个调度器轮询，不再每个回测各自 GET/sleep。
+    url 按下次该查的时间放进时间轮(每 tick 秒一格)，遵守每次返回的 Retry-After；
+    到期的 url 排队后按 rate 次/秒的全局预算均匀发出，不会一起涌向服务器。
+    watch(url) 返回 future，回测跑完(响应里没有 Retry-After)时得到最终的 json，
+    with_status=True 时得到 (状态码, json)。同一个 url 的所有等待方都取消后，这个 url 不再轮询。
+    请求出错时按 2, 4, 8... 秒(最多 max_error_delay)推迟这个 url，不影响其他 url
+    """
+
+    def __init__(self, client, rate=5, tick=0.5, slots=256, max_error_delay=60):
+        self.client = client
+        self.rate = rate
+        self.tick = tick
+        self.slots = slots
+        self.max_error_delay = max_error_delay
+        self._wheel = [[] for _ in range(slots)]
+        self._ready = deque()
+        self._futures = {}
+        self._watchers = defaultdict(int)
+        self._errors = defaultdict(int)
+        self._polls = set()
+        self._cursor = None
+        self._wakeup = None
+        self._task = None
+
+    def __len__(self):
+        return len(self._futures)
+
+    def _now(self):
+        return int(asyncio.get_running_loop().time() / self.tick)
+
+    def watch(self, url, with_status=False):
+        future = self._watch(url)
+        self._watchers[url] += 1
+        result = asyncio.get_running_loop().create_future()
+
+        def done(f):
+            if result.done():
+                return
+            if f.cancelled():
+                result.cancel()
+            elif f.exception() is not None:
+                result.set_exception(f.exception())
             else:
-                print(f"Login failed! Status code: {response.status}, Response: {await response.text()}")
-                await session.close()
-                return None
+                result.set_result(f.result() if with_status else f.result()[1])
+
+        def release(r):
+            # 等待方取消时，最后一个等待方走了就把内部 future 也取消，url 不再占用轮询预算
+            self._watchers[url] -= 1
+            if self._watchers[url] <= 0:
+                self._watchers.pop(url, None)
+                if r.cancelled() and not future.done():
+                    future.cancel()
+
+        future.add_done_callback(done)
+        result.add_done_callback(release)
+        return result
+
+    def _watch(self, url):
+        if url in self._futures and not self._futures[url].done():
+            return self._futures[url]
+        if self._task is None:
+            self._cursor = self._now() - 1
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self._futures[url] = future
+        self._schedule(url, 0)
+        return future
+
+    def _schedule(self, url, delay):
+        due = int((asyncio.get_running_loop().time() + delay) / self.tick)
+        if delay <= 0 or due <= self._cursor:
+            self._ready.append(url)
+            self._wakeup.set()
+        else:
+            self._wheel[due % self.slots].append((due, url))
+
+    def _advance(self):
+        now = self._now()
+        # 落后超过一圈时每一格只需要看一次
+        for t in range(max(self._cursor + 1, now - self.slots + 1), now + 1):
+            slot = self._wheel[t % self.slots]
+            if slot:
+                self._ready.extend(url for due, url in slot if due <= now)
+                slot[:] = [(due, url) for due, url in slot if due > now]
+        self._cursor = max(self._cursor, now)
+
+    async def _run(self):
+        interval = 1.0 / self.rate
+        while True:
+            self._advance()
+            if not self._ready:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.tick)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            url = self._ready.popleft()
+            future = self._futures.get(url)
+            if future is None or future.done():
+                # 等待方已经取消
+                self._futures.pop(url, None)
+                self._errors.pop(url, None)
+                continue
+            task = asyncio.create_task(self._poll(url))
+            self._polls.add(task)
+            task.add_done_callback(self._polls.discard)
+            await asyncio.sleep(interval)
 
-        return session
+    async def _poll(self, url):
+        try:
+            async with self.client.get(url) as resp:
+                retry_after = resp.headers.get('Retry-After', 0)
+                # 还没算完时响应体可能是空的
+                json_data = await resp.json(content_type=None) if retry_after == 0 else None
+        except Exception as e:
+            self._errors[url] += 1
+            delay = min(self.max_error_delay, 2 ** self._errors[url])
+            print("Error while checking progress: %s, retrying in %ds" % (str(e), delay))
+            self._schedule(url, delay)
+            return
+        self._errors.pop(url, None)
+        if retry_after != 0:
+            self._schedule(url, float(retry_after))
+            return
+        future = self._futures.pop(url, None)
+        if future is not None and not future.done():
+            future.set_result((resp.status, json_data))
+
+    async def close(self):
+        tasks = list(self._polls)
+        if self._task is not None:
+            tasks.append(self._task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+        self._task = None
+
+
+class ConcurrencyController:
+    """
+    AIMD 并发控制器，用法和 asyncio.Semaphore 一样：async with controller: ...
+    提交成功且窗口已用满时窗口加性增长(大约每个窗口的成功数 +1)，
+    收到 SIMULATION_LIMIT_EXCEEDED 时窗口乘性缩小，被限流的任务让出名额，
+    等在途回测减少后再重新提交，不再原地 sleep 重试。
+    当前窗口见 controller.limit
+    """
+
+    def __init__(self, initial=3, min_window=1, max_window=10, increase=1.0, decrease=0.5,
+                 cooldown=10, retry_delay=5):
+        self.window = float(initial)
+        self.min_window = min_window
+        self.max_window = max_window
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown  # 同一波限流只缩一次窗口
+        self.retry_delay = retry_delay
+        self.in_flight = 0
+        self._last_cut = 0
+        self._cond = None
+
+    @property
+    def limit(self):
+        return max(self.min_window, int(self.window))
+
+    def _condition(self):
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def acquire(self):
+        cond = self._condition()
+        async with cond:
+            await cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self):
+        cond = self._condition()
+        async with cond:
+            self.in_flight -= 1
+            cond.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.release()
+
+    async def on_success(self):
+        if self.in_flight < self.limit:
+            return
+        old_limit = self.limit
+        self.window = min(self.max_window, self.window + self.increase / self.window)
+        if self.limit != old_limit:
+            print(f"Concurrency window increased to {self.limit}")
+            cond = self._condition()
+            async with cond:
+                cond.notify_all()
+
+    async def on_limit_exceeded(self):
+        now = time.time()
+        if now - self._last_cut > self.cooldown:
+            self.window = max(self.min_window, self.window * self.decrease)
+            self._last_cut = now
+            print(f"Concurrency window decreased to {self.limit}")
+        await self.release()
+        await asyncio.sleep(self.retry_delay)
+        await self.acquire()
+
+
+class SimulationQueue:
+    """
+    worker 共用的回测任务队列。pending 记录还没做完的任务(排队中的和 worker 正在跑的)，
+    生成端结束(close)且 pending 归零后才放 n_workers 个 None 让 worker 退出，
+    所以失败后放回队列的任务一定有 worker 接着跑。
+    requeue 不会阻塞 worker：有界队列满了时交给后台任务等空位
+    """
+
+    def __init__(self, maxsize=0):
+        self.queue = asyncio.Queue(maxsize)
+        self.pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._requeues = set()
+
+    def qsize(self):
+        return self.queue.qsize()
+
+    async def put(self, unit):
+        self.pending += 1
+        self._idle.clear()
+        await self.queue.put(unit)
+
+    def put_nowait(self, unit):
+        self.pending += 1
+        self._idle.clear()
+        self.queue.put_nowait(unit)
+
+    def requeue(self, unit):
+        self.pending += 1
+        self._idle.clear()
+        try:
+            self.queue.put_nowait(unit)
+        except asyncio.QueueFull:
+            task = asyncio.ensure_future(self.queue.put(unit))
+            self._requeues.add(task)
+            task.add_done_callback(self._requeues.discard)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def task_done(self):
+        self.pending -= 1
+        if self.pending == 0:
+            self._idle.set()
+
+    async def close(self, n_workers):
+        """
+        等所有任务(包括重试的)做完后让 n_workers 个 worker 退出
+        """
+        await self._idle.wait()
+        for _ in range(n_workers):
+            await self.queue.put(None)
+
+
+async def simulate_multiple_tasks(alpha_list, region_list, decay_list, delay_list, name, neut, stone_bag=[], n=None,
+                                  multi_size=MULTI_SIZE, max_window=10, validator=None):
+    """
+    并发回测一批 alpha，所有任务共用同一个 BrainClient。
+    n 为 None 时由 ConcurrencyController 按限流情况自动调整并发(最多 max_window)，
+    给定 n 时固定并发数为 n。
+    multi_size > 1(默认 config.MULTI_SIZE)时把 region/delay 相同的 alpha 每 multi_size 个(最多 10 个)打包成一个
+    multi-simulation，一个并发名额可以回测多个 alpha；multi-simulation 被拒时这一批改成逐个回测。
+    提交前先用 validator(默认只按算子目录检查)过滤掉本地就能判断出错误的表达式，
+    规范形式相同(expression_hash 相同)且 region/decay/delay 也相同的任务只回测第一个。
+    所有任务放进同一个队列，worker 谁空闲谁取下一个，慢任务不会拖住其他 worker
+    """
+    if validator is None:
+        validator = operator_catalog.validator()
+    valid = set(validator.filter(alpha_list))
+    tasks = []
+    seen = set()
+    for alpha, region, decay, delay in zip(alpha_list, region_list, decay_list, delay_list):
+        key = (expression_hash(alpha), tuple(region), decay, delay)
+        if alpha in valid and key not in seen:
+            seen.add(key)
+            tasks.append((alpha, region, decay, delay))
+    if not tasks:
+        return
+
+    if n is None:
+        semaphore = ConcurrencyController(max_window=max_window)
+        n_workers = max_window
+    else:
+        semaphore = asyncio.Semaphore(n)
+        n_workers = n
+    tags = [name]
+    multi_size = min(max(multi_size, 1), 10)
+
+    # 中断前已经提交、还在跑的回测直接接上，不再重新提交
+    journal = get_result_store().journal_pending(name)
+    in_flight = {expression_hash(alpha) for url, entries in journal for alpha, settings in entries}
+
+    grouped_dict = defaultdict(list)
+    for alpha, region, decay, delay in tasks:
+        if expression_hash(alpha) not in in_flight:
+            grouped_dict[(tuple(region), delay)].append((alpha, decay))
+
+    queue = SimulationQueue()
+    for (region, delay), items in grouped_dict.items():
+        for i in range(0, len(items), multi_size):
+            queue.put_nowait((items[i:i + multi_size], region, delay, 0))
+    n_workers = max(min(n_workers, queue.qsize()), 1)
+
+    async with BrainClient(limit=n_workers * 2) as client:
+        try:
+            async with PostProcessor(client) as post:
+                await asyncio.gather(resume_journal(client, journal, name, tags, semaphore, post=post),
+                                     queue.close(n_workers),
+                                     *[simulation_worker(client, queue, name, neut, stone_bag, tags, semaphore,
+                                                         post=post)
+                                       for _ in range(n_workers)])
+        finally:
+            get_result_store().flush()
+
+
+async def simulate_stream(alphas, region_info, decay, delay, name, neut, stone_bag=[], n=None,
+                          multi_size=MULTI_SIZE, max_window=10, queue_size=None, validator=None):
+    """
+    流式回测：alphas 可以是生成器(产出表达式或 (表达式, decay))，
+    边生成边经有界队列交给 worker 回测，队列满时生成端等待，
+    内存占用和搜索空间大小无关，第一个回测在生成开始后马上就能提交。
+    去重/过滤已回测的表达式放在生成器里做(iter_dedup / ResultStore.iter_pending)。
+    region_info/decay/delay 对所有表达式相同，decay 会被 (表达式, decay) 里的值覆盖
+    """
+    if n is None:
+        semaphore = ConcurrencyController(max_window=max_window)
+        n_workers = max_window
+    else:
+        semaphore = asyncio.Semaphore(n)
+        n_workers = n
+    if validator is None:
+        validator = operator_catalog.validator()
+    multi_size = min(max(multi_size, 1), 10)
+    queue = SimulationQueue(maxsize=queue_size or n_workers * 2)
+    tags = [name]
+
+    journal = get_result_store().journal_pending(name)
+    in_flight = {expression_hash(alpha) for url, entries in journal for alpha, settings in entries}
+
+    async def produce():
+        count = 0
+        task = []
+        for item in alphas:
+            alpha, alpha_decay = item if isinstance(item, tuple) else (item, decay)
+            if expression_hash(alpha) in in_flight or not validator.is_valid(alpha):
+                continue
+            task.append((alpha, alpha_decay))
+            count += 1
+            if len(task) >= multi_size:
+                await queue.put((task, region_info, delay, 0))
+                task = []
+        if task:
+            await queue.put((task, region_info, delay, 0))
+        print("Stream exhausted, %d alphas queued" % count)
+        await queue.close(n_workers)
+
+    async with BrainClient(limit=n_workers * 2) as client:
+        try:
+            async with PostProcessor(client) as post:
+                await asyncio.gather(resume_journal(client, journal, name, tags, semaphore, post=post), produce(),
+                                     *[simulation_worker(client, queue, name, neut, stone_bag, tags, semaphore,
+                                                         post=post)
+                                       for _ in range(n_workers)])
+        finally:
+            get_result_store().flush()
+
+
+async def simulation_worker(client, queue, name, neut, stone_bag, tags, semaphore, max_retries=1, post=None):
+    """
+    从共享的 SimulationQueue 里取 (task, region_info, delay, 重试次数) 回测，取到 None 退出。
+    task 只有一个 alpha 时单独回测，否则走 multi-simulation。
+    回测抛异常时把任务放回队列尾部，由任意空闲 worker 重试
+    """
+    while True:
+        unit = await queue.get()
+        if unit is None:
+            break
+        task, region_info, delay, attempt = unit
+        try:
+            if len(task) == 1:
+                # multi-simulation 至少要 2 个 alpha
+                alpha, decay = task[0]
+                await simulate_single(client, alpha, region_info, name, neut, decay, delay,
+                                      stone_bag, tags, semaphore, post=post)
+            else:
+                await simulate_multi(client, task, region_info, name, neut, delay, stone_bag, tags, semaphore,
+                                     post=post)
+        except Exception as e:
+            if attempt < max_retries:
+                print("Simulation task failed, requeueing: %s" % e)
+                queue.requeue((task, region_info, delay, attempt + 1))
+            else:
+                print("Simulation task failed, giving up on %d alphas: %s" % (len(task), e))
+        finally:
+            queue.task_done()
+
+
+async def async_post_simulation(client, simulation_data, semaphore=None):
+    """
+    提交回测，simulation_data 可以是单个 dict，也可以是 multi-simulation 的 list。
+    成功返回 progress url；表达式重复/有误时返回 None。
+    semaphore 是 ConcurrencyController 时，把提交结果反馈给它调整并发窗口。
+    5xx/网络错误由 client 的重试策略处理，重试后仍失败时抛出，由 simulation_worker 把任务放回队列
+    """
+    while True:
+        async with client.post(brain_api_url + '/simulations', json=simulation_data, throttle=False) as resp:
+            simulation_progress_url = resp.headers.get('Location', 0)
+            if simulation_progress_url == 0:
+                json_data = await resp.json(content_type=None)
+                if type(json_data) == list:
+                    print(json_data)
+                    detail = 0
+                else:
+                    detail = json_data.get("detail", 0)
+                if detail == 'SIMULATION_LIMIT_EXCEEDED':
+                    print("Limited by the number of simulations allowed per time")
+                    if isinstance(semaphore, ConcurrencyController):
+                        await semaphore.on_limit_exceeded()
+                    else:
+                        await asyncio.sleep(client.policy.backoff(0, resp.headers.get('Retry-After', 5)))
+                elif resp.status >= 500:
+                    raise RuntimeError("Simulation request failed with status %d" % resp.status)
+                else:
+                    print("detail:", detail)
+                    print("json_data:", json_data)
+                    print("Alpha expression is duplicated")
+                    return None
+            else:
+                print('simulation_progress_url:', simulation_progress_url)
+                if isinstance(semaphore, ConcurrencyController):
+                    await semaphore.on_success()
+                return simulation_progress_url
+
+
+async def async_wait_progress(client, simulation_progress_url):
+    """
+    等 progress url 跑完(没有 Retry-After)，返回最终的 json。轮询由 client.poller 统一调度
+    """
+    return await client.poller.watch(simulation_progress_url)
+
+
+_result_store = None
+
+
+def get_result_store():
+    """
+    进程内共用的回测结果库
+    """
+    global _result_store
+    if _result_store is None:
+        _result_store = ResultStore()
+    return _result_store
+
+
+async def async_record_alpha(client, alpha_id, alpha, name, tags, settings=None):
+    """
+    给回测完成的 alpha 打上 name/tag，并把表达式、settings 和 IS 指标记录到结果库，
+    同时写进 alpha 本地镜像。返回 IS 指标(alpha json 的 is 字段)，拿不到时返回 None
+    """
+    metrics = None
+    try:
+        alpha_data = await async_set_alpha_properties(client,
+                                                      alpha_id,
+                                                      name="%s" % name,
+                                                      color=None,
+                                                      tags=tags)
+        if not isinstance(alpha_data, dict) or not alpha_data.get("is"):
+            # PATCH 的返回里没有 IS 指标时单独查一次
+            async with client.get(f"{brain_api_url}/alphas/{alpha_id}") as resp:
+                alpha_data = await resp.json()
+        metrics = alpha_data.get("is")
+        if alpha_data.get("id") and alpha_data.get("settings"):
+            get_alpha_mirror().upsert([alpha_data])
 
-    except aiohttp.ClientError as e:
-        print(f"Error during login request: {e}")
-        await session.close()
     except Exception as e:
-        print(f"An unexpected error occurred: {e}")
-        await session.close()
+        print("An error occurred while setting alpha properties:", str(e))
 
-    return None
+    get_result_store().add(name, alpha, settings, alpha_id, metrics)
+    return metrics
 
 
-async def simulate_single(session_manager, alpha_expression, region_info, name, neut,
+async def simulate_single(client, alpha_expression, region_info, name, neut,
                           decay, delay, stone_bag, tags=['None'],
-                          semaphore=None):
+                          semaphore=None, on_complete=None, post=None):
     """
-    单次模拟一个alpha表达式对应的某个地区的信息
+    单次模拟一个alpha表达式对应的某个地区的信息。
+    并发名额只覆盖提交和轮询，打标签/记录交给 post(PostProcessor)，没有 post 时在名额外直接做
     """
     async with semaphore:
-        # 每个任务在执行前都检查会话时间
-        if time.time() - session_manager.start_time > session_manager.expiry_time:
-            await session_manager.refresh_session()
-
         region, uni = region_info
         alpha = "%s" % (alpha_expression)
 
         print("Simulating for alpha: %s, region: %s, universe: %s, decay: %s" % (alpha, region, uni, decay))
 
-        simulation_data = {
-            'type': 'REGULAR',
-            'settings': {
-                'instrumentType': 'EQUITY',
-                'region': region,
-                'universe': uni,
-                'delay': delay,
-                'decay': decay,
-                'neutralization': neut,
-                'truncation': 0.08,
-                'pasteurization': 'ON',
-                'unitHandling': 'VERIFY',
-                'nanHandling': 'ON',
-                'language': 'FASTEXPR',
-                'visualization': False,
-            },
-            'regular': alpha
-        }
+        simulation_data = generate_sim_data([(alpha, decay)], region, uni, neut, delay)[0]
 
-        while True:
-            try:
-                async with session_manager.session.post('https://api.worldquantbrain.com/simulations',
-                                                        json=simulation_data) as resp:
-                    simulation_progress_url = resp.headers.get('Location', 0)
-                    if simulation_progress_url == 0:
-                        json_data = await resp.json()
-                        if type(json_data) == list:
-                            print(json_data)
-                            detail = json_data.get("detail", 0)
-                        else:
-                            detail = json_data.get("detail", 0)
-                        if detail == 'SIMULATION_LIMIT_EXCEEDED':
-                            print("Limited by the number of simulations allowed per time")
-                            await asyncio.sleep(5)
-                        else:
-                            print("detail:", detail)
-                            print("json_data:", json_data)
-                            print("Alpha expression is duplicated")
-                            await asyncio.sleep(1)
-                            return 0
-                    else:
-                        print('simulation_progress_url:', simulation_progress_url)
-                        break
-            except KeyError:
-                print("Location key error during simulation request")
-                await asyncio.sleep(60)
-                return
-            except Exception as e:
-                print("An error occurred:", str(e))
-                await asyncio.sleep(60)
-                return
+        simulation_progress_url = await async_post_simulation(client, simulation_data, semaphore)
+        if simulation_progress_url is None:
+            return 0
+
+        entries = [(alpha, simulation_data['settings'])]
+        get_result_store().journal_add(name, simulation_progress_url, entries)
+        completed = await async_wait_simulation(client, simulation_progress_url, entries)
+
+    await async_finish_simulation(client, simulation_progress_url, completed, name, tags, on_complete, post)
+    # stone_bag.append(alpha_id)
+
+    # return stone_bag
+    return 0
 
+
+async def simulate_multi(client, task, region_info, name, neut, delay, stone_bag, tags=['None'],
+                         semaphore=None, on_complete=None, post=None):
+    """
+    一次 multi-simulation 回测 task 里的多个 (alpha, decay)（2~10 个），
+    只轮询父 progress url，完成后遍历 children 拿到每个 alpha 的 id。
+    multi-simulation 被拒(没有权限、其中有表达式出错)时改成逐个单独回测
+    """
+    async with semaphore:
+        region, uni = region_info
+
+        print("Multi-simulating %d alphas, region: %s, universe: %s" % (len(task), region, uni))
+
+        sim_data_list = generate_sim_data(task, region, uni, neut, delay)
+
+        simulation_progress_url = await async_post_simulation(client, sim_data_list, semaphore)
+        if simulation_progress_url is not None:
+            entries = [(alpha, sim_data['settings']) for (alpha, decay), sim_data in zip(task, sim_data_list)]
+            get_result_store().journal_add(name, simulation_progress_url, entries)
+            completed = await async_wait_simulation(client, simulation_progress_url, entries)
+
+    if simulation_progress_url is None:
+        print("Multi-simulation rejected, simulating %d alphas one by one" % len(task))
+        await asyncio.gather(*[simulate_single(client, alpha, region_info, name, neut, decay, delay, stone_bag, tags,
+                                               semaphore, on_complete, post)
+                               for alpha, decay in task])
+        return 0
+    await async_finish_simulation(client, simulation_progress_url, completed, name, tags, on_complete, post)
+    return 0
+
+
+async def async_wait_simulation(client, simulation_progress_url, entries):
+    """
+    等 progress url 跑完，返回 [(alpha_id, 表达式, settings), ...]。
+    entries 是 [(表达式, settings), ...]，多于一个时按 multi-simulation 的 children 处理
+    """
+    json_data = await async_wait_progress(client, simulation_progress_url)
+    print("%s done simulating, getting alpha details" % (simulation_progress_url))
+
+    completed = []
+    if len(entries) == 1:
+        alpha, settings = entries[0]
+        alpha_id = json_data.get("alpha")
+        if alpha_id is None:
+            print("Failed to retrieve alpha ID for: %s" % simulation_progress_url)
+        else:
+            completed.append((alpha_id, alpha, settings))
+    else:
+        status = json_data.get("status", 0)
+        if status != "COMPLETE":
+            print("Not complete : %s, status: %s" % (simulation_progress_url, status))
+
+        children = json_data.get("children", [])
+        children_data = await asyncio.gather(*[async_wait_progress(client, brain_api_url + "/simulations/" + child)
+                                               for child in children])
+        for child, child_data, (alpha, settings) in zip(children, children_data, entries):
+            alpha_id = child_data.get("alpha")
+            if alpha_id is None:
+                print("Failed to retrieve alpha ID for: %s, alpha: %s" % (child, alpha))
+                continue
+            completed.append((alpha_id, alpha, settings))
+    return completed
+
+
+async def async_finish_simulation(client, simulation_progress_url, completed, name, tags, on_complete=None,
+                                  post=None):
+    """
+    给回测完成的 alpha 打标签并记录到结果库，最后从回测日志里删掉这条 progress url。
+    on_complete(alpha_id, 表达式, settings, IS 指标) 在每个 alpha 记录完后调用。
+    给了 post(PostProcessor)时只是放进它的队列，马上返回
+    """
+    if post is not None:
+        post.submit(simulation_progress_url, completed, name, tags, on_complete)
+        return
+    for alpha_id, alpha, settings in completed:
+        metrics = await async_record_alpha(client, alpha_id, alpha, name, tags, settings)
+        if on_complete is not None:
+            await on_complete(alpha_id, alpha, settings, metrics)
+    get_result_store().journal_remove(simulation_progress_url)
+
+
+class PostProcessor:
+    """
+    回测完成后的收尾(PATCH 打标签、记录结果、on_complete 回调)放在单独的小 worker 池里做，
+    回测 worker 交出 alpha id 后马上释放并发名额去提交下一个。
+    结果库本身是攒批写入的。on_done 在每条收尾完成后调用
+    """
+
+    def __init__(self, client, n_workers=2, on_done=None):
+        self.client = client
+        self.n_workers = n_workers
+        self.on_done = on_done
+        self.pending = 0
+        self._queue = asyncio.Queue()
+        self._workers = []
+
+    def submit(self, simulation_progress_url, completed, name, tags, on_complete=None):
+        self.pending += 1
+        self._queue.put_nowait((simulation_progress_url, completed, name, tags, on_complete))
+
+    async def _work(self):
         while True:
+            item = await self._queue.get()
+            if item is None:
+                break
             try:
-                async with session_manager.session.get(simulation_progress_url) as resp:
-                    json_data = await resp.json()
-                    # 获取响应头
-                    headers = resp.headers
-                    retry_after = headers.get('Retry-After', 0)
-                    if retry_after == 0:
-                        break
-                    await asyncio.sleep(float(retry_after))
+                url, completed, name, tags, on_complete = item
+                await async_finish_simulation(self.client, url, completed, name, tags, on_complete)
             except Exception as e:
-                print("Error while checking progress:", str(e))
-                await asyncio.sleep(60)
+                print("Post-processing failed:", str(e))
+            finally:
+                self.pending -= 1
+                if self.on_done is not None:
+                    self.on_done()
 
-        print("%s done simulating, getting alpha details" % (simulation_progress_url))
-        try:
-            alpha_id = json_data.get("alpha")
+    async def __aenter__(self):
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.n_workers)]
+        return self
 
-            await async_set_alpha_properties(session_manager.session,
-                                             alpha_id,
-                                             name="%s" % name,
-                                             color=None,
-                                             tags=tags)
+    async def __aexit__(self, exc_type, exc, tb):
+        # 把已经交进来的收尾做完再退出
+        for _ in self._workers:
+            self._queue.put_nowait(None)
+        await asyncio.gather(*self._workers)
 
-            async with aiofiles.open(f'records/{name}_simulated_alpha_expression.txt', mode='a') as f:
-                await f.write(alpha + '\n')
 
-            # stone_bag.append(alpha_id)
+async def resume_journal(client, journal, name, tags, semaphore, on_complete=None, post=None, on_done=None):
+    """
+    接上回测日志里中断前还在跑的回测，每个 progress url 占一个并发名额直到跑完。
+    on_done 在每个 progress url 收尾完成(给了 post 时是交给 post 之后)调用
+    """
+    if not journal:
+        return
+    print("Resuming %d in-flight simulations of %s" % (len(journal), name))
 
-        except KeyError:
-            print("Failed to retrieve alpha ID for: %s" % simulation_progress_url)
-        except Exception as e:
-            print("An error occurred while setting alpha properties:", str(e))
+    async def resume(url, entries):
+        try:
+            async with semaphore:
+                completed = await async_wait_simulation(client, url, entries)
+            await async_finish_simulation(client, url, completed, name, tags, on_complete, post)
+        finally:
+            if on_done is not None:
+                on_done()
 
-        # return stone_bag
-        return 0
+    await asyncio.gather(*[resume(url, entries) for url, entries in journal])
 
 
 async def async_set_alpha_properties(
-        session,  # aiohttp 的 session
+        client,  # BrainClient，也兼容 aiohttp 的 session
         alpha_id,
         name: str = None,
         color: str = None,
@@ -1384,7 +2388,7 @@ async def async_set_alpha_properties(
         tags: list = None,
 ):
     """
-    异步函数，修改 alpha 的描述参数
+    异步函数，修改 alpha 的描述参数，成功时返回修改后的 alpha json
     """
 
     params = {
@@ -1402,13 +2406,14 @@ async def async_set_alpha_properties(
     if selection_desc:
         params["selection"] = {"description": selection_desc}
 
-    url = f"https://api.worldquantbrain.com/alphas/{alpha_id}"
+    url = f"{brain_api_url}/alphas/{alpha_id}"
 
     try:
-        async with session.patch(url, json=params) as response:
+        async with client.patch(url, json=params) as response:
             # 检查状态码，确保请求成功
             if response.status == 200:
                 print(f"Alpha {alpha_id} properties updated successfully! Tag: {tags}")
+                return await response.json(content_type=None)
             else:
                 print(
                     f"Failed to update alpha {alpha_id}. Status code: {response.status}, Response: {await response.text()}")
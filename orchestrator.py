@@ -0,0 +1,221 @@
+import asyncio
+import itertools
+from collections import defaultdict
+from datetime import datetime
+
+from machine_lib import *
+from config import *
+from result_store import expression_hash
+
+
+class Stage:
+    """
+    挖掘漏斗里的一个阶段。
+    tag: 这一阶段回测用的 name/tag
+    sharpe_th/fitness_th: 这一阶段的 alpha 晋级到下一阶段的门槛(负的 sharpe 取反后晋级)
+    expand(expr, region, delay): 由晋级的表达式生成下一阶段的表达式，最后一个阶段为 None
+    keep_num/prefix: 同 prune，每个字段(按 prefix 切出来)最多晋级 keep_num 个
+    """
+
+    def __init__(self, tag, sharpe_th=None, fitness_th=None, expand=None, keep_num=None, prefix=None):
+        self.tag = tag
+        self.sharpe_th = sharpe_th
+        self.fitness_th = fitness_th
+        self.expand = expand
+        self.keep_num = keep_num
+        self.prefix = prefix
+        self._kept = defaultdict(int)
+
+    def promote(self, expr, is_, region):
+        """
+        返回晋级用的表达式(sharpe 为负时取反)，不满足门槛时返回 None
+        """
+        if self.expand is None or not is_:
+            return None
+        sharpe, fitness = is_.get("sharpe"), is_.get("fitness")
+        if sharpe is None or fitness is None:
+            return None
+        if sharpe < 0:
+            sharpe, fitness, expr = -sharpe, -fitness, "-%s" % expr
+        if sharpe < self.sharpe_th or fitness < self.fitness_th:
+            return None
+        if not passes_is_checks(is_, self.sharpe_th, region):
+            return None
+        if self.keep_num is not None and self.prefix:
+            field = expr.split(self.prefix)[-1].split(",")[0]
+            if self._kept[field] >= self.keep_num:
+                return None
+            self._kept[field] += 1
+        return expr
+
+
+def default_stages(region, delay, instrumentType, universe, dataset_id):
+    """
+    和 DIG1_fast → DIG2 → DIG3 一样的三阶段漏斗：一阶 → group 二阶 → trade_when。
+    原来的第四阶段 template_factory 不在代码里，需要时追加一个 Stage 即可
+    """
+    prefix = f"{region}_{delay}_{instrumentType}_{universe}_{dataset_id}"
+    if delay == 1:
+        step2_th, step3_th = (1.0, 0.5), (1.2, 0.75)
+    else:
+        step2_th, step3_th = (2.0, 1.0), (2.6, 1.4)
+
+    def group_second_order(expr, region, delay):
+        return [expr] + get_group_second_order_factory([expr], group_ops, region)
+
+    def trade_when(expr, region, delay):
+        return trade_when_factory("trade_when", expr, region, delay)
+
+    return [Stage(f"{prefix}_step1", *step2_th, expand=group_second_order, keep_num=3, prefix=dataset_id),
+            Stage(f"{prefix}_step2", *step3_th, expand=trade_when, keep_num=3, prefix=dataset_id),
+            Stage(f"{prefix}_step3")]
+
+
+class MiningOrchestrator:
+    """
+    在一个进程里跑完整个挖掘漏斗：所有阶段共用一个 BrainClient 和一个并发名额池。
+    某个 alpha 回测完成、IS 指标(回测收尾时已经拿到)过了本阶段门槛时，立刻把它的下一阶段表达式放进队列，
+    不用等下一个脚本 sleep(600) 之后再去 get_alphas。
+    队列按阶段排优先级(后面的阶段先跑)，第一阶段的种子表达式只在队列快空时才继续生成
+    """
+
+    def __init__(self, stages, region, universe, delay, neut='SUBINDUSTRY', n=None, max_window=10,
+                 validator=None):
+        self.stages = stages
+        self.region = region
+        self.universe = universe
+        self.delay = delay
+        self.neut = neut
+        if n is None:
+            self.semaphore = ConcurrencyController(max_window=max_window)
+            self.n_workers = max_window
+        else:
+            self.semaphore = asyncio.Semaphore(n)
+            self.n_workers = n
+        self.validator = validator or operator_catalog.validator()
+        self.store = get_result_store()
+        self.queue = None
+        self.post = None
+        self.queued = [set() for _ in stages]
+        self.pending = 0
+        self.seeding = True
+        self._counter = itertools.count()
+        self._taken = None
+
+    def enqueue(self, stage_index, items):
+        """
+        items 是 [(表达式, decay), ...]，去重、过滤已回测/不合法的表达式后放进队列，返回放进去的个数
+        """
+        stage = self.stages[stage_index]
+        decays = dict(items)
+        expressions = self.validator.filter(self.store.filter_pending(stage.tag, [expr for expr, decay in items]))
+        count = 0
+        for expr in expressions:
+            h = expression_hash(expr)
+            if h in self.queued[stage_index]:
+                continue
+            self.queued[stage_index].add(h)
+            self.queue.put_nowait((-stage_index, next(self._counter), stage_index, expr, decays[expr]))
+            self.pending += 1
+            count += 1
+        return count
+
+    def _finish_if_done(self):
+        # 收尾里的晋级还可能往队列里加表达式，要等它们也做完
+        if not self.seeding and self.pending == 0 and self.post.pending == 0:
+            for _ in range(self.n_workers):
+                self.queue.put_nowait((float('inf'), next(self._counter), None, None, None))
+
+    def _resumed(self):
+        self.pending -= 1
+        self._finish_if_done()
+
+    def _on_complete(self, client, stage_index):
+        stage = self.stages[stage_index]
+
+        async def promote(alpha_id, alpha, settings, is_):
+            if stage.expand is None:
+                return
+            expr = stage.promote(alpha, is_, self.region)
+            if expr is None:
+                return
+            decay = ladder_decay(settings["decay"], is_["turnover"]) or settings["decay"]
+            children = [(child, decay) for child in stage.expand(expr, self.region, self.delay)]
+            count = self.enqueue(stage_index + 1, children)
+            print(datetime.now(), f"{alpha_id} promoted from {stage.tag}, {count} expressions queued")
+
+        return promote
+
+    async def _seed(self, seeds, decay):
+        low_water = self.n_workers * 2
+        batch = []
+        for item in seeds:
+            batch.append(item if isinstance(item, tuple) else (item, decay))
+            if len(batch) < low_water:
+                continue
+            while self.queue.qsize() >= low_water:
+                self._taken.clear()
+                await self._taken.wait()
+            self.enqueue(0, batch)
+            batch = []
+        if batch:
+            self.enqueue(0, batch)
+        self.seeding = False
+        print(datetime.now(), "All seeds queued")
+        self._finish_if_done()
+
+    async def _worker(self, client):
+        region_info = (self.region, self.universe)
+        while True:
+            _, _, stage_index, expr, decay = await self.queue.get()
+            if stage_index is None:
+                break
+            self._taken.set()
+            stage = self.stages[stage_index]
+            try:
+                await simulate_single(client, expr, region_info, stage.tag, self.neut, decay, self.delay,
+                                      [], [stage.tag], self.semaphore,
+                                      on_complete=self._on_complete(client, stage_index), post=self.post)
+            except Exception as e:
+                print(datetime.now(), f"Simulation of {expr} failed: {e}")
+            finally:
+                self.pending -= 1
+                self._finish_if_done()
+
+    async def run(self, seeds, decay=6):
+        """
+        seeds 是第一阶段的表达式(或 (表达式, decay))，可以是生成器
+        """
+        self.queue = asyncio.PriorityQueue()
+        self._taken = asyncio.Event()
+        async with BrainClient(limit=self.n_workers * 2) as client, \
+                PostProcessor(client, on_done=self._finish_if_done) as post:
+            self.post = post
+            resumes = []
+            for stage_index, stage in enumerate(self.stages):
+                journal = self.store.journal_pending(stage.tag)
+                for url, entries in journal:
+                    self.queued[stage_index].update(expression_hash(alpha) for alpha, settings in entries)
+                # 接上的回测也算在 pending 里，它们的晋级还没放进队列前 worker 不能退出
+                self.pending += len(journal)
+                resumes.append(resume_journal(client, journal, stage.tag, [stage.tag], self.semaphore,
+                                              self._on_complete(client, stage_index), post, self._resumed))
+            try:
+                await asyncio.gather(*resumes, self._seed(seeds, decay),
+                                     *[self._worker(client) for _ in range(self.n_workers)])
+            finally:
+                self.store.flush()
+
+
+if __name__ == '__main__':
+    dataset_id = 'analyst4'
+    region, delay, instrumentType, universe = 'USA', 1, 'EQUITY', 'TOP3000'
+
+    df = get_datafields(None, instrumentType, region, delay, universe, dataset_id=dataset_id)
+    pc_fields = process_datafields(df, "matrix") + process_datafields(df, "vector")
+
+    stages = default_stages(region, delay, instrumentType, universe, dataset_id)
+    seeds = iter_first_order(pc_fields, ts_ops + basic_ops)
+    orchestrator = MiningOrchestrator(stages, region, universe, delay, n=None,
+                                      validator=operator_catalog.validator(df))
+    asyncio.run(orchestrator.run(seeds, decay=6))
@@ -0,0 +1,338 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config import RECORDS_PATH, RESULTS_DB_PATH
+from fastexpr import canonicalize
+
+
+def expression_hash(expression):
+    """
+    按规范形式计算 hash，写法不同但语义相同的表达式(空格、多余括号、数字格式)视为同一个
+    """
+    return hashlib.sha1(canonicalize(expression).encode('utf-8')).hexdigest()
+
+
+def settings_hash(settings):
+    if not settings:
+        return ''
+    return hashlib.sha1(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class ResultStore:
+    """
+    回测结果库(SQLite)，替代 records/{tag}_simulated_alpha_expression.txt。
+    按 (tag, 表达式 hash, 回测 settings hash) 建索引，保存 alpha_id、settings 和 IS 指标，
+    查询"是否已经回测过"时只查索引，不需要把整份记录读进内存。
+    写入先进缓冲区，攒够 batch_size 条或距离上次写入超过 flush_interval 秒时批量提交。
+    第一次查询某个 tag 时会自动导入旧的 txt 记录文件。
+    """
+
+    def __init__(self, path=RESULTS_DB_PATH, batch_size=50, flush_interval=5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._last_flush = time.time()
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+
+    def _create_tables(self):
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS simulations (
+                    tag TEXT NOT NULL,
+                    expr_hash TEXT NOT NULL,
+                    settings_hash TEXT NOT NULL,
+                    expression TEXT NOT NULL,
+                    settings TEXT,
+                    alpha_id TEXT,
+                    sharpe REAL,
+                    fitness REAL,
+                    turnover REAL,
+                    margin REAL,
+                    long_count INTEGER,
+                    short_count INTEGER,
+                    checks TEXT,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (tag, expr_hash, settings_hash)
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_simulations_alpha_id ON simulations (alpha_id)")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS journal (
+                    progress_url TEXT PRIMARY KEY,
+                    tag TEXT NOT NULL,
+                    entries TEXT NOT NULL,
+                    submitted_at REAL NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_journal_tag ON journal (tag)")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS legacy_imports (
+                    tag TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    offset INTEGER NOT NULL
+                )
+            """)
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def _row(tag, expression, settings=None, alpha_id=None, metrics=None):
+        metrics = metrics or {}
+        return (tag, expression_hash(expression), settings_hash(settings), canonicalize(expression),
+                json.dumps(settings, sort_keys=True) if settings else None, alpha_id,
+                metrics.get('sharpe'), metrics.get('fitness'), metrics.get('turnover'), metrics.get('margin'),
+                metrics.get('longCount'), metrics.get('shortCount'),
+                json.dumps(metrics['checks']) if metrics.get('checks') is not None else None,
+                time.time())
+
+    def add(self, tag, expression, settings=None, alpha_id=None, metrics=None):
+        """
+        记录一条回测结果，metrics 是 alpha 的 is 字段(sharpe/fitness/turnover/...)
+        """
+        with self._lock:
+            self._buffer.append(self._row(tag, expression, settings, alpha_id, metrics))
+            need_flush = (len(self._buffer) >= self.batch_size or
+                          time.time() - self._last_flush > self.flush_interval)
+        if need_flush:
+            self.flush()
+
+    def add_many(self, tag, expressions, settings=None):
+        with self._lock:
+            self._buffer.extend(self._row(tag, expression, settings) for expression in expressions)
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+            self._last_flush = time.time()
+            self._write(rows)
+
+    def _write(self, rows):
+        if not rows:
+            return
+        with self.conn:
+            self._insert(rows)
+
+    def _insert(self, rows):
+        if rows:
+            self.conn.executemany("""
+                INSERT INTO simulations (tag, expr_hash, settings_hash, expression, settings, alpha_id,
+                                         sharpe, fitness, turnover, margin, long_count, short_count,
+                                         checks, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (tag, expr_hash, settings_hash) DO UPDATE SET
+                    alpha_id = COALESCE(excluded.alpha_id, alpha_id),
+                    sharpe = COALESCE(excluded.sharpe, sharpe),
+                    fitness = COALESCE(excluded.fitness, fitness),
+                    turnover = COALESCE(excluded.turnover, turnover),
+                    margin = COALESCE(excluded.margin, margin),
+                    long_count = COALESCE(excluded.long_count, long_count),
+                    short_count = COALESCE(excluded.short_count, short_count),
+                    checks = COALESCE(excluded.checks, checks)
+            """, rows)
+
+    def import_legacy(self, tag, path=None):
+        """
+        导入旧的 {tag}_simulated_alpha_expression.txt（跳过 # 注释行）。
+        记录已导入到的位置，文件之后再追加的内容下次会接着导入
+        """
+        path = path or os.path.join(RECORDS_PATH, f"{tag}_simulated_alpha_expression.txt")
+        if not os.path.exists(path):
+            return 0
+        with self._lock:
+            row = self.conn.execute("SELECT offset FROM legacy_imports WHERE tag = ? AND path = ?",
+                                    (tag, path)).fetchone()
+        offset = row[0] if row else 0
+        if os.path.getsize(path) <= offset:
+            return 0
+
+        rows = []
+        count = 0
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # 最后一行还没写完整，下次再导入
+                    break
+                offset += len(line)
+                expression = line.decode('utf-8', errors='ignore').strip()
+                if expression and not expression.startswith('#'):
+                    rows.append(self._row(tag, expression))
+                    count += 1
+        with self._lock:
+            for i in range(0, len(rows), 10000):
+                self._write(rows[i:i + 10000])
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO legacy_imports (tag, path, offset) VALUES (?, ?, ?)",
+                              (tag, path, offset))
+        if count:
+            print(f"Imported {count} expressions of {tag} from {path}")
+        return count
+
+    def is_done(self, tag, expression, settings=None):
+        return len(self.filter_pending(tag, [expression], settings)) == 0
+
+    def filter_pending(self, tag, expressions, settings=None):
+        """
+        返回 expressions 里还没有回测过的表达式(保持原顺序)，
+        规范形式相同的表达式只保留第一个。
+        settings 为 None 时只按表达式去重，和原来的 txt 记录一致
+        """
+        self.flush()
+        self.import_legacy(tag)
+        done = set()
+        hashes = [expression_hash(e) for e in expressions]
+        unique_hashes = list(set(hashes))
+        with self._lock:
+            for i in range(0, len(unique_hashes), 500):
+                chunk = unique_hashes[i:i + 500]
+                sql = ("SELECT expr_hash FROM simulations WHERE tag = ? AND expr_hash IN (%s)" %
+                       ','.join('?' * len(chunk)))
+                params = [tag] + chunk
+                if settings is not None:
+                    sql += " AND settings_hash = ?"
+                    params.append(settings_hash(settings))
+                done.update(h for (h,) in self.conn.execute(sql, params))
+        pending = []
+        for e, h in zip(expressions, hashes):
+            if h not in done:
+                done.add(h)
+                pending.append(e)
+        return pending
+
+    def iter_pending(self, tag, expressions, settings=None, chunk_size=500):
+        """
+        filter_pending 的流式版本：每 chunk_size 条查一次库，
+        expressions 可以是生成器，只在内存里保留已产出表达式的 hash
+        """
+        seen = set()
+        chunk = []
+        for expression in expressions:
+            chunk.append(expression)
+            if len(chunk) >= chunk_size:
+                yield from self._pending_chunk(tag, chunk, settings, seen)
+                chunk = []
+        if chunk:
+            yield from self._pending_chunk(tag, chunk, settings, seen)
+
+    def _pending_chunk(self, tag, chunk, settings, seen):
+        for expression in self.filter_pending(tag, chunk, settings):
+            h = expression_hash(expression)
+            if h not in seen:
+                seen.add(h)
+                yield expression
+
+    def journal_add(self, tag, progress_url, entries):
+        """
+        提交成功后立即(不经缓冲区)记下 progress url 和它对应的 [(表达式, settings), ...]，
+        进程中断后重启可以接着轮询，不用重新提交
+        """
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO journal (progress_url, tag, entries, submitted_at) "
+                              "VALUES (?, ?, ?, ?)", (progress_url, tag, json.dumps(entries), time.time()))
+
+    def journal_remove(self, progress_url):
+        """
+        回测收尾完成后删掉它的 progress url。缓冲区里还没写入的结果和删除放在同一个事务里提交，
+        中途崩溃时不会出现结果没落盘、日志却已经删掉的情况
+        """
+        with self._lock, self.conn:
+            rows, self._buffer = self._buffer, []
+            self._last_flush = time.time()
+            self._insert(rows)
+            self.conn.execute("DELETE FROM journal WHERE progress_url = ?", (progress_url,))
+
+    def journal_pending(self, tag):
+        """
+        返回 tag 下还没收尾的 [(progress_url, [(表达式, settings), ...]), ...]
+        """
+        with self._lock:
+            rows = self.conn.execute("SELECT progress_url, entries FROM journal WHERE tag = ? ORDER BY submitted_at",
+                                     (tag,)).fetchall()
+        return [(url, [tuple(entry) for entry in json.loads(entries)]) for url, entries in rows]
+
+    def completed(self, tag, sharpe_th=0, fitness_th=0):
+        """
+        返回 tag 下已记录 IS 指标、且 sharpe/fitness 同号超过门槛的回测(按 sharpe 从高到低)，
+        负的 sharpe 按绝对值比较
+        """
+        self.flush()
+        with self._lock:
+            cursor = self.conn.execute("""
+                SELECT expression, settings, alpha_id, sharpe, fitness, turnover, margin, long_count, short_count,
+                       checks, created_at
+                FROM simulations
+                WHERE tag = ? AND sharpe IS NOT NULL AND fitness IS NOT NULL
+                  AND ((sharpe >= ? AND fitness >= ?) OR (sharpe <= ? AND fitness <= ?))
+                ORDER BY sharpe DESC
+            """, (tag, sharpe_th, fitness_th, -sharpe_th, -fitness_th))
+            columns = [c[0] for c in cursor.description]
+            rows = cursor.fetchall()
+        for row in rows:
+            row = dict(zip(columns, row))
+            row['settings'] = json.loads(row['settings']) if row['settings'] else None
+            row['checks'] = json.loads(row['checks']) if row['checks'] else None
+            yield row
+
+    def metric_counts(self, tag):
+        """
+        返回 tag 下 (有 IS 指标的回测条数, 没有的条数)，没有的包括旧 txt 导入的和当时没拿到指标的
+        """
+        self.flush()
+        self.import_legacy(tag)
+        with self._lock:
+            with_metrics, total = self.conn.execute(
+                "SELECT COUNT(sharpe), COUNT(*) FROM simulations WHERE tag = ?", (tag,)).fetchone()
+        return with_metrics, total - with_metrics
+
+    def backfill_metrics(self, tag, alphas):
+        """
+        用 alpha 的原始 json(通常来自 alpha 镜像)补上 tag 下没有 IS 指标的记录：
+        有 alpha_id 的按 id 匹配，旧 txt 导入的(没有 alpha_id)按表达式匹配。返回补上的条数
+        """
+        self.flush()
+        updates = []
+        for alpha in alphas:
+            is_ = alpha.get('is') or {}
+            code = (alpha.get('regular') or {}).get('code')
+            if is_.get('sharpe') is None or is_.get('fitness') is None or not code:
+                continue
+            updates.append((alpha['id'], is_.get('sharpe'), is_.get('fitness'), is_.get('turnover'),
+                            is_.get('margin'), is_.get('longCount'), is_.get('shortCount'),
+                            json.dumps(is_['checks']) if is_.get('checks') is not None else None,
+                            json.dumps(alpha['settings'], sort_keys=True) if alpha.get('settings') else None,
+                            tag, alpha['id'], expression_hash(code)))
+        if not updates:
+            return 0
+        with self._lock, self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany("""
+                UPDATE simulations SET alpha_id = ?, sharpe = ?, fitness = ?, turnover = ?, margin = ?,
+                                       long_count = ?, short_count = ?, checks = ?,
+                                       settings = COALESCE(settings, ?)
+                WHERE tag = ? AND sharpe IS NULL AND (alpha_id = ? OR (alpha_id IS NULL AND expr_hash = ?))
+            """, updates)
+            return self.conn.total_changes - before
+
+    def count(self, tag):
+        self.flush()
+        self.import_legacy(tag)
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM simulations WHERE tag = ?", (tag,)).fetchone()[0]
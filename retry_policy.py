@@ -0,0 +1,226 @@
+import asyncio
+import random
+import threading
+import time
+
+import aiohttp
+import requests
+
+# 连接失败、超时这类请求根本没拿到响应的错误
+NETWORK_ERRORS = (requests.ConnectionError, requests.Timeout, aiohttp.ClientError, asyncio.TimeoutError,
+                  ConnectionError)
+
+
+def classify(status):
+    """
+    按状态码给响应分类：ok / auth(401) / throttle(429) / server(5xx) / client(其余 4xx，不重试)
+    """
+    if status < 400:
+        return 'ok'
+    if status == 401:
+        return 'auth'
+    if status == 429:
+        return 'throttle'
+    if status >= 500:
+        return 'server'
+    return 'client'
+
+
+class CircuitBreaker:
+    """
+    连续 failure_threshold 次 5xx/网络错误后断开，reset_timeout 秒内所有请求都先等着，
+    到时间后只放一个请求去试探：拿到非 5xx 的响应则恢复，失败则再断开 reset_timeout 秒，
+    试探请求抛了别的异常时交还试探名额。
+    线程安全，同步和异步调用方共用
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def remaining(self):
+        """
+        返回还要等多少秒才能发请求，0 表示可以发(断开状态下拿到的是试探名额)
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return 0
+            wait = self._opened_at + self.reset_timeout - time.time()
+            if wait > 0:
+                return wait
+            if self._probing:
+                return 1
+            self._probing = True
+            return 0
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                print("BRAIN API is back, circuit closed")
+            self.failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release_probe(self):
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._opened_at is not None or self.failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    print(f"{self.failures} consecutive failures, pausing requests for {self.reset_timeout}s")
+                self._opened_at = time.time()
+                self._probing = False
+
+
+class RetryPolicy:
+    """
+    BRAIN HTTP 请求的统一重试策略，同步(call)和异步(acall)共用同一套判断：
+    401 先重新登录再重试一次；429 按 Retry-After(没有时按退避)等待，不算故障；
+    5xx 和网络错误按指数退避(带随机抖动)重试，并计入熔断器；其余 4xx 直接返回给调用方。
+    重试 max_attempts 次后仍失败时，有响应就返回最后一次响应，没有就抛出最后一次的异常。
+    timeout 是每个请求的超时(秒)，由调用方传给 requests/aiohttp
+    """
+
+    def __init__(self, max_attempts=6, base_delay=1, max_delay=60, timeout=60, breaker=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+
+    def backoff(self, attempt, retry_after=None):
+        """
+        第 attempt 次(从 0 开始)重试前等待的秒数：full jitter 指数退避，有 Retry-After 时至少等它
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = float(retry_after) + random.uniform(0, self.base_delay)
+        return delay
+
+    def _decide(self, attempt, resp=None, error=None, relogged=False, throttle=True):
+        """
+        返回 (动作, 等待秒数)，动作是 return / relogin / retry / raise
+        """
+        if error is not None:
+            kind, reason = 'network', error
+        else:
+            # requests 的响应是 status_code，aiohttp 的是 status
+            reason = getattr(resp, 'status_code', None) or resp.status
+            kind = classify(reason)
+        if kind in ('server', 'network'):
+            self.breaker.record_failure()
+        else:
+            # 401/429/其余 4xx 也说明 API 是通的
+            self.breaker.record_success()
+        if kind in ('ok', 'client'):
+            return 'return', 0
+        if kind == 'auth':
+            return ('return', 0) if relogged else ('relogin', 0)
+        if kind == 'throttle' and not throttle:
+            return 'return', 0
+        if attempt + 1 >= self.max_attempts:
+            return ('raise', 0) if error is not None else ('return', 0)
+        retry_after = resp.headers.get('Retry-After') if kind == 'throttle' else None
+        delay = self.backoff(attempt, retry_after)
+        print(f"Request failed ({reason}), retrying in {delay:.1f}s")
+        return 'retry', delay
+
+    @staticmethod
+    def _release(resp):
+        release = getattr(resp, 'release', None) or resp.close
+        release()
+
+    def call(self, send, relogin=None, throttle=True):
+        """
+        同步重试：send() 发一次请求并返回 requests 的响应，relogin() 重新登录
+        """
+        attempt = 0
+        relogged = False
+        while True:
+            wait = self.breaker.remaining()
+            if wait > 0:
+                time.sleep(wait)
+                continue
+            resp, error = None, None
+            try:
+                resp = send()
+            except NETWORK_ERRORS as e:
+                error = e
+            except BaseException:
+                self.breaker.release_probe()
+                raise
+            action, delay = self._decide(attempt, resp, error, relogged, throttle)
+            if action == 'return':
+                return resp
+            if action == 'raise':
+                raise error
+            if resp is not None:
+                self._release(resp)
+            if action == 'relogin':
+                relogged = True
+                if relogin is not None:
+                    relogin()
+                continue
+            attempt += 1
+            time.sleep(delay)
+
+    async def acall(self, send, relogin=None, throttle=True):
+        """
+        异步重试：send() 是协程函数，返回 aiohttp 的响应；relogin() 也是协程函数
+        """
+        attempt = 0
+        relogged = False
+        while True:
+            wait = self.breaker.remaining()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            resp, error = None, None
+            try:
+                resp = await send()
+            except NETWORK_ERRORS as e:
+                error = e
+            except BaseException:
+                self.breaker.release_probe()
+                raise
+            action, delay = self._decide(attempt, resp, error, relogged, throttle)
+            if action == 'return':
+                return resp
+            if action == 'raise':
+                raise error
+            if resp is not None:
+                self._release(resp)
+            if action == 'relogin':
+                relogged = True
+                if relogin is not None:
+                    await relogin()
+                continue
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def wait_ready(self, send, max_wait=600, relogin=None):
+        """
+        同步轮询：响应带 Retry-After(结果还没算好)时按它等待后重发，
+        每次请求都走 call 的重试；总共等待超过 max_wait 秒时抛 TimeoutError
+        """
+        deadline = time.time() + max_wait
+        while True:
+            resp = self.call(send, relogin)
+            retry_after = resp.headers.get('Retry-After')
+            if not retry_after:
+                return resp
+            delay = float(retry_after)
+            if time.time() + delay > deadline:
+                raise TimeoutError(f"Still not ready after {max_wait}s: {resp.url}")
+            time.sleep(delay)
@@ -1,10 +1,13 @@
+import asyncio
 import datetime
+import json
 import os
 import time
 import pandas as pd
 
 from config import RECORDS_PATH
-from machine_lib import login
+from machine_lib import BrainClient, brain_api_url, login
+from local_corr import async_record_submitted, plan_submissions, record_submitted
 
 pd.set_option('expand_frame_repr', False)
 pd.set_option('display.max_rows', 1000)
@@ -51,6 +54,11 @@ def submit_alpha(s, alpha_id):
                         print(f"Alpha {alpha_id} GET Status 200. Waiting... {datetime.datetime.now()-s_t}.")
                 else:
                     print(f"Alpha {alpha_id} was submitted successfully.")
+                    try:
+                        # 追加进本地的已提交 alpha 相关性矩阵
+                        record_submitted(s, alpha_id)
+                    except Exception as e:
+                        print(f"Failed to add {alpha_id} to the local correlation state: {e}")
                     return res.status_code
             elif res.status_code == 403:
                 print(f"Alpha {alpha_id} GET Status {res.status_code}.")
@@ -71,21 +79,173 @@ def submit_alpha(s, alpha_id):
     return 404
 
 
+class SubmissionLog:
+    """
+    提交状态的追加式日志(JSON Lines)，状态每变一次追加一行，不再整份重写 csv：
+    queued / posting / polling / accepted / rejected(带 checks) / failed(重试次数用完，下次再试)。
+    重启时按每个 alpha 的最后一条状态恢复，最后一行没写完整时忽略
+    """
+
+    FINAL = ('accepted', 'rejected')
+
+    def __init__(self, path=os.path.join(RECORDS_PATH, 'submission_log.jsonl')):
+        self.path = path
+        self.latest = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.latest[record['id']] = record
+
+    def status(self, alpha_id):
+        record = self.latest.get(alpha_id)
+        return record['status'] if record else None
+
+    def append(self, alpha_id, status, **extra):
+        record = {'id': alpha_id, 'status': status, 'time': datetime.datetime.now().isoformat(timespec='seconds')}
+        record.update(extra)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+        self.latest[alpha_id] = record
+
+    def done(self):
+        return {alpha_id for alpha_id, record in self.latest.items() if record['status'] in self.FINAL}
+
+    def in_flight(self):
+        """
+        中断前已经 POST(或正在 POST)、还没有结果的 alpha，重启后先轮询，不重新 POST
+        """
+        return [alpha_id for alpha_id, record in self.latest.items() if record['status'] in ('posting', 'polling')]
+
+
+class SubmissionQueue:
+    """
+    异步并发提交：最多 n 个 alpha 同时在提交/轮询，共用一个 BrainClient，
+    提交结果的轮询交给 client.poller 统一调度(遵守 Retry-After)。
+    状态写进 SubmissionLog；提交成功后把 alpha 追加进本地的相关性矩阵(regions 是 alpha_id -> region)
+    """
+
+    def __init__(self, log=None, n=3, max_attempts=5, regions=None):
+        self.log = log or SubmissionLog()
+        self.n = n
+        self.max_attempts = max_attempts
+        self.regions = regions or {}
+
+    async def _post(self, client, alpha_id, attempt):
+        """
+        返回 'polling'(已提交或已经在提交中)、'rejected' 或 None(稍后重试)
+        """
+        self.log.append(alpha_id, 'posting', attempt=attempt + 1)
+        async with client.post(f"{brain_api_url}/alphas/{alpha_id}/submit") as res:
+            if res.status in (201, 400):
+                # 400: 已经 POST 过，直接轮询
+                print(f"Alpha {alpha_id} POST Status {res.status}. Start submitting...")
+                self.log.append(alpha_id, 'polling')
+                return 'polling'
+            if res.status == 403:
+                self._reject(alpha_id, await res.json(content_type=None))
+                return 'rejected'
+            print(f"Alpha {alpha_id} POST Status {res.status}: {await res.text()}")
+        await asyncio.sleep(client.policy.backoff(attempt))
+        return None
+
+    def _reject(self, alpha_id, json_data):
+        checks = (json_data or {}).get("is", {}).get("checks", [])
+        self.log.append(alpha_id, 'rejected', checks=checks)
+        print(f"Alpha {alpha_id} submit failed. Need Improvement.")
+        if checks:
+            print(pd.DataFrame(checks)[['name', 'value', 'result']])
+
+    async def submit(self, client, alpha_id, resume=False):
+        for attempt in range(self.max_attempts):
+            if not resume:
+                status = await self._post(client, alpha_id, attempt)
+                if status == 'rejected':
+                    return
+                if status is None:
+                    continue
+            resume = False
+            status, json_data = await client.poller.watch(f"{brain_api_url}/alphas/{alpha_id}/submit",
+                                                          with_status=True)
+            if status == 200:
+                self.log.append(alpha_id, 'accepted')
+                print(f"Alpha {alpha_id} was submitted successfully.")
+                await self._record(client, alpha_id)
+                return
+            if status == 403:
+                self._reject(alpha_id, json_data)
+                return
+            # 404 等：提交超时或中断前没有 POST 成功，重新 POST
+            print(f"Alpha {alpha_id} GET Status {status}. Submit timed out, retrying.")
+        self.log.append(alpha_id, 'failed', detail=f"no result after {self.max_attempts} attempts")
+
+    async def _record(self, client, alpha_id):
+        try:
+            region = self.regions.get(alpha_id)
+            if region is None:
+                async with client.get(f"{brain_api_url}/alphas/{alpha_id}") as resp:
+                    region = (await resp.json())['settings']['region']
+            # 追加进本地的已提交 alpha 相关性矩阵
+            await async_record_submitted(client, alpha_id, region)
+        except Exception as e:
+            print(f"Failed to add {alpha_id} to the local correlation state: {e}")
+
+    async def _worker(self, client, queue):
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            alpha_id, resume = item
+            try:
+                await self.submit(client, alpha_id, resume)
+            except Exception as e:
+                print(f"Error while submitting {alpha_id}: {e}")
+                self.log.append(alpha_id, 'failed', detail=str(e))
+
+    async def run(self, alpha_ids):
+        """
+        先接上中断前还在提交的 alpha，再按 alpha_ids 的顺序提交，已有结果的跳过
+        """
+        in_flight = self.log.in_flight()
+        done = self.log.done()
+        queue = asyncio.Queue()
+        for alpha_id in in_flight:
+            queue.put_nowait((alpha_id, True))
+        for alpha_id in dict.fromkeys(alpha_ids):
+            if alpha_id not in done and alpha_id not in in_flight:
+                self.log.append(alpha_id, 'queued')
+                queue.put_nowait((alpha_id, False))
+        if queue.empty():
+            return
+        print(f"Submitting {queue.qsize()} alphas ({len(in_flight)} resumed)")
+        n_workers = max(min(self.n, queue.qsize()), 1)
+        for _ in range(n_workers):
+            queue.put_nowait(None)
+        async with BrainClient(limit=n_workers * 2) as client:
+            await asyncio.gather(*[self._worker(client, queue) for _ in range(n_workers)])
+
+
 if __name__ == '__main__':
     s = login()
 
     submitable_alpha_file = os.path.join(RECORDS_PATH, 'submitable_alpha.csv')
+    log = SubmissionLog()
     df = pd.read_csv(submitable_alpha_file)
+    df = df[~df['id'].isin(log.done())]
     df['pyramids'] = df['checks'].apply(lambda x: next(([y['name'] for y in item['pyramids']] for item in eval(x) if item['name'] == 'MATCHES_PYRAMID'), None))
     df = df.sort_values(by=['fitness', 'sharpe'], ascending=[True, True]).reset_index(drop=True)
-    id_list = df['id'].tolist()
+
+    # 按相关性排提交计划：和已提交的或计划里前面的 alpha 相关性过高、提交了也会被拒的直接跳过
+    plan, skipped = plan_submissions(df, s)
+    for alpha_id, reason in skipped.items():
+        print(f"Skip {alpha_id}: {reason}")
+    id_list = plan['id'].tolist()
 
     # 这里面替换你的alpha_id
     submittable_alphas = id_list
-    for alpha_id in submittable_alphas:
-        status_code = submit_alpha(s, alpha_id)
-        if status_code == 200 or status_code == 403:
-            df = pd.read_csv(submitable_alpha_file)
-            df = df[df['id'] != alpha_id]
-            df.to_csv(submitable_alpha_file, index=False)
+    queue = SubmissionQueue(log, n=3, regions=dict(zip(plan['id'], plan['region'])))
+    asyncio.run(queue.run(submittable_alphas))
 